@@ -21,8 +21,12 @@
 # * active_band - current band. Other bands are either in one or other coin, but not both
 # * min_band - bands below this are definitely empty
 # * max_band - bands above this are definitely empty
-# * bands_x[n], bands_y[n] - amounts of coin x or y deposited in band n
+# * bands_x[n], bands_y[n] - amounts of coin x or y deposited in band n, packed as bands[n] = bands_y[n] << 128 | bands_x[n]
+# * band_bitmap[n >> 8] - bit (n mod 256) is set if band n is not empty (bands_x[n] or bands_y[n] is nonzero)
 # * user_shares[user,n] / total_shares[n] - fraction of n'th band owned by a user
+# * deposited_collateral[user] - collateral of the user right after their deposit, a lower bound for it until an
+# exchange reaches their bands
+# * max_traded_band - highest band ever changed by an exchange
 # * p_oracle - external oracle price (can be from another AMM)
 # * p (as in get_p) - current price of AMM. It depends not only on the balances (x,y) in the band and active_band, but
 # also on p_oracle
@@ -105,11 +109,19 @@ prev_p_o_time: uint256
 PREV_P_O_DELAY: constant(uint256) = 2 * 60  # s = 2 min
 MAX_P_O_CHG: constant(uint256) = 12500 * 10**14  # <= 2**(1/3) - max relative change to have fee < 50%
 
-bands_x: public(HashMap[int256, uint256])
-bands_y: public(HashMap[int256, uint256])
+# Both coins of a band in one slot, so that a band walk reads and writes one slot per band
+bands: HashMap[int256, uint256]
+# Lets band walks skip empty bands without reading them (256 bands per storage slot)
+band_bitmap: HashMap[int256, uint256]
 
 total_shares: HashMap[int256, uint256]
 _user_shares: HashMap[address, IAMM.UserTicks]
+# Collateral of the user times COLLATERAL_PRECISION, as get_sum_xy has it right after their deposit (0 once
+# they withdraw). Deposits and withdrawals of others can only round it up, so it stays a lower bound for the
+# user's collateral while all of their bands are above max_traded_band
+deposited_collateral: public(HashMap[address, uint256])
+# Highest band an exchange has changed (0 until an exchange goes above band 0)
+max_traded_band: public(int256)
 
 
 _liquidity_mining_callback: ILMCallback
@@ -499,7 +511,8 @@ def get_p() -> uint256:
     @return Current price at 1e18 base
     """
     n: int256 = self.active_band
-    return self._get_p(n, self.bands_x[n], self.bands_y[n])
+    xy: uint256[2] = self._band(n)
+    return self._get_p(n, xy[0], xy[1])
 
 
 @internal
@@ -566,6 +579,101 @@ def read_user_ticks(user: address) -> DynArray[uint256, MAX_TICKS_UINT]:
     return self._read_user_ticks(user, ns)
 
 
+@internal
+@view
+def _band(n: int256) -> uint256[2]:
+    """
+    @notice Unpacks amounts of both coins in band n
+    @param n Band number
+    @return [bands_x[n], bands_y[n]]
+    """
+    xy: uint256 = self.bands[n]
+    return [xy & (2**128 - 1), xy >> 128]
+
+
+@internal
+def _save_band(n: int256, x: uint256, y: uint256):
+    """
+    @notice Packs amounts of both coins into band n
+    @param n Band number
+    @param x Amount of coin x (borrowed) in the band
+    @param y Amount of coin y (collateral) in the band
+    """
+    assert x <= 2**128 - 1 and y <= 2**128 - 1
+    self.bands[n] = (y << 128) | x
+
+
+@external
+@view
+def bands_x(n: int256) -> uint256:
+    """
+    @notice Amount of coin x (borrowed) in band n
+    @param n Band number
+    @return Amount multiplied by borrowed precision
+    """
+    return self._band(n)[0]
+
+
+@external
+@view
+def bands_y(n: int256) -> uint256:
+    """
+    @notice Amount of coin y (collateral) in band n
+    @param n Band number
+    @return Amount multiplied by collateral precision
+    """
+    return self._band(n)[1]
+
+
+@internal
+@view
+def _band_balance(n: int256, use_y: bool) -> uint256:
+    """
+    @notice bands_y[n] if use_y else bands_x[n], not reading them if the bitmap says the band is empty
+    """
+    word_n: int256 = n >> 8
+    if (self.band_bitmap[word_n] >> convert(unsafe_sub(n, word_n << 8), uint256)) & 1 == 0:
+        return 0
+    return self._band(n)[convert(use_y, uint256)]
+
+
+@internal
+@view
+def _next_liquid_band(n_start: int256, n_end: int256, use_y: bool) -> int256:
+    """
+    @notice Find the first band with coin y going up from n_start, or with coin x going down.
+            Bands are only read if the bitmap has them as not empty, and the rest of a bitmap
+            word is skipped at once when there are no such bands in it
+    @param n_end Band to stop at (not inclusive), not more than MAX_SKIP_TICKS away from n_start
+    @return The band found, or n_end if there is none
+    """
+    n: int256 = n_start
+    for i: uint256 in range(MAX_SKIP_TICKS_UINT):
+        if n == n_end:
+            break
+        word_n: int256 = n >> 8
+        bit: uint256 = convert(unsafe_sub(n, word_n << 8), uint256)
+        word: uint256 = self.band_bitmap[word_n]
+        if use_y:
+            word = word >> bit
+        else:
+            word = word << unsafe_sub(255, bit)
+        if word == 0:
+            # No bands with liquidity in the rest of this word
+            if use_y:
+                n = min(unsafe_add(word_n, 1) << 8, n_end)
+            else:
+                n = max(unsafe_sub(word_n << 8, 1), n_end)
+            continue
+        if self._band_balance(n, use_y) != 0:
+            break
+        if use_y:
+            n = unsafe_add(n, 1)
+        else:
+            n = unsafe_sub(n, 1)
+    return n
+
+
 @external
 @view
 @nonreentrant
@@ -576,17 +684,17 @@ def can_skip_bands(n_end: int256) -> bool:
     @return True if no liquidity exists between active_band and n_end, False otherwise
     """
     n: int256 = self.active_band
-    for i: uint256 in range(MAX_SKIP_TICKS_UINT):
-        if n_end > n:
-            if self.bands_y[n] != 0:
-                return False
-            n = unsafe_add(n, 1)
-        else:
-            if self.bands_x[n] != 0:
-                return False
-            n = unsafe_sub(n, 1)
-        if n == n_end:  # not including n_end
-            return True
+    # Not looking further than MAX_SKIP_TICKS bands
+    n_stop: int256 = 0
+    if n_end > n:
+        n_stop = min(n_end, unsafe_add(n, MAX_SKIP_TICKS))
+    else:
+        # With n_end == active_band only the active band itself is checked
+        n_stop = max(min(n_end, unsafe_sub(n, 1)), unsafe_sub(n, MAX_SKIP_TICKS))
+    if self._next_liquid_band(n, n_stop, n_end > n) != n_stop:
+        return False
+    if n_stop == n_end or n_end == n:  # not including n_end
+        return True
     raise "Too deep"
     # Actually skipping bands:
     # * change self.active_band to the new n
@@ -600,18 +708,26 @@ def can_skip_bands(n_end: int256) -> bool:
 @nonreentrant
 def active_band_with_skip() -> int256:
     n0: int256 = self.active_band
-    n: int256 = n0
-    min_band: int256 = self.min_band
-    for i: uint256 in range(MAX_SKIP_TICKS_UINT):
-        if n < min_band:
-            n = n0 - MAX_SKIP_TICKS
-            break
-        if self.bands_x[n] != 0:
-            break
-        n -= 1
+    # Bands below min_band are empty, and we don't look further than MAX_SKIP_TICKS bands
+    n_stop: int256 = unsafe_sub(max(self.min_band, unsafe_sub(n0, MAX_SKIP_TICKS - 1)), 1)
+    # With min_band above n0 all bits below n0 are clear, so this also returns n_stop
+    n: int256 = self._next_liquid_band(n0, n_stop, False)
+    if n == n_stop:
+        return n0 - MAX_SKIP_TICKS
     return n
 
 
+@internal
+def _lm_callback(lm: ILMCallback, n1: int256, collateral_shares: DynArray[uint256, MAX_TICKS_UINT], user: address, user_shares: DynArray[uint256, MAX_TICKS_UINT], n_bands: uint256, with_user: bool):
+    """
+    @notice Report new collateral shares of bands n1 .. n1 + n_bands - 1 and, if `with_user`, new user shares
+            to the liquidity mining callback
+    """
+    extcall lm.callback_collateral_shares(n1, collateral_shares, n_bands)
+    if with_user:
+        extcall lm.callback_user_shares(user, n1, user_shares, n_bands)
+
+
 @external
 @view
 @nonreentrant
@@ -669,27 +785,26 @@ def deposit_range(user: address, amount: uint256, n1: int256, n2: int256):
     self._user_shares[user].ns = unsafe_add(n1, unsafe_mul(n2, 2**128))
 
     lm: ILMCallback = self._liquidity_mining_callback
+    deposited: uint256 = 0
 
     # Autoskip bands if we can
-    for i: uint256 in range(MAX_SKIP_TICKS_UINT + 1):
-        if n1 > n0:
-            if i != 0:
-                self.active_band = n0
-            break
-        assert self.bands_x[n0] == 0 and i < MAX_SKIP_TICKS_UINT  # dev: Deposit below current band
-        n0 -= 1
+    if n1 <= n0:
+        n_skip: int256 = unsafe_sub(n1, 1)
+        assert unsafe_sub(n0, n1) < MAX_SKIP_TICKS and self._next_liquid_band(n0, n_skip, False) == n_skip  # dev: Deposit below current band
+        self.active_band = n_skip
 
     for i: int256 in range(MAX_TICKS):
         band: int256 = unsafe_add(n1, i)
         if band > n2:
             break
 
-        assert self.bands_x[band] == 0, "Band not empty"
+        xy: uint256[2] = self._band(band)
+        assert xy[0] == 0, "Band not empty"
         y: uint256 = y_per_band
         if i == 0:
             y = amount * COLLATERAL_PRECISION - y * unsafe_sub(n_bands, 1)
 
-        total_y: uint256 = self.bands_y[band]
+        total_y: uint256 = xy[1]
 
         # Total / user share
         s: uint256 = self.total_shares[band]
@@ -701,7 +816,11 @@ def deposit_range(user: address, amount: uint256, n1: int256, n2: int256):
         self.total_shares[band] = s
 
         total_y += y
-        self.bands_y[band] = total_y
+        self._save_band(band, 0, total_y)
+        # What get_sum_xy sees for this band now
+        deposited += unsafe_div((total_y + 1) * ds, s + DEAD_SHARES)
+        word_n: int256 = band >> 8
+        self.band_bitmap[word_n] |= 1 << convert(unsafe_sub(band, word_n << 8), uint256)
 
         if lm.address != empty(address):
             # If initial s == 0 - s becomes equal to y which is > 100 => nonzero
@@ -711,12 +830,12 @@ def deposit_range(user: address, amount: uint256, n1: int256, n2: int256):
     self.max_band = max(self.max_band, n2)
 
     self.save_user_shares(user, user_shares)
+    self.deposited_collateral[user] = deposited
 
     log IAMM.Deposit(provider=user, amount=amount, n1=n1, n2=n2)
 
     if lm.address != empty(address):
-        extcall lm.callback_collateral_shares(n1, collateral_shares, n_bands)
-        extcall lm.callback_user_shares(user, n1, empty(DynArray[uint256, MAX_TICKS_UINT]), n_bands)
+        self._lm_callback(lm, n1, collateral_shares, user, [], n_bands, True)
 
 
 @external
@@ -747,8 +866,9 @@ def withdraw(user: address, frac: uint256) -> uint256[2]:
     max_band: int256 = n - 1
 
     for i: uint256 in range(MAX_TICKS_UINT):
-        x: uint256 = self.bands_x[n]
-        y: uint256 = self.bands_y[n]
+        xy: uint256[2] = self._band(n)
+        x: uint256 = xy[0]
+        y: uint256 = xy[1]
         ds: uint256 = unsafe_div(frac * user_shares[i], 10**18)
         user_shares[i] = unsafe_sub(user_shares[i], ds)  # Can ONLY zero out when frac == 10**18
         s: uint256 = self.total_shares[n]
@@ -772,8 +892,10 @@ def withdraw(user: address, frac: uint256) -> uint256[2]:
                     min_band += 1
         if x > 0 or y > 0:
             max_band = n
-        self.bands_x[n] = x
-        self.bands_y[n] = y
+        else:
+            word_n: int256 = n >> 8
+            self.band_bitmap[word_n] &= ~(1 << convert(unsafe_sub(n, word_n << 8), uint256))
+        self._save_band(n, x, y)
         total_x += dx
         total_y += dy
 
@@ -782,6 +904,8 @@ def withdraw(user: address, frac: uint256) -> uint256[2]:
         else:
             n = unsafe_add(n, 1)
 
+    self.deposited_collateral[user] = 0
+
     # Empty the ticks
     if frac == 10**18:
         self._user_shares[user].ticks[0] = 0
@@ -798,8 +922,7 @@ def withdraw(user: address, frac: uint256) -> uint256[2]:
     log IAMM.Withdraw(provider=user, amount_borrowed=total_x, amount_collateral=total_y)
 
     if lm.address != empty(address):
-        extcall lm.callback_collateral_shares(ns[0], empty(DynArray[uint256, MAX_TICKS_UINT]), len(old_user_shares))
-        extcall lm.callback_user_shares(user, ns[0], old_user_shares, len(old_user_shares))
+        self._lm_callback(lm, ns[0], [], user, old_user_shares, len(old_user_shares), True)
 
     return [total_x, total_y]
 
@@ -828,8 +951,9 @@ def calc_swap_out(pump: bool, in_amount: uint256, p_o: uint256[2], in_precision:
     out: IAMM.DetailedTrade = empty(IAMM.DetailedTrade)
     out.n2 = self.active_band
     p_o_up: uint256 = self._p_oracle_up(out.n2)
-    x: uint256 = self.bands_x[out.n2]
-    y: uint256 = self.bands_y[out.n2]
+    xy: uint256[2] = self._band(out.n2)
+    x: uint256 = xy[0]
+    y: uint256 = xy[1]
 
     in_amount_left: uint256 = in_amount
     fee: uint256 = max(self.fee, p_o[1])
@@ -902,7 +1026,7 @@ def calc_swap_out(pump: bool, in_amount: uint256, p_o: uint256[2], in_precision:
                 out.n2 += 1
                 p_o_up = unsafe_div(p_o_up * Aminus1, A)
                 x = 0
-                y = self.bands_y[out.n2]
+                y = self._band_balance(out.n2, True)
 
         else:  # dump
             if x != 0:
@@ -937,7 +1061,7 @@ def calc_swap_out(pump: bool, in_amount: uint256, p_o: uint256[2], in_precision:
                     break
                 out.n2 -= 1
                 p_o_up = unsafe_div(p_o_up * A, Aminus1)
-                x = self.bands_x[out.n2]
+                x = self._band_balance(out.n2, False)
                 y = 0
 
         if j != MAX_TICKS_UINT:
@@ -951,6 +1075,13 @@ def calc_swap_out(pump: bool, in_amount: uint256, p_o: uint256[2], in_precision:
     return out
 
 
+@internal
+@pure
+def _check_indices(i: uint256, j: uint256):
+    # One copy of the revert reason for both quotes and exchanges
+    assert (i == 0 and j == 1) or (i == 1 and j == 0), "Wrong index"
+
+
 @internal
 @view
 def _get_dxdy(i: uint256, j: uint256, amount: uint256, is_in: bool) -> IAMM.DetailedTrade:
@@ -964,7 +1095,7 @@ def _get_dxdy(i: uint256, j: uint256, amount: uint256, is_in: bool) -> IAMM.Deta
     """
     # i = 0: borrowable (USD) in, collateral (ETH) out; going up
     # i = 1: collateral (ETH) in, borrowable (USD) out; going down
-    assert (i == 0 and j == 1) or (i == 1 and j == 0), "Wrong index"
+    self._check_indices(i, j)
     out: IAMM.DetailedTrade = empty(IAMM.DetailedTrade)
     if amount == 0:
         return out
@@ -1024,7 +1155,7 @@ def _exchange(i: uint256, j: uint256, amount: uint256, minmax_amount: uint256, _
     @param use_in_amount Whether input or output amount is specified
     @return Amount of coins given in and out
     """
-    assert (i == 0 and j == 1) or (i == 1 and j == 0), "Wrong index"
+    self._check_indices(i, j)
     p_o: uint256[2] = self._price_oracle_w()  # Let's update the oracle even if we exchange 0
     if amount == 0:
         return [0, 0]
@@ -1052,10 +1183,10 @@ def _exchange(i: uint256, j: uint256, amount: uint256, minmax_amount: uint256, _
         out = self.calc_swap_in(i == 0, amount_to_swap, p_o, in_precision, out_precision)
     in_amount_done: uint256 = unsafe_div(out.in_amount, in_precision)
     out_amount_done: uint256 = unsafe_div(out.out_amount, out_precision)
-    if use_in_amount:
-        assert out_amount_done >= minmax_amount, "Slippage"
-    else:
-        assert in_amount_done <= minmax_amount and (out_amount_done == amount or amount == max_value(uint256)), "Slippage"
+    slippage_ok: bool = out_amount_done >= minmax_amount
+    if not use_in_amount:
+        slippage_ok = in_amount_done <= minmax_amount and (out_amount_done == amount or amount == max_value(uint256))
+    assert slippage_ok, "Slippage"
     if out_amount_done == 0 or in_amount_done == 0:
         return [0, 0]
 
@@ -1074,8 +1205,7 @@ def _exchange(i: uint256, j: uint256, amount: uint256, minmax_amount: uint256, _
             y = out.ticks_in[unsafe_sub(n_diff, k)]
             if n == out.n2:
                 x = out.last_tick_j
-        self.bands_x[n] = x
-        self.bands_y[n] = y
+        self._save_band(n, x, y)
         if lm.address != empty(address):
             s: uint256 = 0
             if y > 0:
@@ -1085,12 +1215,15 @@ def _exchange(i: uint256, j: uint256, amount: uint256, minmax_amount: uint256, _
             break
         n = unsafe_add(n, 1)
 
+    # n is the highest band of the trade now
+    if n > self.max_traded_band:
+        self.max_traded_band = n
     self.active_band = out.n2
 
     log IAMM.TokenExchange(buyer=_for, sold_id=i, tokens_sold=in_amount_done, bought_id=j, tokens_bought=out_amount_done)
 
     if lm.address != empty(address):
-        extcall lm.callback_collateral_shares(n_start, collateral_shares, len(collateral_shares))
+        self._lm_callback(lm, n_start, collateral_shares, empty(address), [], len(collateral_shares), False)
 
     tkn.transfer_from(in_coin, msg.sender, self, in_amount_done)
     tkn.transfer(out_coin, _for, out_amount_done)
@@ -1121,8 +1254,9 @@ def calc_swap_in(pump: bool, out_amount: uint256, p_o: uint256[2], in_precision:
     out: IAMM.DetailedTrade = empty(IAMM.DetailedTrade)
     out.n2 = self.active_band
     p_o_up: uint256 = self._p_oracle_up(out.n2)
-    x: uint256 = self.bands_x[out.n2]
-    y: uint256 = self.bands_y[out.n2]
+    xy: uint256[2] = self._band(out.n2)
+    x: uint256 = xy[0]
+    y: uint256 = xy[1]
 
     out_amount_left: uint256 = out_amount
     fee: uint256 = max(self.fee, p_o[1])
@@ -1193,7 +1327,7 @@ def calc_swap_in(pump: bool, out_amount: uint256, p_o: uint256[2], in_precision:
                 out.n2 += 1
                 p_o_up = unsafe_div(p_o_up * Aminus1, A)
                 x = 0
-                y = self.bands_y[out.n2]
+                y = self._band_balance(out.n2, True)
 
         else:  # dump
             if x != 0:
@@ -1227,7 +1361,7 @@ def calc_swap_in(pump: bool, out_amount: uint256, p_o: uint256[2], in_precision:
                     break
                 out.n2 -= 1
                 p_o_up = unsafe_div(p_o_up * A, Aminus1)
-                x = self.bands_x[out.n2]
+                x = self._band_balance(out.n2, False)
                 y = 0
 
         if j != MAX_TICKS_UINT:
@@ -1332,12 +1466,13 @@ def get_xy_up(user: address, use_y: bool) -> uint256:
         n += 1
         if n > ns[1]:
             break
+        xy: uint256[2] = self._band(n)
         x: uint256 = 0
         y: uint256 = 0
         if n >= n_active:
-            y = self.bands_y[n]
+            y = xy[1]
         if n <= n_active:
-            x = self.bands_x[n]
+            x = xy[0]
         # p_o_up: uint256 = self._p_oracle_up(n)
         p_o_up: uint256 = p_o_down
         # p_o_down = self._p_oracle_up(n + 1)
@@ -1484,8 +1619,9 @@ def _get_xy(user: address, is_sum: bool) -> DynArray[uint256, MAX_TICKS_UINT][2]
         for i: uint256 in range(MAX_TICKS_UINT):
             total_shares: uint256 = self.total_shares[ns[0]] + DEAD_SHARES
             ds: uint256 = ticks[i]
-            dx: uint256 = unsafe_div((self.bands_x[ns[0]] + 1) * ds, total_shares)
-            dy: uint256 = unsafe_div((self.bands_y[ns[0]] + 1) * ds, total_shares)
+            xy: uint256[2] = self._band(ns[0])
+            dx: uint256 = unsafe_div((xy[0] + 1) * ds, total_shares)
+            dy: uint256 = unsafe_div((xy[1] + 1) * ds, total_shares)
             if is_sum:
                 xs[0] += dx
                 ys[0] += dy
@@ -1554,8 +1690,9 @@ def get_amount_for_price(p: uint256) -> (uint256, bool):
 
     for i: uint256 in range(MAX_TICKS_UINT + MAX_SKIP_TICKS_UINT):
         assert p_o_up > 0
-        x: uint256 = self.bands_x[n]
-        y: uint256 = self.bands_y[n]
+        xy: uint256[2] = self._band(n)
+        x: uint256 = xy[0]
+        y: uint256 = xy[1]
         if i == 0:
             if p < self._get_p(n, x, y):
                 pump = False
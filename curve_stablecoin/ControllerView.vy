@@ -331,6 +331,42 @@ def liquidate_health_preview(
     return health
 
 
+@internal
+@view
+def _deposited_health(
+    _amm: IAMM,
+    _user: address,
+    _ns: int256[2],
+    _p_o: uint256,
+    _p_up: uint256,
+    _debt: uint256,
+    _ld: uint256,
+    _collateral_precision: uint256,
+    _borrowed_precision: uint256,
+) -> int256:
+    """
+    Lower bound for the full health of a user whose bands are all above
+    max_traded_band, with _p_o above _p_up = p_oracle_up(n1). It reads
+    deposited_collateral instead of walking the bands. Every band then
+    converts all of its collateral in get_x_down at a price of at least
+    p_oracle_down(n2), losing less than _p_up / WAD + 2 to rounding.
+    """
+    y: uint256 = staticcall _amm.deposited_collateral(_user)
+    n_bands: uint256 = convert(unsafe_add(unsafe_sub(_ns[1], _ns[0]), 1), uint256)
+    x_down: uint256 = crv_math.sub_or_zero(
+        y * staticcall _amm.p_oracle_down(_ns[1]) // WAD,
+        n_bands * (_p_up // WAD + 2),
+    )
+    health: int256 = self._calc_health(x_down // _borrowed_precision, _debt, _ld)
+    return health + convert(
+        unsafe_div(
+            unsafe_sub(_p_o, _p_up) * (y // _collateral_precision) * _collateral_precision,
+            _debt * _borrowed_precision,
+        ),
+        int256,
+    )
+
+
 @internal
 @view
 def users_with_health(
@@ -347,32 +383,117 @@ def users_with_health(
     Optionally require controller.approval(user, _approval_spender).
     Returns IController.Position entries (user, x, y, debt, health).
     """
+    out: DynArray[IController.Position, 1000] = []
+    next_ix: uint256 = 0
+    out, next_ix = self._scan_health(
+        _controller,
+        _from,
+        _limit,
+        _threshold,
+        _require_approval,
+        _approval_spender,
+        _full,
+        True,
+        0,
+    )
+    return out
+
+
+@internal
+@view
+def _scan_health(
+    _controller: IController,
+    _from: uint256,
+    _limit: uint256,
+    _threshold: int256,
+    _require_approval: bool,
+    _approval_spender: address,
+    _full: bool,
+    _with_xy: bool,
+    _gas_reserve: uint256,
+) -> (DynArray[IController.Position, 1000], uint256):
+    """
+    Scan behind users_with_health which also returns the index of the first
+    loan it did not look at. It stops at n_loans, after _limit loans, once
+    1000 positions are found or, if _gas_reserve is not 0, once less than
+    _gas_reserve gas is left before the next loan.
+    Health is computed here exactly like controller._health, but the
+    AMM-wide inputs (oracle price, active band, token precisions) are read
+    once per scan instead of once per user. With _full, users whose bands no
+    exchange has reached are skipped if even the lower bound from
+    _deposited_health is not below _threshold, without walking their bands.
+    Without _with_xy, x and y of the positions are left at 0 and
+    get_sum_xy is only called where the health needs it.
+    """
     AMM_: IAMM = staticcall _controller.amm()
 
     n_loans: uint256 = staticcall _controller.n_loans()
     limit: uint256 = _limit if _limit != 0 else n_loans
     ix: uint256 = _from
     out: DynArray[IController.Position, 1000] = []
+
+    p_o: uint256 = 0
+    active_band: int256 = 0
+    max_traded_band: int256 = 0
+    collateral_precision: uint256 = 0
+    borrowed_precision: uint256 = 0
+    if _full:
+        p_o = staticcall AMM_.price_oracle()
+        active_band = staticcall AMM_.active_band()
+        max_traded_band = staticcall AMM_.max_traded_band()
+        collateral_precision = pow_mod256(
+            10, 18 - convert(staticcall (staticcall _controller.collateral_token()).decimals(), uint256)
+        )
+        borrowed_precision = pow_mod256(
+            10, 18 - convert(staticcall (staticcall _controller.borrowed_token()).decimals(), uint256)
+        )
+
     for i: uint256 in range(10**6):
-        if ix >= n_loans or i == limit:
+        if ix >= n_loans or i == limit or msg.gas < _gas_reserve:
             break
         user: address = staticcall _controller.loans(ix)
         if _require_approval and not (user == _approval_spender or staticcall _controller.approval(user, _approval_spender)):
             ix += 1
             continue
-        h: int256 = staticcall _controller.health(user, _full)
+        debt: uint256 = staticcall _controller.debt(user)
+        ld: uint256 = staticcall _controller.liquidation_discounts(user)
+        p_up: uint256 = 0
+        if _full:
+            ns: int256[2] = staticcall AMM_.read_user_tick_numbers(user)
+            if ns[0] > active_band:  # Not in liquidation mode
+                p_up = staticcall AMM_.p_oracle_up(ns[0])
+                if p_o > p_up and ns[0] > max_traded_band:
+                    if self._deposited_health(
+                        AMM_, user, ns, p_o, p_up, debt, ld, collateral_precision, borrowed_precision
+                    ) >= _threshold:
+                        ix += 1
+                        continue
+        h: int256 = self._calc_health(staticcall AMM_.get_x_down(user), debt, ld)
+        xy: uint256[2] = empty(uint256[2])
+        has_xy: bool = False
+        if p_up != 0 and p_o > p_up:
+            xy = staticcall AMM_.get_sum_xy(user)
+            has_xy = True
+            h += convert(
+                unsafe_div(
+                    unsafe_sub(p_o, p_up) * xy[1] * collateral_precision,
+                    debt * borrowed_precision,
+                ),
+                int256,
+            )
         if h < _threshold:
-            xy: uint256[2] = staticcall AMM_.get_sum_xy(user)
-            debt: uint256 = staticcall _controller.debt(user)
+            if _with_xy and not has_xy:
+                xy = staticcall AMM_.get_sum_xy(user)
             out.append(
                 IController.Position(
                     user=user, x=xy[0], y=xy[1], debt=debt, health=h
                 )
             )
             if len(out) == 1000:
+                ix += 1
                 break
         ix += 1
-    return out
+    return out, ix
 
 
 @external
@@ -394,6 +515,57 @@ def users_to_liquidate(
     )
 
 
+@external
+@view
+def users_to_liquidate_page(
+    _from: uint256 = 0, _limit: uint256 = 0, _gas_reserve: uint256 = 0
+) -> (DynArray[IController.Position, 1000], uint256):
+    """
+    @notice Natspec for this function is available in its controller contract
+    """
+    return self._scan_health(
+        CONTROLLER,
+        _from,
+        _limit,
+        0,
+        False,
+        empty(address),
+        True,
+        True,
+        _gas_reserve,
+    )
+
+
+@external
+@view
+def users_health_page(
+    _from: uint256 = 0,
+    _limit: uint256 = 0,
+    _threshold: int256 = 0,
+    _gas_reserve: uint256 = 0,
+) -> (DynArray[IController.UserHealth, 1000], uint256):
+    """
+    @notice Natspec for this function is available in its controller contract
+    """
+    positions: DynArray[IController.Position, 1000] = []
+    next_ix: uint256 = 0
+    positions, next_ix = self._scan_health(
+        CONTROLLER,
+        _from,
+        _limit,
+        _threshold,
+        False,
+        empty(address),
+        True,
+        False,
+        _gas_reserve,
+    )
+    out: DynArray[IController.UserHealth, 1000] = []
+    for p: IController.Position in positions:
+        out.append(IController.UserHealth(user=p.user, health=p.health))
+    return out, next_ix
+
+
 @external
 @view
 def user_prices(_user: address) -> uint256[2]:  # Upper, lower
@@ -433,34 +605,61 @@ def user_state(_user: address) -> uint256[4]:
     return self._user_state(_user)
 
 
+@internal
+@pure
+def _p_oracle_up(_n: int256, _base_price: uint256, _logn_a_ratio: int256) -> uint256:
+    """
+    @notice AMM.p_oracle_up(_n) calculated with the AMM's formula, given its base price
+    @dev Exact as long as _logn_a_ratio is computed like the AMM's LOG_A_RATIO
+    """
+    exp_result: uint256 = convert(math._wad_exp(-_n * _logn_a_ratio), uint256)
+    assert exp_result > 1000  # dev: limit precision of the multiplier
+    return unsafe_div(_base_price * exp_result, WAD)
+
+
 @internal
 @view
 def _max_p_base(_amm: IAMM, _logn_a_ration: int256) -> uint256:
     """
     @notice Calculate max base price including skipping bands
+    @dev That is p_oracle_up of the lowest band which is above p_oracle and above the
+         bands which can't be skipped. Its number is estimated with a logarithm and then
+         corrected by a band or two, instead of walking down from MAX_P_BASE_BANDS below
     """
     p_oracle: uint256 = staticcall _amm.price_oracle()
+    base_price: uint256 = staticcall _amm.get_base_price()
     # Should be correct unless price changes suddenly by MAX_P_BASE_BANDS+ bands
-    n1: int256 = math._wad_ln(
-        convert(staticcall _amm.get_base_price() * WAD // p_oracle, int256)
-    )
-    if n1 < 0:
-        n1 -= (
+    n: int256 = math._wad_ln(convert(base_price * WAD // p_oracle, int256))
+    if n < 0:
+        n -= (
             _logn_a_ration - 1
         )  # This is to deal with vyper's rounding of negative numbers
-    n1 = unsafe_div(n1, _logn_a_ration) + MAX_P_BASE_BANDS
+    n = unsafe_div(n, _logn_a_ration)
     n_min: int256 = staticcall _amm.active_band_with_skip()
-    n1 = max(n1, n_min + 1)
-    p_base: uint256 = staticcall _amm.p_oracle_up(n1)
-
-    for _: uint256 in range(MAX_SKIP_TICKS + 1):
-        n1 -= 1
-        if n1 <= n_min:
-            break
-        p_base_prev: uint256 = p_base
-        p_base = staticcall _amm.p_oracle_up(n1)
-        if p_base > p_oracle:
-            return p_base_prev
+    n_max: int256 = max(n + MAX_P_BASE_BANDS, n_min + 1)
+    # Not looking further than MAX_SKIP_TICKS + 1 bands below n_max
+    n_lo: int256 = max(n_min + 1, n_max - convert(MAX_SKIP_TICKS, int256) - 1)
+
+    # Prices decrease with n: find the lowest n in [n_lo, n_max] with p_oracle_up(n) <= p_oracle
+    n = min(max(n, n_lo), n_max)
+    p_base: uint256 = self._p_oracle_up(n, base_price, _logn_a_ration)
+    if p_base > p_oracle:
+        for _: uint256 in range(MAX_SKIP_TICKS + 1):
+            if n == n_max:
+                break
+            n = unsafe_add(n, 1)
+            p_base = self._p_oracle_up(n, base_price, _logn_a_ration)
+            if p_base <= p_oracle:
+                break
+    else:
+        for _: uint256 in range(MAX_SKIP_TICKS + 1):
+            if n == n_lo:
+                break
+            p_base_prev: uint256 = self._p_oracle_up(unsafe_sub(n, 1), base_price, _logn_a_ration)
+            if p_base_prev > p_oracle:
+                break
+            n = unsafe_sub(n, 1)
+            p_base = p_base_prev
     return p_base
 
 
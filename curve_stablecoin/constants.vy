@@ -11,6 +11,8 @@ WAD: constant(uint256) = 10**18
 SWAD: constant(int256) = 10**18
 
 CALLDATA_MAX_SIZE: constant(uint256) = 32 * 300
+# Max users in one liquidate_many call
+MAX_LIQUIDATIONS: constant(uint256) = 50
 
 # Sentinel values used in `configure` methods.
 # We use an arbitrary high value that is unlikely to be used as a real value (can't use zero address as it might be intentional)
@@ -54,6 +54,7 @@ MIN_TICKS_UINT: constant(uint256) = c.MIN_TICKS_UINT
 MAX_TICKS_UINT: constant(uint256) = c.MAX_TICKS_UINT
 MIN_TICKS: constant(int256) = c.MIN_TICKS
 CALLDATA_MAX_SIZE: constant(uint256) = c.CALLDATA_MAX_SIZE
+MAX_LIQUIDATIONS: constant(uint256) = c.MAX_LIQUIDATIONS
 SKIP_CONFIG_UINT256: constant(uint256) = c.SKIP_CONFIG_UINT256
 SKIP_CONFIG_ADDRESS: constant(address) = c.SKIP_CONFIG_ADDRESS
 
@@ -101,16 +102,23 @@ def monetary_policy() -> IMonetaryPolicy:
 
 
 approval: public(HashMap[address, HashMap[address, bool]])
-extra_health: public(reentrant(HashMap[address, uint256]))
 
-loan: HashMap[address, IController.Loan]
-liquidation_discounts: public(HashMap[address, uint256])
+# Loans packed as loan[user] = rate_mul << 128 | initial_debt
+loan: HashMap[address, uint256]
+# The rest of the per-user state packed in one slot, 64 bits each:
+# _user_params[user] = loan_ix << 128 | extra_health << 64 | liquidation_discount
+# * liquidation_discount - liquidation discount set when the user last changed their loan
+# * extra_health - extra loan discount the user asked for in set_extra_health
+# * loan_ix - position of the loan in `loans`
+_user_params: HashMap[address, uint256]
+LIQUIDATION_DISCOUNT_SHIFT: constant(uint256) = 0
+EXTRA_HEALTH_SHIFT: constant(uint256) = 64
+LOAN_IX_SHIFT: constant(uint256) = 128
+
 _total_debt: IController.Loan
 
 # Enumerate existing loans
 loans: public(address[2**64 - 1])
-# Position of the loan in the list
-loan_ix: public(HashMap[address, uint256])
 # Number of nonzero loans
 n_loans: public(uint256)
 
@@ -127,6 +135,11 @@ collected: uint256
 _stored_admin_fees: uint256
 admin_percentage: public(uint256)
 
+# AMM rate_mul for the rest of the transaction once read by `_cache_rate_mul` (0 until then).
+# It can't change within a transaction: AMM.set_rate stores the value which get_rate_mul
+# already returns for the current block.timestamp
+_cached_rate_mul: transient(uint256)
+
 # DANGER DO NOT RELY ON MSG.SENDER IN VIRTUAL METHODS
 interface VirtualMethods:
     def _on_debt_increased(_total_debt: uint256): nonpayable
@@ -204,6 +217,31 @@ def available_balance() -> uint256:
     return staticcall BORROWED_TOKEN.balanceOf(self)
 
 
+@internal
+@view
+def _rate_mul() -> uint256:
+    """
+    @notice AMM rate multiplier, without calling the AMM if it was cached in this transaction
+    @return Current rate multiplier
+    """
+    rate_mul: uint256 = self._cached_rate_mul
+    if rate_mul == 0:
+        rate_mul = staticcall AMM.get_rate_mul()
+    return rate_mul
+
+
+@internal
+def _cache_rate_mul() -> uint256:
+    """
+    @notice Read the AMM rate multiplier once for the rest of the transaction: the monetary
+            policy, fee and debt calculations which follow reuse it instead of calling the AMM
+    @return Current rate multiplier
+    """
+    rate_mul: uint256 = self._rate_mul()
+    self._cached_rate_mul = rate_mul
+    return rate_mul
+
+
 @internal
 @view
 def _get_total_debt() -> uint256:
@@ -211,7 +249,7 @@ def _get_total_debt() -> uint256:
     @notice Total debt of this controller
     @return Total outstanding debt with accrued interest
     """
-    rate_mul: uint256 = staticcall AMM.get_rate_mul()
+    rate_mul: uint256 = self._rate_mul()
     loan: IController.Loan = self._total_debt
     return loan.initial_debt * rate_mul // loan.rate_mul
 
@@ -335,6 +373,86 @@ def save_rate():
     self._save_rate()
 
 
+@internal
+@view
+def _loan(_user: address) -> IController.Loan:
+    """
+    @notice Unpacks the loan of the user
+    @param _user User address
+    @return Loan with the initial debt and the rate_mul when it was last changed
+    """
+    packed: uint256 = self.loan[_user]
+    return IController.Loan(initial_debt=packed & (2**128 - 1), rate_mul=packed >> 128)
+
+
+@internal
+def _save_loan(_user: address, _initial_debt: uint256, _rate_mul: uint256):
+    """
+    @notice Packs the loan of the user into one slot
+    @param _user User address
+    @param _initial_debt Debt at _rate_mul
+    @param _rate_mul AMM rate_mul at the time of the change
+    """
+    assert _initial_debt <= 2**128 - 1 and _rate_mul <= 2**128 - 1
+    self.loan[_user] = (_rate_mul << 128) | _initial_debt
+
+
+@internal
+@view
+def _user_param(_user: address, _shift: uint256) -> uint256:
+    """
+    @notice Unpacks one of the user's parameters from _user_params
+    @param _user User address
+    @param _shift Position of the parameter (one of the *_SHIFT constants)
+    """
+    return (self._user_params[_user] >> _shift) & (2**64 - 1)
+
+
+@internal
+def _save_user_param(_user: address, _shift: uint256, _value: uint256):
+    """
+    @notice Packs one of the user's parameters into _user_params, keeping the others
+    @param _user User address
+    @param _shift Position of the parameter (one of the *_SHIFT constants)
+    @param _value New value, below 2**64
+    """
+    assert _value <= 2**64 - 1
+    self._user_params[_user] = (
+        self._user_params[_user] & ~((2**64 - 1) << _shift)
+    ) | (_value << _shift)
+
+
+@external
+@view
+def liquidation_discounts(_user: address) -> uint256:
+    """
+    @notice Liquidation discount of the user, set when they last changed their loan
+    @param _user User address
+    """
+    return self._user_param(_user, LIQUIDATION_DISCOUNT_SHIFT)
+
+
+@external
+@view
+@reentrant
+def extra_health(_user: address) -> uint256:
+    """
+    @notice Extra loan discount the user applies to their new loans and borrows
+    @param _user User address
+    """
+    return self._user_param(_user, EXTRA_HEALTH_SHIFT)
+
+
+@external
+@view
+def loan_ix(_user: address) -> uint256:
+    """
+    @notice Position of the user's loan in `loans`
+    @param _user User address
+    """
+    return self._user_param(_user, LOAN_IX_SHIFT)
+
+
 @internal
 @view
 def _debt(_user: address) -> (uint256, uint256):
@@ -343,8 +461,8 @@ def _debt(_user: address) -> (uint256, uint256):
     @param _user User address
     @return (debt, rate_mul)
     """
-    rate_mul: uint256 = staticcall AMM.get_rate_mul()
-    loan: IController.Loan = self.loan[_user]
+    rate_mul: uint256 = self._rate_mul()
+    loan: IController.Loan = self._loan(_user)
     if loan.initial_debt == 0:
         return (0, rate_mul)
     else:
@@ -373,7 +491,7 @@ def loan_exists(_user: address) -> bool:
     @param _user Address of the user to check
     @return True if the user has an active loan, False otherwise
     """
-    return self.loan[_user].initial_debt > 0
+    return self._loan(_user).initial_debt > 0
 
 
 @external
@@ -509,7 +627,7 @@ def _calculate_debt_n1(
     y_effective: uint256 = self._get_y_effective(
         _collateral * COLLATERAL_PRECISION,
         _N,
-        self.loan_discount + self.extra_health[_user],
+        self.loan_discount + self._user_param(_user, EXTRA_HEALTH_SHIFT),
         SQRT_BAND_RATIO,
         A,
     )
@@ -598,9 +716,9 @@ def _update_user_liquidation_discount(_for: address, _approval: bool, _new_debt:
     liquidation_discount: uint256 = 0
     if _approval:
         liquidation_discount = self.liquidation_discount
-        self.liquidation_discounts[_for] = liquidation_discount
+        self._save_user_param(_for, LIQUIDATION_DISCOUNT_SHIFT, liquidation_discount)
     else:
-        liquidation_discount = self.liquidation_discounts[_for]
+        liquidation_discount = self._user_param(_for, LIQUIDATION_DISCOUNT_SHIFT)
 
     # Doesn't allow to end up with unhealthy state, except unhealthy user liquidation case (new_debt == 0)
     # full = False to make this condition non-manipulatable (and also cheaper on gas)
@@ -674,19 +792,19 @@ def create_loan(
 
     total_collateral: uint256 = _collateral + more_collateral
 
-    assert self.loan[_for].initial_debt == 0, "Loan already created"
+    assert self._loan(_for).initial_debt == 0, "Loan already created"
     assert _N > MIN_TICKS_UINT - 1  # dev: Need more ticks
     assert _N < MAX_TICKS_UINT + 1  # dev: Need less ticks
 
     n1: int256 = self._calculate_debt_n1(total_collateral, _debt, _N, _for)
     n2: int256 = n1 + convert(unsafe_sub(_N, 1), int256)
 
-    rate_mul: uint256 = staticcall AMM.get_rate_mul()
-    self.loan[_for] = IController.Loan(initial_debt=_debt, rate_mul=rate_mul)
+    rate_mul: uint256 = self._cache_rate_mul()
+    self._save_loan(_for, _debt, rate_mul)
 
     n_loans: uint256 = self.n_loans
     self.loans[n_loans] = _for
-    self.loan_ix[_for] = n_loans
+    self._save_user_param(_for, LOAN_IX_SHIFT, n_loans)
     self.n_loans = unsafe_add(n_loans, 1)
 
     extcall AMM.deposit_range(_for, total_collateral, n1, n2)
@@ -733,6 +851,7 @@ def _add_collateral_borrow(
     """
     debt: uint256 = 0
     rate_mul: uint256 = 0
+    self._cache_rate_mul()
     debt, rate_mul = self._debt(_for)
     self._check_loan_exists(debt)
     debt += _d_debt
@@ -750,7 +869,7 @@ def _add_collateral_borrow(
     n2: int256 = n1 + unsafe_sub(ns[1], ns[0])
 
     extcall AMM.deposit_range(_for, xy[1], n1, n2)
-    self.loan[_for] = IController.Loan(initial_debt=debt, rate_mul=rate_mul)
+    self._save_loan(_for, debt, rate_mul)
 
     liquidation_discount: uint256 = self._update_user_liquidation_discount(_for, True, debt)
 
@@ -917,15 +1036,15 @@ def borrow_more(
 @internal
 def _remove_from_list(_for: address):
     last_loan_ix: uint256 = self.n_loans - 1
-    loan_ix: uint256 = self.loan_ix[_for]
+    loan_ix: uint256 = self._user_param(_for, LOAN_IX_SHIFT)
     assert (
         self.loans[loan_ix] == _for
     )  # dev: should never fail but safety first
-    self.loan_ix[_for] = 0
+    self._save_user_param(_for, LOAN_IX_SHIFT, 0)
     if loan_ix < last_loan_ix:  # Need to replace
         last_loan: address = self.loans[last_loan_ix]
         self.loans[loan_ix] = last_loan
-        self.loan_ix[last_loan] = loan_ix
+        self._save_user_param(last_loan, LOAN_IX_SHIFT, loan_ix)
     self.n_loans = last_loan_ix
 
 
@@ -1118,6 +1237,7 @@ def repay(
     assert self._has_approval(_for)
     debt: uint256 = 0
     rate_mul: uint256 = 0
+    self._cache_rate_mul()
     debt, rate_mul = self._debt(_for)
     self._check_loan_exists(debt)
     xy: uint256[2] = staticcall AMM.get_sum_xy(_for)
@@ -1148,7 +1268,7 @@ def repay(
         )
     debt -= d_debt
 
-    self.loan[_for] = IController.Loan(initial_debt=debt, rate_mul=rate_mul)
+    self._save_loan(_for, debt, rate_mul)
     self._update_total_debt(d_debt, rate_mul, False)
     self.repaid += d_debt
     self._save_rate()
@@ -1250,27 +1370,17 @@ def liquidate_health_preview(
     )
 
 
-@external
-def liquidate(
-    _user: address,
-    _min_x: uint256,
-    _frac: uint256 = 10**18,
-    _callbacker: address = empty(address),
-    _calldata: Bytes[CALLDATA_MAX_SIZE] = b"",
-):
+@internal
+def _withdraw_liquidated(
+    _user: address, _min_x: uint256, _frac: uint256
+) -> (uint256[2], uint256, uint256, int256, bool):
     """
-    @notice Perform a bad liquidation (or self-liquidation) of user if health is not good
-    @param _user Address of the user to liquidate
-    @param _min_x Minimal amount of borrowed asset to receive (to avoid liquidators being sandwiched)
-    @param _frac Fraction to liquidate; 100% = 10**18
-    @param _callbacker Address of the callback contract
-    @param _calldata Any data for callbacker
+    @notice Check that the user can be liquidated and withdraw the liquidated part from the AMM
+    @return (withdrawn [stable, collateral], debt repaid, debt left, health before, approval)
     """
     approval: bool = self._has_approval(_user)
-    liquidation_discount: uint256 = self.liquidation_discounts[_user]
-    debt: uint256 = 0
-    rate_mul: uint256 = 0
-    debt, rate_mul = self._debt(_user)
+    liquidation_discount: uint256 = self._user_param(_user, LIQUIDATION_DISCOUNT_SHIFT)
+    debt: uint256 = self._debt(_user)[0]
 
     health_before: int256 = self._health(_user, debt, True, liquidation_discount)
     health_limit: uint256 = 0
@@ -1300,6 +1410,83 @@ def liquidate(
     # x decrease in same block -> price down -> bad
     assert xy[0] >= _min_x, "Slippage"
 
+    return xy, debt, final_debt, health_before, approval
+
+
+@internal
+def _save_liquidated(
+    _user: address,
+    _xy: uint256[2],
+    _debt: uint256,
+    _final_debt: uint256,
+    _health_before: int256,
+    _approval: bool,
+):
+    """
+    @notice Store the loan left after a liquidation and log it
+    """
+    self._save_loan(_user, _final_debt, self._rate_mul())
+
+    log IController.Repay(
+        caller=msg.sender, user=_user, collateral_decrease=_xy[1], loan_decrease=_debt
+    )
+    log IController.Liquidate(
+        liquidator=msg.sender,
+        user=_user,
+        collateral_received=_xy[1],
+        borrowed_received=_xy[0],
+        debt=_debt,
+    )
+    if _final_debt == 0:
+        log IController.UserState(
+            user=_user, collateral=0, borrowed=0, debt=0, n1=0, n2=0, liquidation_discount=0
+        )
+        self._remove_from_list(_user)
+    else:
+        liquidation_discount: uint256 = 0
+        if _health_before >= 0:
+            liquidation_discount = self._update_user_liquidation_discount(_user, _approval, _final_debt)
+        else:
+            # Passing new_debt == 0 means the action can end with unhealthy state
+            liquidation_discount = self._update_user_liquidation_discount(_user, _approval, 0)
+
+        xy: uint256[2] = staticcall AMM.get_sum_xy(_user)
+        ns: int256[2] = staticcall AMM.read_user_tick_numbers(_user)  # ns[1] > ns[0]
+        log IController.UserState(
+            user=_user,
+            collateral=xy[1],
+            borrowed=xy[0],
+            debt=_final_debt,
+            n1=ns[0],
+            n2=ns[1],
+            liquidation_discount=liquidation_discount
+        )
+
+
+@external
+def liquidate(
+    _user: address,
+    _min_x: uint256,
+    _frac: uint256 = 10**18,
+    _callbacker: address = empty(address),
+    _calldata: Bytes[CALLDATA_MAX_SIZE] = b"",
+):
+    """
+    @notice Perform a bad liquidation (or self-liquidation) of user if health is not good
+    @param _user Address of the user to liquidate
+    @param _min_x Minimal amount of borrowed asset to receive (to avoid liquidators being sandwiched)
+    @param _frac Fraction to liquidate; 100% = 10**18
+    @param _callbacker Address of the callback contract
+    @param _calldata Any data for callbacker
+    """
+    self._cache_rate_mul()
+    xy: uint256[2] = empty(uint256[2])
+    debt: uint256 = 0
+    final_debt: uint256 = 0
+    health_before: int256 = 0
+    approval: bool = False
+    xy, debt, final_debt, health_before, approval = self._withdraw_liquidated(_user, _min_x, _frac)
+
     min_amm_burn: uint256 = min(xy[0], debt)
 
     tkn.transfer_from(BORROWED_TOKEN, AMM.address, self, min_amm_burn)
@@ -1337,44 +1524,57 @@ def liquidate(
         # xy[0] >= debt
         tkn.transfer_from(BORROWED_TOKEN, AMM.address, msg.sender, unsafe_sub(xy[0], debt))
 
-    self.loan[_user] = IController.Loan(initial_debt=final_debt, rate_mul=rate_mul)
-    self._update_total_debt(debt, rate_mul, False)
+    self._update_total_debt(debt, self._rate_mul(), False)
     self.repaid += debt
     self._save_rate()
 
-    log IController.Repay(
-        caller=msg.sender, user=_user, collateral_decrease=xy[1], loan_decrease=debt
-    )
-    log IController.Liquidate(
-        liquidator=msg.sender,
-        user=_user,
-        collateral_received=xy[1],
-        borrowed_received=xy[0],
-        debt=debt,
-    )
-    if final_debt == 0:
-        log IController.UserState(
-            user=_user, collateral=0, borrowed=0, debt=0, n1=0, n2=0, liquidation_discount=0
+    self._save_liquidated(_user, xy, debt, final_debt, health_before, approval)
+
+
+@external
+def liquidate_many(
+    _users: DynArray[address, MAX_LIQUIDATIONS],
+    _min_x: DynArray[uint256, MAX_LIQUIDATIONS],
+    _fracs: DynArray[uint256, MAX_LIQUIDATIONS],
+):
+    """
+    @notice Liquidate several users in one call, settling tokens once for all of them
+    @dev Every user goes through the same checks as in `liquidate` (without callbacks).
+         The rate is accrued and saved once, and the liquidator pays or receives the net
+         of all liquidations in one borrowed token transfer.
+    @param _users Addresses of the users to liquidate
+    @param _min_x Minimal amount of borrowed asset to receive from each user's bands
+    @param _fracs Fraction to liquidate for each user; 100% = 10**18
+    """
+    assert len(_min_x) == len(_users) and len(_fracs) == len(_users)
+    self._cache_rate_mul()
+
+    total_xy: uint256[2] = empty(uint256[2])
+    total_debt: uint256 = 0
+    for i: uint256 in range(len(_users), bound=MAX_LIQUIDATIONS):
+        xy: uint256[2] = empty(uint256[2])
+        debt: uint256 = 0
+        final_debt: uint256 = 0
+        health_before: int256 = 0
+        approval: bool = False
+        xy, debt, final_debt, health_before, approval = self._withdraw_liquidated(
+            _users[i], _min_x[i], _fracs[i]
         )
-        self._remove_from_list(_user)
+        self._save_liquidated(_users[i], xy, debt, final_debt, health_before, approval)
+        total_xy[0] += xy[0]
+        total_xy[1] += xy[1]
+        total_debt += debt
+
+    tkn.transfer_from(BORROWED_TOKEN, AMM.address, self, total_xy[0])
+    tkn.transfer_from(COLLATERAL_TOKEN, AMM.address, msg.sender, total_xy[1])
+    if total_debt > total_xy[0]:
+        tkn.transfer_from(BORROWED_TOKEN, msg.sender, self, unsafe_sub(total_debt, total_xy[0]))
     else:
-        if health_before >= 0:
-            liquidation_discount = self._update_user_liquidation_discount(_user, approval, final_debt)
-        else:
-            # Passing new_debt == 0 means the action can end with unhealthy state
-            liquidation_discount = self._update_user_liquidation_discount(_user, approval, 0)
+        tkn.transfer(BORROWED_TOKEN, msg.sender, unsafe_sub(total_xy[0], total_debt))
 
-        xy = staticcall AMM.get_sum_xy(_user)
-        ns: int256[2] = staticcall AMM.read_user_tick_numbers(_user)  # ns[1] > ns[0]
-        log IController.UserState(
-            user=_user,
-            collateral=xy[1],
-            borrowed=xy[0],
-            debt=final_debt,
-            n1=ns[0],
-            n2=ns[1],
-            liquidation_discount=liquidation_discount
-        )
+    self._update_total_debt(total_debt, self._rate_mul(), False)
+    self.repaid += total_debt
+    self._save_rate()
 
 
 @external
@@ -1389,7 +1589,7 @@ def tokens_to_liquidate(_user: address, _frac: uint256 = WAD) -> uint256:
     assert _frac <= WAD, "frac>100%"
     health_limit: uint256 = 0
     if not self._has_approval(_user):
-        health_limit = self.liquidation_discounts[_user]
+        health_limit = self._user_param(_user, LIQUIDATION_DISCOUNT_SHIFT)
     borrowed: uint256 = unsafe_div(
         (staticcall AMM.get_sum_xy(_user))[0]
         * self._get_f_remove(_frac, health_limit),
@@ -1411,7 +1611,7 @@ def health(_user: address, _full: bool = False) -> int256:
     @return Health value normalized to 1e18
     """
     return self._health(
-        _user, self._debt(_user)[0], _full, self.liquidation_discounts[_user]
+        _user, self._debt(_user)[0], _full, self._user_param(_user, LIQUIDATION_DISCOUNT_SHIFT)
     )
 
 
@@ -1430,6 +1630,50 @@ def users_to_liquidate(
     return staticcall self._view.users_to_liquidate(_from, _limit)
 
 
+@external
+@view
+def users_to_liquidate_page(
+    _from: uint256 = 0, _limit: uint256 = 0, _gas_reserve: uint256 = 0
+) -> (DynArray[IController.Position, 1000], uint256):
+    """
+    @notice Same scan as users_to_liquidate, also returning where it stopped.
+            Keepers can split a large loan book into ranges and scan them in
+            parallel, resuming each range from the returned cursor.
+    @param _from Loan index to start iteration from
+    @param _limit Number of loans to look over (0 = up to n_loans)
+    @param _gas_reserve Stop before the next loan once less gas than this is
+           left (0 = no gas cutoff). It must cover returning the result.
+    @return Positions which can be "hard-liquidated" and the index of the first
+            loan which was not looked at. The scan is complete once it is n_loans.
+    """
+    return staticcall self._view.users_to_liquidate_page(_from, _limit, _gas_reserve)
+
+
+@external
+@view
+def users_health_page(
+    _from: uint256 = 0,
+    _limit: uint256 = 0,
+    _threshold: int256 = 0,
+    _gas_reserve: uint256 = 0,
+) -> (DynArray[IController.UserHealth, 1000], uint256):
+    """
+    @notice Lighter users_to_liquidate_page: returns only the user and their full
+            health, so the users' balances in the AMM are only read where the
+            health needs them
+    @param _from Loan index to start iteration from
+    @param _limit Number of loans to look over (0 = up to n_loans)
+    @param _threshold Return users with health below this
+    @param _gas_reserve Stop before the next loan once less gas than this is
+           left (0 = no gas cutoff). It must cover returning the result.
+    @return Users with health below _threshold and the index of the first loan
+            which was not looked at
+    """
+    return staticcall self._view.users_health_page(
+        _from, _limit, _threshold, _gas_reserve
+    )
+
+
 @external
 @view
 def user_prices(_user: address) -> uint256[2]:  # Upper, lower
@@ -1515,7 +1759,7 @@ def configure(
 @internal
 @view
 def _admin_fees() -> uint256:
-    return self._stored_admin_fees + self._preview_total_debt(staticcall AMM.get_rate_mul(), self._total_debt)[1]
+    return self._stored_admin_fees + self._preview_total_debt(self._rate_mul(), self._total_debt)[1]
 
 
 @external
@@ -1535,7 +1779,7 @@ def collect_fees() -> uint256:
     @notice Collect the fees charged as interest.
     @return Amount of fees collected and transferred to the fee receiver
     """
-    rate_mul: uint256 = staticcall AMM.get_rate_mul()
+    rate_mul: uint256 = self._cache_rate_mul()
     self._update_total_debt(0, rate_mul, False)
 
     # self._stored_admin_fees == self.admin_fees() after _update_total_debt
@@ -1594,5 +1838,5 @@ def set_extra_health(_value: uint256):
     @param _value 1e18-based addition to loan_discount
     """
     assert _value < WAD, "extra_health too high"
-    self.extra_health[msg.sender] = _value
+    self._save_user_param(msg.sender, EXTRA_HEALTH_SHIFT, _value)
     log IController.SetExtraHealth(user=msg.sender, health=_value)
@@ -47,6 +47,7 @@ exports: (
     core.repay,
     core.set_extra_health,
     core.liquidate,
+    core.liquidate_many,
     core.save_rate,
     core.collect_fees,
     # Related contracts getters
@@ -87,6 +88,8 @@ exports: (
     core.user_prices,
     core.user_state,
     core.users_to_liquidate,
+    core.users_to_liquidate_page,
+    core.users_health_page,
     core.min_collateral,
     core.max_borrowable,
 )
@@ -179,7 +182,7 @@ def configure_lend(_borrow_cap: uint256, _admin_percentage: uint256):
     if _borrow_cap != core.SKIP_CONFIG_UINT256:
         self.borrow_cap = _borrow_cap
     if _admin_percentage != core.SKIP_CONFIG_UINT256:
-        rate_mul: uint256 = staticcall core.AMM.get_rate_mul()
+        rate_mul: uint256 = core._cache_rate_mul()
         core._update_total_debt(0, rate_mul, False)
         core.admin_percentage = _admin_percentage
 
@@ -26,6 +26,8 @@ exports: (
     core.user_state,
     core.user_prices,
     core.users_to_liquidate,
+    core.users_to_liquidate_page,
+    core.users_health_page,
     core.create_loan_health_preview,
     core.add_collateral_health_preview,
     core.remove_collateral_health_preview,
@@ -35,6 +37,16 @@ exports: (
 )
 
 
+struct MarketState:
+    total_debt: uint256
+    borrow_cap: uint256
+    available_balance: uint256
+    admin_fees: uint256
+    cap: uint256
+    max_borrowable: uint256
+    tokens_to_shrink: uint256
+
+
 @deploy
 def __init__(
     _controller: IController,
@@ -93,22 +105,20 @@ def _get_cap() -> uint256:
     """
     @notice Cannot borrow beyond the amount of coins Controller has or beyond borrow_cap
     """
-    total_debt: uint256 = self._total_debt()
-    cap: uint256 = crv_math.sub_or_zero(self._borrow_cap(), total_debt)
-    available_balance: uint256 = crv_math.sub_or_zero(self._available_balance(), self._admin_fees())
+    return self._cap(self._total_debt(), self._borrow_cap(), self._available_balance(), self._admin_fees())
+
+
+@internal
+@pure
+def _cap(_total_debt: uint256, _borrow_cap: uint256, _available_balance: uint256, _admin_fees: uint256) -> uint256:
+    cap: uint256 = crv_math.sub_or_zero(_borrow_cap, _total_debt)
+    available_balance: uint256 = crv_math.sub_or_zero(_available_balance, _admin_fees)
     return min(available_balance, cap)
 
 
-@external
+@internal
 @view
-def max_borrowable(
-    _d_collateral: uint256,
-    _N: uint256,
-    _user: address = empty(address),
-) -> uint256:
-    """
-    @notice Natspec for this function is available in its controller contract
-    """
+def _max_borrowable(_d_collateral: uint256, _N: uint256, _user: address, _cap: uint256) -> uint256:
     user_state: uint256[4] = core._user_state(_user)
     if user_state[1] > 0:  # Can't borrow in soft-liquidation
         return 0
@@ -118,11 +128,24 @@ def max_borrowable(
         N = user_state[3]
 
     return crv_math.sub_or_zero(
-        core._max_borrowable(user_state[0] + _d_collateral, N, self._get_cap() + user_state[2] , _user),
+        core._max_borrowable(user_state[0] + _d_collateral, N, _cap + user_state[2] , _user),
         user_state[2],
     )
 
 
+@external
+@view
+def max_borrowable(
+    _d_collateral: uint256,
+    _N: uint256,
+    _user: address = empty(address),
+) -> uint256:
+    """
+    @notice Natspec for this function is available in its controller contract
+    """
+    return self._max_borrowable(_d_collateral, _N, _user, self._get_cap())
+
+
 @external
 @view
 def tokens_to_shrink(_user: address, _d_collateral: uint256 = 0) -> uint256:
@@ -130,3 +153,36 @@ def tokens_to_shrink(_user: address, _d_collateral: uint256 = 0) -> uint256:
     @notice Natspec for this function is available in its controller contract
     """
     return core._tokens_to_shrink(_user, self._get_cap(), _d_collateral)
+
+
+@external
+@view
+def market_state(
+    _d_collateral: uint256,
+    _N: uint256,
+    _user: address = empty(address),
+) -> MarketState:
+    """
+    @notice Borrowing limits of the market in one call, reading the controller once
+    @dev max_borrowable and tokens_to_shrink are the same as the separate getters with these arguments.
+         tokens_to_shrink is 0 if `_user` has no loan, and reverts the call like tokens_to_shrink
+         does if the loan can't be shrunk
+    @param _d_collateral Collateral to add for max_borrowable and tokens_to_shrink
+    @param _N Number of bands for max_borrowable (ignored if `_user` has a loan)
+    @param _user User whose loan is taken into account (zero if not given)
+    @return MarketState struct
+    """
+    state: MarketState = MarketState(
+        total_debt=self._total_debt(),
+        borrow_cap=self._borrow_cap(),
+        available_balance=self._available_balance(),
+        admin_fees=self._admin_fees(),
+        cap=0,
+        max_borrowable=0,
+        tokens_to_shrink=0,
+    )
+    state.cap = self._cap(state.total_debt, state.borrow_cap, state.available_balance, state.admin_fees)
+    state.max_borrowable = self._max_borrowable(_d_collateral, _N, _user, state.cap)
+    if staticcall core.AMM.has_liquidity(_user):
+        state.tokens_to_shrink = core._tokens_to_shrink(_user, state.cap, _d_collateral)
+    return state
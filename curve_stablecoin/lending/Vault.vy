@@ -197,6 +197,46 @@ def totalAssets() -> uint256:
     return self._total_assets()
 
 
+@external
+@view
+def vault_state(_owner: address = empty(address)) -> IVault.VaultState:
+    """
+    @notice Everything a dashboard shows for the vault (and for `_owner`) in one call
+    @dev Reads the controller and AMM once instead of once per getter. The values are the same as
+         totalAssets, pricePerShare, borrow_apr, lend_apr, maxDeposit, maxWithdraw and maxRedeem
+    @param _owner Share owner for balance, max_withdraw and max_redeem (zero if not given)
+    @return VaultState struct
+    """
+    available: uint256 = staticcall self._controller.available_balance()
+    debt: uint256 = staticcall self._controller.total_debt()
+    admin_fees: uint256 = staticcall self._controller.admin_fees()
+    total_assets: uint256 = available + debt - admin_fees
+    available = crv_math.sub_or_zero(available, admin_fees)
+
+    state: IVault.VaultState = IVault.VaultState(
+        total_assets=total_assets,
+        total_supply=self.totalSupply,
+        price_per_share=self._price_per_share(True, total_assets),
+        borrow_apr=staticcall self._amm.rate() * (365 * 86400),
+        lend_apr=0,
+        total_debt=debt,
+        available_balance=available,
+        max_supply=self.maxSupply,
+        max_deposit=max_value(uint256),
+        balance=self.balanceOf[_owner],
+        max_withdraw=0,
+        max_redeem=0,
+    )
+    if debt != 0:
+        admin_pct: uint256 = staticcall ILendController(self._controller.address).admin_percentage()
+        state.lend_apr = state.borrow_apr * debt // total_assets * (c.WAD - admin_pct) // c.WAD
+    if state.max_supply != max_value(uint256):
+        state.max_deposit = max(state.max_supply, total_assets) - total_assets
+    state.max_withdraw = min(self._convert_to_assets(state.balance, True, total_assets), available)
+    state.max_redeem = min(self._convert_to_shares(available, False, total_assets), state.balance)
+    return state
+
+
 @internal
 @view
 def _convert_to_shares(_assets: uint256, _is_floor: bool = True,
@@ -251,12 +291,26 @@ def pricePerShare(_is_floor: bool = True) -> uint256:
     @param _is_floor If True, round down; if False, round up
     @return Price of one share in asset tokens, normalized to 1e18
     """
+    return self._price_per_share(_is_floor)
+
+
+@internal
+@view
+def _price_per_share(_is_floor: bool, _total_assets: uint256 = max_value(uint256)) -> uint256:
+    """
+    @param _is_floor If True, round down; if False, round up
+    @param _total_assets Override for total assets; uses current value if max_value(uint256)
+    @return Price of one share in asset tokens, normalized to 1e18
+    """
     supply: uint256 = self.totalSupply
     if supply == 0:
         return 10**18 // DEAD_SHARES
     else:
+        total_assets: uint256 = _total_assets
+        if total_assets == max_value(uint256):
+            total_assets = self._total_assets()
         precision: uint256 = self.precision
-        numerator: uint256 = 10**18 * (self._total_assets() * precision + 1)
+        numerator: uint256 = 10**18 * (total_assets * precision + 1)
         denominator: uint256 = (supply + DEAD_SHARES)
         pps: uint256 = 0
         if _is_floor:
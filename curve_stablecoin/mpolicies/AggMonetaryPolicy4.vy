@@ -9,6 +9,12 @@
 
 # This version uses min(last day) debt when calculating per-market rates
 # Should be used for Controllers which update borrow rate too early (not at the end of every call)
+#
+# The total debt is not summed over all controllers on every rate_write. The policy keeps the debt
+# of every controller as it was last read, and the sum of those. rate_write re-reads the debt of
+# the controller it is called for (which calls it after every change of its debt) and of
+# N_DEBT_REFRESH more controllers in turn, so the debt of markets nobody uses still gets their
+# interest added every n_controllers / N_DEBT_REFRESH calls.
 
 from curve_std import ema
 from snekmate.utils import math
@@ -71,6 +77,14 @@ CONTROLLER_FACTORY: public(immutable(ControllerFactory))
 MAX_CONTROLLERS: constant(uint256) = 50000
 n_controllers: public(uint256)
 controllers: public(address[MAX_CONTROLLERS])
+is_controller: public(HashMap[address, bool])
+
+# Debt of each controller when it was last read, and the sum of them
+controller_debt: public(HashMap[address, uint256])
+cached_total_debt: public(uint256)
+# Next controller to re-read in turn
+debt_refresh_ix: public(uint256)
+N_DEBT_REFRESH: constant(uint256) = 2
 
 
 struct DebtCandle:
@@ -200,28 +214,45 @@ def exp(power: int256) -> uint256:
     return convert(math._wad_exp(power), uint256)
 
 
+@internal
+@view
+def read_controller_debt(_controller: address) -> uint256:
+    success: bool = False
+    res: Bytes[32] = empty(Bytes[32])
+    success, res = raw_call(_controller, method_id("total_debt()"), max_outsize=32, is_static_call=True, revert_on_failure=False)
+    return convert(res, uint256)
+
+
+@internal
+def refresh_debt(_controller: address) -> uint256:
+    debt: uint256 = self.read_controller_debt(_controller)
+    self.cached_total_debt = self.cached_total_debt + debt - self.controller_debt[_controller]
+    self.controller_debt[_controller] = debt
+    return debt
+
+
 @internal
 @view
 def get_total_debt(_for: address, ro: bool) -> (uint256, uint256):
-    n_cached_controllers: uint256 = self.n_controllers
-    n_controllers: uint256 = n_cached_controllers
-    if ro:
-        n_controllers = staticcall CONTROLLER_FACTORY.n_collaterals()
-    total_debt: uint256 = 0
+    """
+    Total debt from the cached debts of the controllers, with the current debt of _for.
+    With ro, also adds the debt of controllers added to the factory since the last rate_write.
+    """
+    total_debt: uint256 = self.cached_total_debt
     debt_for: uint256 = 0
+    if self.is_controller[_for]:
+        debt_for = self.read_controller_debt(_for)
+        total_debt = total_debt + debt_for - self.controller_debt[_for]
 
-    for i: uint256 in range(n_controllers, bound=MAX_CONTROLLERS):
-        controller: address = self.controllers[i]
-        if i >= n_cached_controllers:
-            controller = staticcall CONTROLLER_FACTORY.controllers(i)
-
-        success: bool = False
-        res: Bytes[32] = empty(Bytes[32])
-        success, res = raw_call(controller, method_id("total_debt()"), max_outsize=32, is_static_call=True, revert_on_failure=False)
-        debt: uint256 = convert(res, uint256)
-        total_debt += debt
-        if controller == _for:
-            debt_for = debt
+    if ro:
+        n_cached_controllers: uint256 = self.n_controllers
+        n_controllers: uint256 = staticcall CONTROLLER_FACTORY.n_collaterals()
+        for i: uint256 in range(n_cached_controllers, n_controllers, bound=MAX_CONTROLLERS):
+            controller: address = staticcall CONTROLLER_FACTORY.controllers(i)
+            debt: uint256 = self.read_controller_debt(controller)
+            total_debt += debt
+            if controller == _for:
+                debt_for = debt
 
     return total_debt, debt_for
 
@@ -375,16 +406,27 @@ def rate_write(_for: address = msg.sender) -> uint256:
     if n_factory_controllers > n_controllers:
         self.n_controllers = n_factory_controllers
         for i: uint256 in range(MAX_CONTROLLERS):
-            self.controllers[n_controllers] = staticcall CONTROLLER_FACTORY.controllers(n_controllers)
+            controller: address = staticcall CONTROLLER_FACTORY.controllers(n_controllers)
+            self.controllers[n_controllers] = controller
+            self.is_controller[controller] = True
+            self.refresh_debt(controller)
             n_controllers += 1
             if n_controllers >= n_factory_controllers:
                 break
 
-    # Update candles
-    total_debt: uint256 = 0
+    # Update cached debts: _for and the next N_DEBT_REFRESH controllers in turn
     debt_for: uint256 = 0
-    total_debt, debt_for = self.get_total_debt(_for, False)
-    self.save_candle(TOTAL_DEBT_KEY, total_debt)
+    if self.is_controller[_for]:
+        debt_for = self.refresh_debt(_for)
+    if n_controllers > 0:
+        ix: uint256 = self.debt_refresh_ix
+        for _: uint256 in range(N_DEBT_REFRESH):
+            ix = (ix + 1) % n_controllers
+            self.refresh_debt(self.controllers[ix])
+        self.debt_refresh_ix = ix
+
+    # Update candles
+    self.save_candle(TOTAL_DEBT_KEY, self.cached_total_debt)
     self.save_candle(_for, debt_for)
 
     rate: uint256 = 0
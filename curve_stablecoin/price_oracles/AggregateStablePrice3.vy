@@ -104,6 +104,7 @@ def add_price_pair(_pool: Stableswap):
     self.price_pairs[n] = price_pair  # Should revert if too many pairs
     self.last_tvl[n] = _pool.totalSupply()
     self.n_price_pairs = n + 1
+    self._refresh_last_price()
     log AddPricePair(n, _pool, price_pair.is_inverse)
 
 
@@ -118,6 +119,7 @@ def remove_price_pair(n: uint256):
         self.last_tvl[n] = self.last_tvl[n_max]
         log MovePricePair(n_max, n)
     self.n_price_pairs = n_max
+    self._refresh_last_price()
     log RemovePricePair(n)
 
 
@@ -170,16 +172,16 @@ def _ema_tvl() -> DynArray[uint256, MAX_PAIRS]:
     for i in range(MAX_PAIRS):
         if i == n_price_pairs:
             break
+        price_pair: PricePair = self.price_pairs[i]
         tvl: uint256 = 0
-        if self.price_pairs[i].is_ng:
-            tvl = self.price_pairs[i].pool.D_oracle()
+        if price_pair.is_ng:
+            tvl = price_pair.pool.D_oracle()
         else:
             tvl = self.last_tvl[i]
             if alpha != 10**18:
                 # alpha = 1.0 when dt = 0
                 # alpha = 0.0 when dt = inf
-                new_tvl: uint256 = self.price_pairs[i].pool.totalSupply() * 10**18 /\
-                    self.price_pairs[i].pool.get_virtual_price()
+                new_tvl: uint256 = price_pair.pool.totalSupply() * 10**18 / price_pair.pool.get_virtual_price()
                 tvl = (new_tvl * (10**18 - alpha) + tvl * alpha) / 10**18
         tvls.append(tvl)
 
@@ -228,26 +230,41 @@ def _price(tvls: DynArray[uint256, MAX_PAIRS]) -> uint256:
     p_avg: uint256 = DPsum / Dsum
     e: uint256[MAX_PAIRS] = empty(uint256[MAX_PAIRS])
     e_min: uint256 = max_value(uint256)
+    sigma2: uint256 = SIGMA**2 / 10**18
     for i in range(MAX_PAIRS):
         if i == n:
             break
         p: uint256 = prices[i]
-        e[i] = (max(p, p_avg) - min(p, p_avg))**2 / (SIGMA**2 / 10**18)
+        e[i] = (max(p, p_avg) - min(p, p_avg))**2 / sigma2
         e_min = min(e[i], e_min)
     wp_sum: uint256 = 0
     w_sum: uint256 = 0
     for i in range(MAX_PAIRS):
         if i == n:
             break
+        # Pairs below MIN_LIQUIDITY have zero weight whatever their exponent
+        if D[i] == 0:
+            continue
         w: uint256 = D[i] * self.exp(-convert(e[i] - e_min, int256)) / 10**18
         w_sum += w
         wp_sum += w * prices[i]
     return wp_sum / w_sum
 
 
+@internal
+def _refresh_last_price():
+    # Pairs changed after price_w already ran in this block
+    if self.last_timestamp == block.timestamp:
+        self.last_price = self._price(self._ema_tvl())
+
+
 @external
 @view
 def price() -> uint256:
+    # Once price_w has folded the TVLs in for this block, neither they nor the pool
+    # oracles move until the next one, so the stored price is the exact result
+    if self.last_timestamp == block.timestamp:
+        return self.last_price
     return self._price(self._ema_tvl())
 
 
@@ -43,6 +43,8 @@ DOWNTIME_WAIT: public(constant(uint256)) = 3988  # 866 * log(100) s
 
 cached_timestamp: public(uint256)
 cached_rate: public(uint256)
+# Price returned by price_w in the current block, packed as price << 64 | block.timestamp
+cached_price: uint256
 
 
 @external
@@ -195,12 +197,31 @@ def _unscaled_price() -> uint256:
     return _price
 
 
+@internal
+@view
+def _cached_price() -> uint256:
+    # Pool oracles and the rate limiter do not move within a block
+    # once price_w has run, so the price it saved stays exact until the next block
+    cached: uint256 = self.cached_price
+    if cached & (2**64 - 1) == block.timestamp:
+        return cached >> 64
+    return 0
+
+
 @external
 @view
 def price() -> uint256:
-    return self._unscaled_price() * self._stored_rate() / 10**18
+    p: uint256 = self._cached_price()
+    if p == 0:
+        p = self._unscaled_price() * self._stored_rate() / 10**18
+    return p
 
 
 @external
 def price_w() -> uint256:
-    return self._unscaled_price() * self._stored_rate_w() / 10**18
+    p: uint256 = self._cached_price()
+    if p == 0:
+        p = self._unscaled_price() * self._stored_rate_w() / 10**18
+        if p < 2**192:
+            self.cached_price = p << 64 | block.timestamp
+    return p
@@ -0,0 +1,38 @@
+# pragma version 0.4.3
+
+"""
+@title MockStoredRatesPool
+@notice Minimal stand-in for a Curve pool as the CryptoFromPools* oracles read it:
+        `coins(i)` reverts past the last coin, `price_oracle(i)` and `stored_rates()`
+        return settable values.
+"""
+
+MAX_COINS: constant(uint256) = 8
+
+coins: public(DynArray[address, MAX_COINS])
+price_oracle: public(DynArray[uint256, MAX_COINS - 1])
+rates: DynArray[uint256, MAX_COINS]
+
+
+@deploy
+def __init__(_prices: DynArray[uint256, MAX_COINS - 1], _rates: DynArray[uint256, MAX_COINS]):
+    self.price_oracle = _prices
+    self.rates = _rates
+    for i: uint256 in range(len(_prices) + 1, bound=MAX_COINS):
+        self.coins.append(empty(address))
+
+
+@external
+@view
+def stored_rates() -> DynArray[uint256, MAX_COINS]:
+    return self.rates
+
+
+@external
+def set_price(_i: uint256, _price: uint256):
+    self.price_oracle[_i] = _price
+
+
+@external
+def set_rates(_rates: DynArray[uint256, MAX_COINS]):
+    self.rates = _rates
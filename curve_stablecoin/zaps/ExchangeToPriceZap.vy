@@ -0,0 +1,72 @@
+# pragma version 0.4.3
+
+"""
+@title LlamaLendExchangeToPriceZap
+@author Curve.Fi
+@license Copyright (c) Curve.Fi, 2020-2026 - all rights reserved
+@notice Trades an AMM to a target price in one call: the amount is quoted with
+        get_amount_for_price and exchanged in the same transaction, so no other
+        trade can get in between. The exchange walks the bands that the quote
+        has just read, which are warm by then.
+"""
+
+from curve_std.interfaces import IERC20
+from curve_stablecoin.interfaces import IAMM
+from curve_std import token as tkn
+
+
+event ExchangeToPrice:
+    amm: indexed(IAMM)
+    buyer: indexed(address)
+    p: uint256
+    is_pump: bool
+    in_amount: uint256
+    out_amount: uint256
+
+
+@external
+def exchange_to_price(
+    _amm: IAMM,
+    _p: uint256,
+    _max_in: uint256,
+    _min_out: uint256,
+    _for: address = msg.sender,
+) -> (uint256, uint256, bool):
+    """
+    @notice Exchange the amount get_amount_for_price(_p) quotes, selling borrowed token
+            if the AMM price is below _p and collateral otherwise
+    @param _amm AMM to trade in
+    @param _p Target price, in units of borrowed token per collateral multiplied by 1e18
+    @param _max_in Maximum amount of the input coin to spend
+    @param _min_out Minimal amount of the output coin to get
+    @param _for Address to send the output coin to
+    @return (in_amount, out_amount, is_pump) where is_pump means borrowed token was sold
+    """
+    amount: uint256 = 0
+    is_pump: bool = False
+    amount, is_pump = staticcall _amm.get_amount_for_price(_p)
+    assert amount <= _max_in, "Slippage"
+
+    i: uint256 = 1
+    if is_pump:
+        i = 0
+    in_coin: IERC20 = IERC20(staticcall _amm.coins(i))
+
+    tkn.transfer_from(in_coin, msg.sender, self, amount)
+    tkn.max_approve(in_coin, _amm.address)
+    amounts: uint256[2] = extcall _amm.exchange(i, 1 - i, amount, _min_out, _for)
+
+    # The AMM can take less than quoted if it runs out of liquidity
+    if amounts[0] < amount:
+        tkn.transfer(in_coin, msg.sender, unsafe_sub(amount, amounts[0]))
+
+    log ExchangeToPrice(
+        amm=_amm,
+        buyer=msg.sender,
+        p=_p,
+        is_pump=is_pump,
+        in_amount=amounts[0],
+        out_amount=amounts[1],
+    )
+
+    return amounts[0], amounts[1], is_pump
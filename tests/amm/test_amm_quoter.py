@@ -0,0 +1,97 @@
+"""The bisection quoter must give the same answers as the AMM's own views.
+
+Like the reference model tests, quotes are compared with `==`: one snapshot is
+taken per state and then asked for many amounts and prices.
+"""
+
+import boa
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from tests.utils import mint_for_testing
+from tests.utils.amm_quoter import AMMQuoter
+from tests.utils.amm_reference import AMMModel
+
+
+@given(
+    amounts=st.lists(
+        st.integers(min_value=10**6, max_value=10**24), min_size=3, max_size=3
+    ),
+    ns=st.lists(st.integers(min_value=-10, max_value=30), min_size=3, max_size=3),
+    dns=st.lists(st.integers(min_value=0, max_value=20), min_size=3, max_size=3),
+    trades=st.lists(
+        st.tuples(st.booleans(), st.integers(min_value=1, max_value=10**25)),
+        max_size=3,
+    ),
+    oracle_move=st.floats(min_value=0.9, max_value=1.1),
+    quotes=st.lists(
+        st.integers(min_value=1, max_value=10**26), min_size=5, max_size=5
+    ),
+)
+@settings(max_examples=100)
+def test_quotes_match_amm(
+    amm,
+    collateral_token,
+    borrowed_token,
+    price_oracle,
+    admin,
+    amounts,
+    ns,
+    dns,
+    trades,
+    oracle_move,
+    quotes,
+):
+    depositors = [boa.env.generate_address(f"depositor{i}") for i in range(3)]
+    trader = boa.env.generate_address("trader")
+    collateral_precision = 10 ** (18 - collateral_token.decimals())
+    borrowed_precision = 10 ** (18 - borrowed_token.decimals())
+
+    with boa.env.prank(admin):
+        for user, amount, n1, dn in zip(depositors, amounts, ns, dns):
+            amount //= collateral_precision
+            if amount * collateral_precision // (dn + 1) <= 100:
+                continue
+            amm.deposit_range(user, amount, n1, n1 + dn)
+            mint_for_testing(collateral_token, amm.address, amount)
+
+    with boa.env.prank(trader):
+        collateral_token.approve(amm.address, 2**256 - 1)
+        borrowed_token.approve(amm.address, 2**256 - 1)
+        for pump, amount in trades:
+            i, j = (0, 1) if pump else (1, 0)
+            in_token = borrowed_token if pump else collateral_token
+            in_precision = borrowed_precision if pump else collateral_precision
+            mint_for_testing(in_token, trader, amount // in_precision)
+            amm.exchange(i, j, amount // in_precision, 0)
+
+    with boa.env.prank(admin):
+        price_oracle.set_price(int(price_oracle.price() * oracle_move))
+
+    quoter = AMMQuoter.from_contract(amm)
+    model = AMMModel.from_contract(amm)
+
+    for i, j in [(0, 1), (1, 0)]:
+        in_precision = borrowed_precision if i == 0 else collateral_precision
+        out_precision = collateral_precision if i == 0 else borrowed_precision
+        for amount in quotes:
+            assert quoter.get_dxdy(i, j, amount // in_precision) == amm.get_dxdy(
+                i, j, amount // in_precision
+            )
+            assert quoter.get_dydx(i, j, amount // out_precision) == amm.get_dydx(
+                i, j, amount // out_precision
+            )
+
+    p_o = amm.price_oracle()
+    for p in [p_o // 2, p_o * 99 // 100, amm.get_p(), p_o * 101 // 100, p_o * 2]:
+        assert quoter.get_amount_for_price(p) == amm.get_amount_for_price(p)
+
+    # The walk is shared by every quote: sweep far more amounts against the model
+    for e in range(6, 27):
+        for amount in [10**e, 3 * 10**e, 10**e - 1]:
+            for i, j in [(0, 1), (1, 0)]:
+                assert quoter.get_dxdy(i, j, amount) == model.get_dxdy(i, j, amount)
+                assert quoter.get_dydx(i, j, amount) == model.get_dydx(i, j, amount)
+    for k in range(1, 200):
+        p = p_o * k // 100
+        assert quoter.get_amount_for_price(p) == model.get_amount_for_price(p)
@@ -0,0 +1,161 @@
+"""Differential tests: the pure-Python LLAMMA model must agree with AMM.vy exactly.
+
+Every quote and every post-trade band is compared with `==`, not approx: the
+reference is only useful for off-chain sweeps if it is bit-identical.
+"""
+
+import boa
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from tests.utils import mint_for_testing
+from tests.utils import amm_reference as ref
+from tests.utils.constants import DEAD_SHARES, MAX_TICKS, WAD
+from tests.utils.deployers import AMM_DEPLOYER, CONSTANTS_DEPLOYER
+
+
+def assert_model_matches(model, amm, users):
+    assert model.active_band == amm.active_band()
+    assert model.min_band == amm.min_band()
+    assert model.max_band == amm.max_band()
+    assert model.price_oracle() == amm.price_oracle()
+    assert model.get_p() == amm.get_p()
+    for n in range(model.min_band - 2, model.max_band + 3):
+        assert model.bands_x(n) == amm.bands_x(n)
+        assert model.bands_y(n) == amm.bands_y(n)
+        assert model.p_oracle_up(n) == amm.p_oracle_up(n)
+    for user in users:
+        assert model.read_user_tick_numbers(user) == list(
+            amm.read_user_tick_numbers(user)
+        )
+        assert model.get_sum_xy(user) == list(amm.get_sum_xy(user))
+        assert model.get_y_up(user) == amm.get_y_up(user)
+        assert model.get_x_down(user) == amm.get_x_down(user)
+
+
+def test_constants():
+    assert ref.WAD == WAD
+    assert ref.DEAD_SHARES == DEAD_SHARES
+    assert ref.MAX_TICKS == MAX_TICKS
+    assert ref.MAX_SKIP_TICKS == CONSTANTS_DEPLOYER._constants.MAX_SKIP_TICKS
+    assert ref.PREV_P_O_DELAY == AMM_DEPLOYER._constants.PREV_P_O_DELAY
+    assert ref.MAX_P_O_CHG == AMM_DEPLOYER._constants.MAX_P_O_CHG
+
+
+def test_immutables(amm):
+    model = ref.AMMModel.from_contract(amm)
+    assert model.LOG_A_RATIO == amm.eval("LOG_A_RATIO")
+    assert model.MAX_ORACLE_DN_POW == amm.eval("MAX_ORACLE_DN_POW")
+
+
+@given(
+    amounts=st.lists(
+        st.integers(min_value=10**6, max_value=10**24), min_size=3, max_size=3
+    ),
+    ns=st.lists(st.integers(min_value=-10, max_value=30), min_size=3, max_size=3),
+    dns=st.lists(st.integers(min_value=0, max_value=20), min_size=3, max_size=3),
+    trades=st.lists(
+        st.tuples(
+            st.booleans(),  # pump
+            st.booleans(),  # exact-in
+            st.integers(min_value=1, max_value=10**25),
+            st.floats(min_value=0.9, max_value=1.1),  # oracle move
+            st.integers(min_value=0, max_value=300),  # seconds elapsed
+        ),
+        min_size=1,
+        max_size=5,
+    ),
+)
+@settings(max_examples=200)
+def test_differential(
+    amm,
+    collateral_token,
+    borrowed_token,
+    price_oracle,
+    admin,
+    amounts,
+    ns,
+    dns,
+    trades,
+):
+    depositors = [boa.env.generate_address(f"depositor{i}") for i in range(3)]
+    trader = boa.env.generate_address("trader")
+    collateral_precision = 10 ** (18 - collateral_token.decimals())
+    borrowed_precision = 10 ** (18 - borrowed_token.decimals())
+
+    with boa.env.prank(admin):
+        for user, amount, n1, dn in zip(depositors, amounts, ns, dns):
+            amount //= collateral_precision
+            if amount * collateral_precision // (dn + 1) <= 100:
+                continue
+            amm.deposit_range(user, amount, n1, n1 + dn)
+            mint_for_testing(collateral_token, amm.address, amount)
+
+    model = ref.AMMModel.from_contract(amm, depositors)
+    assert_model_matches(model, amm, depositors)
+
+    with boa.env.prank(trader):
+        collateral_token.approve(amm.address, 2**256 - 1)
+        borrowed_token.approve(amm.address, 2**256 - 1)
+
+    for pump, exact_in, amount, oracle_move, dt in trades:
+        boa.env.time_travel(seconds=dt)
+        model.timestamp += dt
+        with boa.env.prank(admin):
+            price_oracle.set_price(int(price_oracle.price() * oracle_move))
+        model.raw_oracle_price = price_oracle.price()
+
+        i, j = (0, 1) if pump else (1, 0)
+        in_precision = borrowed_precision if pump else collateral_precision
+        out_precision = collateral_precision if pump else borrowed_precision
+        assert model.get_dxdy(i, j, amount // in_precision) == amm.get_dxdy(
+            i, j, amount // in_precision
+        )
+        assert model.get_dydx(i, j, amount // out_precision) == amm.get_dydx(
+            i, j, amount // out_precision
+        )
+        p_target = amm.price_oracle() * (2 if pump else 1) // (1 if pump else 2)
+        assert model.get_amount_for_price(p_target) == amm.get_amount_for_price(
+            p_target
+        )
+
+        in_token = borrowed_token if pump else collateral_token
+        mint_for_testing(in_token, trader, 10**30)
+        with boa.env.prank(trader):
+            if exact_in:
+                expected = model.exchange(i, j, amount // in_precision)
+                assert expected == amm.exchange(i, j, amount // in_precision, 0)
+            else:
+                # Asking for more than the AMM holds reverts in both
+                try:
+                    expected = model.exchange_dy(i, j, amount // out_precision)
+                except AssertionError as e:
+                    assert str(e) == "Slippage"
+                    with boa.reverts("Slippage"):
+                        amm.exchange_dy(i, j, amount // out_precision, 2**256 - 1)
+                else:
+                    assert expected == amm.exchange_dy(
+                        i, j, amount // out_precision, 2**256 - 1
+                    )
+
+        assert model.old_p_o == amm.eval("self.old_p_o")
+        assert model.old_dfee == amm.eval("self.old_dfee")
+        assert_model_matches(model, amm, depositors)
+
+    with boa.env.prank(admin):
+        for user in depositors:
+            if model.has_liquidity(user):
+                assert model.withdraw(user, WAD // 2) == list(
+                    amm.withdraw(user, WAD // 2)
+                )
+    assert_model_matches(model, amm, depositors)
+
+
+def test_empty_amm_quotes(amm):
+    model = ref.AMMModel.from_contract(amm)
+    assert model.get_dxdy(0, 1, 10**18) == amm.get_dxdy(0, 1, 10**18)
+    assert model.get_dxdy(1, 0, 10**18) == amm.get_dxdy(1, 0, 10**18)
+    assert model.get_amount_for_price(10**18) == amm.get_amount_for_price(10**18)
+    with pytest.raises(AssertionError, match="Wrong index"):
+        model.get_dy(0, 0, 1)
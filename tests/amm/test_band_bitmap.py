@@ -0,0 +1,144 @@
+import boa
+from hypothesis import given, settings
+from hypothesis import strategies as st
+from tests.utils import mint_for_testing
+from tests.utils.constants import MAX_SKIP_TICKS
+
+
+def bitmap_word(amm, word_n):
+    return amm.eval(f"self.band_bitmap[{word_n}]")
+
+
+def read_bands(amm, ranges):
+    """(x, y) of the non-empty bands: only deposited ranges can hold liquidity."""
+    bands = {}
+    for n1, n2 in ranges:
+        for n in range(n1, n2 + 1):
+            x, y = amm.bands_x(n), amm.bands_y(n)
+            if x > 0 or y > 0:
+                bands[n] = (x, y)
+    return bands
+
+
+def can_skip_bands(bands, n, n_end):
+    """Band-by-band walk which AMM.can_skip_bands used to do. None means 'Too deep'."""
+    for _ in range(MAX_SKIP_TICKS):
+        if n_end > n:
+            if bands.get(n, (0, 0))[1] != 0:
+                return False
+            n += 1
+        else:
+            if bands.get(n, (0, 0))[0] != 0:
+                return False
+            n -= 1
+        if n == n_end:
+            return True
+    return None
+
+
+def active_band_with_skip(bands, n0, min_band):
+    n = n0
+    for _ in range(MAX_SKIP_TICKS):
+        if n < min_band:
+            return n0 - MAX_SKIP_TICKS
+        if bands.get(n, (0, 0))[0] != 0:
+            break
+        n -= 1
+    return n
+
+
+def check_bitmap(amm, ranges):
+    """Bits are set exactly for the non-empty bands, and they can only be in `ranges`."""
+    bands = read_bands(amm, ranges)
+    expected = {}
+    for n in bands:
+        expected[n >> 8] = expected.get(n >> 8, 0) | 1 << (n % 256)
+    words = {n >> 8 for n1, n2 in ranges for n in (n1 - 1, n1, n2, n2 + 1)}
+    for word_n in words | expected.keys():
+        assert bitmap_word(amm, word_n) == expected.get(word_n, 0), word_n
+
+    assert amm.active_band_with_skip() == active_band_with_skip(
+        bands, amm.active_band(), amm.min_band()
+    )
+    return bands
+
+
+@given(
+    # Spread over several bitmap words, on both sides of zero
+    ns=st.lists(st.integers(min_value=-300, max_value=700), min_size=4, max_size=4),
+    dns=st.lists(st.integers(min_value=0, max_value=49), min_size=4, max_size=4),
+    amounts=st.lists(
+        st.integers(min_value=10**17, max_value=10**21), min_size=4, max_size=4
+    ),
+    trade_fracs=st.lists(
+        st.floats(min_value=0.01, max_value=1.0), min_size=2, max_size=2
+    ),
+    withdraw_fracs=st.lists(
+        st.integers(min_value=0, max_value=10**18), min_size=4, max_size=4
+    ),
+)
+@settings(max_examples=50)
+def test_band_bitmap(
+    amm,
+    price_oracle,
+    admin,
+    collateral_token,
+    borrowed_token,
+    ns,
+    dns,
+    amounts,
+    trade_fracs,
+    withdraw_fracs,
+):
+    trader = boa.env.generate_address("trader")
+    borrowed_token.approve(amm, 2**256 - 1, sender=trader)
+    depositors = [boa.env.generate_address(f"depositor{i}") for i in range(4)]
+    ranges = [(n1, n1 + dn) for n1, dn in zip(ns, dns)]
+
+    with boa.env.prank(admin):
+        for depositor, amount, n1, dn in zip(depositors, amounts, ns, dns):
+            amount = amount // 10 ** (18 - collateral_token.decimals())
+            try:
+                amm.deposit_range(depositor, amount, n1, n1 + dn)
+            except boa.BoaError:
+                # Overlaps converted bands or too far below the active band
+                continue
+            mint_for_testing(collateral_token, amm.address, amount)
+    check_bitmap(amm, ranges)
+
+    # Move the oracle to the lowest deposit so that trades walk over empty bands
+    with boa.env.prank(admin):
+        price_oracle.set_price(amm.p_oracle_down(max(ns)))
+    boa.env.time_travel(3600)
+
+    for frac in trade_fracs:
+        amount = int(frac * 10**6) * 10 ** borrowed_token.decimals()
+        mint_for_testing(borrowed_token, trader, amount)
+        amm.exchange(0, 1, amount, 0, sender=trader)
+        check_bitmap(amm, ranges)
+
+    with boa.env.prank(admin):
+        for depositor, frac in zip(depositors, withdraw_fracs):
+            if amm.has_liquidity(depositor):
+                amm.withdraw(depositor, frac)
+    bands = check_bitmap(amm, ranges)
+
+    n0 = amm.active_band()
+    for n_end in [
+        n0 - MAX_SKIP_TICKS - 1,
+        n0 - MAX_SKIP_TICKS,
+        n0 - 257,
+        n0 - 1,
+        n0,
+        n0 + 1,
+        n0 + 256,
+        n0 + MAX_SKIP_TICKS,
+        n0 + MAX_SKIP_TICKS + 1,
+        *ns,
+    ]:
+        expected = can_skip_bands(bands, n0, n_end)
+        if expected is None:
+            with boa.reverts("Too deep"):
+                amm.can_skip_bands(n_end)
+        else:
+            assert amm.can_skip_bands(n_end) == expected
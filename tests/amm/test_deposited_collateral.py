@@ -0,0 +1,80 @@
+import boa
+from hypothesis import given, settings
+from hypothesis import strategies as st
+from tests.utils import mint_for_testing
+
+
+def check_deposited_collateral(amm, collateral_token, depositors):
+    """deposited_collateral is a lower bound for the collateral of users whose bands no trade reached."""
+    precision = 10 ** (18 - collateral_token.decimals())
+    max_traded_band = amm.max_traded_band()
+    assert amm.active_band() <= max_traded_band
+    for depositor in depositors:
+        deposited = amm.deposited_collateral(depositor)
+        if not amm.has_liquidity(depositor):
+            assert deposited == 0
+            continue
+        n1, n2 = amm.read_user_tick_numbers(depositor)
+        if n1 > max_traded_band and deposited > 0:
+            assert deposited // precision <= amm.get_sum_xy(depositor)[1]
+
+
+@given(
+    # Deposits overlap each other so that they round each other's shares
+    ns=st.lists(st.integers(min_value=10, max_value=40), min_size=6, max_size=6),
+    dns=st.lists(st.integers(min_value=0, max_value=20), min_size=6, max_size=6),
+    amounts=st.lists(
+        st.integers(min_value=10**15, max_value=10**21), min_size=6, max_size=6
+    ),
+    trade_frac=st.floats(min_value=0.0, max_value=1.0),
+    withdraw_fracs=st.lists(
+        st.integers(min_value=0, max_value=10**18), min_size=6, max_size=6
+    ),
+)
+@settings(max_examples=50)
+def test_deposited_collateral(
+    amm,
+    price_oracle,
+    admin,
+    collateral_token,
+    borrowed_token,
+    ns,
+    dns,
+    amounts,
+    trade_frac,
+    withdraw_fracs,
+):
+    trader = boa.env.generate_address("trader")
+    borrowed_token.approve(amm, 2**256 - 1, sender=trader)
+    depositors = [boa.env.generate_address(f"depositor{i}") for i in range(6)]
+    precision = 10 ** (18 - collateral_token.decimals())
+
+    with boa.env.prank(admin):
+        for depositor, amount, n1, dn in zip(depositors, amounts, ns, dns):
+            amount = amount // precision
+            try:
+                amm.deposit_range(depositor, amount, n1, n1 + dn)
+            except boa.BoaError:
+                # Amount too low for the number of bands
+                continue
+            mint_for_testing(collateral_token, amm.address, amount)
+            # Right after the deposit it is exactly what get_sum_xy has
+            deposited = amm.deposited_collateral(depositor)
+            assert deposited // precision == amm.get_sum_xy(depositor)[1]
+    check_deposited_collateral(amm, collateral_token, depositors)
+
+    # A trade into the deposits only invalidates the bands it reaches
+    with boa.env.prank(admin):
+        price_oracle.set_price(amm.p_oracle_down(25))
+    boa.env.time_travel(3600)
+    amount = int(trade_frac * 10**5) * 10 ** borrowed_token.decimals()
+    mint_for_testing(borrowed_token, trader, amount)
+    amm.exchange(0, 1, amount, 0, sender=trader)
+    check_deposited_collateral(amm, collateral_token, depositors)
+
+    with boa.env.prank(admin):
+        for depositor, frac in zip(depositors, withdraw_fracs):
+            if amm.has_liquidity(depositor):
+                amm.withdraw(depositor, frac)
+                assert amm.deposited_collateral(depositor) == 0
+    check_deposited_collateral(amm, collateral_token, depositors)
@@ -0,0 +1,86 @@
+import boa
+import pytest
+from tests.utils import mint_for_testing
+from tests.utils.deployers import EXCHANGE_TO_PRICE_ZAP_DEPLOYER
+
+
+@pytest.fixture(scope="module")
+def zap():
+    return EXCHANGE_TO_PRICE_ZAP_DEPLOYER.deploy()
+
+
+@pytest.fixture(scope="module")
+def trader(amm, zap, collateral_token, borrowed_token):
+    _trader = boa.env.generate_address("trader")
+    with boa.env.prank(_trader):
+        for spender in (amm, zap):
+            collateral_token.approve(spender, 2**256 - 1)
+            borrowed_token.approve(spender, 2**256 - 1)
+    return _trader
+
+
+@pytest.fixture(scope="module")
+def deposited(amm, admin, collateral_token, borrowed_token, price_oracle, trader):
+    """Bands 5..14 with the oracle and the AMM price inside band 10."""
+    depositor = boa.env.generate_address("depositor")
+    amount = 10 * 10 ** collateral_token.decimals()
+    with boa.env.prank(admin):
+        amm.deposit_range(depositor, amount, 5, 14)
+        mint_for_testing(collateral_token, amm.address, amount)
+        price_oracle.set_price(amm.p_oracle_up(10) * 995 // 1000)
+    boa.env.time_travel(3600)
+
+    amount, is_pump = amm.get_amount_for_price(price_oracle.price())
+    i = 0 if is_pump else 1
+    mint_for_testing([borrowed_token, collateral_token][i], trader, amount)
+    amm.exchange(i, 1 - i, amount, 0, sender=trader)
+    assert amm.active_band() == 10
+
+
+@pytest.mark.parametrize("p_frac", [0.97, 0.995, 1.005, 1.03])
+def test_exchange_to_price(
+    amm, zap, trader, deposited, collateral_token, borrowed_token, p_frac
+):
+    p = int(amm.get_p() * p_frac)
+    amount, is_pump = amm.get_amount_for_price(p)
+    assert is_pump == (p_frac > 1)
+    in_coin, out_coin = (borrowed_token, collateral_token)
+    if not is_pump:
+        in_coin, out_coin = out_coin, in_coin
+    i = 0 if is_pump else 1
+    mint_for_testing(in_coin, trader, amount)
+
+    # Same as quoting and exchanging in two calls
+    with boa.env.anchor():
+        expected = amm.exchange(i, 1 - i, amount, 0, sender=trader)
+        expected_p = amm.get_p()
+
+    in_before = in_coin.balanceOf(trader)
+    out_before = out_coin.balanceOf(trader)
+    assert zap.exchange_to_price(amm, p, amount, 0, sender=trader) == (
+        *expected,
+        is_pump,
+    )
+    assert amm.get_p() == expected_p
+    assert in_coin.balanceOf(trader) == in_before - expected[0]
+    assert out_coin.balanceOf(trader) == out_before + expected[1]
+    assert in_coin.balanceOf(zap) == 0
+    assert out_coin.balanceOf(zap) == 0
+
+
+def test_slippage(amm, zap, trader, deposited, borrowed_token):
+    p = amm.p_current_up(10)
+    amount, is_pump = amm.get_amount_for_price(p)
+    assert is_pump
+    mint_for_testing(borrowed_token, trader, amount)
+
+    with boa.reverts("Slippage"):
+        zap.exchange_to_price(amm, p, amount - 1, 0, sender=trader)
+    out_amount = amm.get_dy(0, 1, amount)
+    with boa.reverts("Slippage"):
+        zap.exchange_to_price(amm, p, amount, out_amount + 1, sender=trader)
+    assert zap.exchange_to_price(amm, p, amount, out_amount, sender=trader) == (
+        amount,
+        out_amount,
+        True,
+    )
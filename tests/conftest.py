@@ -1,3 +1,4 @@
+import os
 from datetime import timedelta
 
 import boa
@@ -9,6 +10,7 @@ from tests.utils.deployers import (
     FAKE_LEVERAGE_DEPLOYER,
     DUMMY_CALLBACK_DEPLOYER,
 )
+from tests.fuzz.farm import FuzzFarm
 from tests.utils.protocols import Llamalend
 
 boa.env.enable_fast_mode()
@@ -33,9 +35,18 @@ settings.register_profile(
 settings.load_profile("no-shrink")
 
 
+@pytest.fixture(scope="session", autouse=True)
+def proto_snapshot():
+    """Protocol deployed once per session (i.e. per xdist worker).
+    Autouse so that it is set up before any module fixture: boa's fixture
+    isolation then rolls each module back to this state on teardown.
+    """
+    return Llamalend.cached()
+
+
 @pytest.fixture(scope="module")
-def proto():
-    return Llamalend()
+def proto(proto_snapshot):
+    return proto_snapshot
 
 
 @pytest.fixture(scope="module")
@@ -298,3 +309,16 @@ def borrowed_decimals(request):
 @pytest.fixture(scope="session")
 def token_mock():
     return ERC20_MOCK_DEPLOYER
+
+
+# ============== Fuzz Farm ==============
+
+
+@pytest.fixture(scope="session")
+def fuzz_farm():
+    """Runs shards of stateful fuzzers, see `tests/fuzz/farm.py`."""
+    farm = FuzzFarm()
+    yield farm
+    path = os.environ.get("FUZZ_REPORT")
+    if path:
+        farm.dump(path)
@@ -0,0 +1,208 @@
+"""
+Sharded runs of the big stateful fuzzers.
+
+`tests/lending/test_bigfuzz.py` and `tests/stableborrow/test_bigfuzz.py` check
+the protocol invariants with long hypothesis state machines. `FuzzFarm.run`
+runs one shard of such a machine:
+
+* every shard has its own seed (`FUZZ_SEED` + shard number), so the shards
+  which xdist spreads over its workers explore different examples;
+* the chain is rolled back with `boa.env.anchor` after every example, so all
+  examples start from the market the fixtures built, without rebuilding it;
+* all shards share one example database (`FUZZ_DB`, `.hypothesis/farm` by
+  default): a failure found by one shard is replayed first by every shard of
+  every later run;
+* the calls and time of every rule are counted.
+
+The number of shards is `FUZZ_SHARDS`. With `FUZZ_REPORT=<path>` set, the
+counts are written to `<path>` as JSON (one file per xdist worker, like the
+gas reports). Typical use:
+
+    FUZZ_SHARDS=16 FUZZ_REPORT=fuzz.json pytest -n 16 tests/stableborrow/test_bigfuzz.py -k big_fuzz
+    python -m tests.fuzz.farm fuzz.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from collections import defaultdict
+from dataclasses import replace
+from functools import wraps
+from pathlib import Path
+from time import perf_counter
+
+import boa
+from hypothesis import seed
+from hypothesis import settings as Settings
+from hypothesis.database import DirectoryBasedExampleDatabase
+from hypothesis.stateful import RULE_MARKER, run_state_machine_as_test
+
+REPORT_VERSION = 1
+
+# Unless given, a new seed every run: each run of the farm explores new examples
+BASE_SEED = int(os.environ.get("FUZZ_SEED", random.getrandbits(32)))
+
+
+def shards(default: int = 1) -> range:
+    """Shard numbers to parametrize a fuzz test with."""
+    return range(int(os.environ.get("FUZZ_SHARDS", default)))
+
+
+class FuzzFarm:
+    def __init__(self, database=None):
+        self.database = DirectoryBasedExampleDatabase(
+            database or os.environ.get("FUZZ_DB", ".hypothesis/farm")
+        )
+        self.results = {}
+
+    def run(self, machine, shard: int, settings: Settings, key: str = None):
+        """
+        Run shard `shard` of the state machine class `machine`.
+
+        Fixtures should already be set as attributes of `machine`. `key`
+        names the run in the report (the machine's name by default); use it
+        to tell apart parametrized runs of the same machine.
+        """
+        key = f"{key or machine.__qualname__}/shard={shard}"
+        assert key not in self.results, f"{key} run twice"
+        stats = {
+            "seed": BASE_SEED + shard,
+            "examples": 0,
+            "seconds": 0.0,
+            "rules": defaultdict(lambda: [0, 0.0]),  # name -> [calls, seconds]
+        }
+
+        class Farmed(machine):
+            def __init__(self):
+                self._farm_anchor = boa.env.anchor()
+                self._farm_anchor.__enter__()
+                stats["examples"] += 1
+                super().__init__()
+
+            def teardown(self):
+                try:
+                    super().teardown()
+                finally:
+                    self._farm_anchor.__exit__(None, None, None)
+
+        for name, rule in _rules(machine):
+            setattr(Farmed, name, _timed(rule, stats["rules"]))
+
+        # Examples are stored under a digest of the factory: make it depend on
+        # the fuzzed machine rather than on this wrapper
+        Farmed.__name__ = Farmed.__qualname__ = machine.__qualname__
+        Farmed._hypothesis_internal_add_digest = (
+            f"{machine.__module__}.{machine.__qualname__}".encode()
+        )
+        seed(stats["seed"])(Farmed)
+
+        start = perf_counter()
+        try:
+            run_state_machine_as_test(
+                Farmed, settings=Settings(settings, database=self.database)
+            )
+        finally:
+            stats["seconds"] = perf_counter() - start
+            stats["rules"] = dict(stats["rules"])
+            self.results[key] = stats
+
+    def dump(self, path):
+        path = Path(path)
+        worker = os.environ.get("PYTEST_XDIST_WORKER")
+        if worker is not None:
+            path = path.with_name(f"{path.stem}.{worker}{path.suffix}")
+        with open(path, "w") as f:
+            json.dump(
+                {"version": REPORT_VERSION, "results": self.results},
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+            f.write("\n")
+
+
+def _rules(machine):
+    for name in dir(machine):
+        rule = getattr(getattr(machine, name), RULE_MARKER, None)
+        if rule is not None:
+            yield name, rule
+
+
+def _timed(rule, rule_stats):
+    function = rule.function
+
+    @wraps(function)
+    def timed(self, **kwargs):
+        start = perf_counter()
+        try:
+            return function(self, **kwargs)
+        finally:
+            counts = rule_stats[function.__name__]
+            counts[0] += 1
+            counts[1] += perf_counter() - start
+
+    setattr(timed, RULE_MARKER, replace(rule, function=timed))
+    return timed
+
+
+def load(path) -> dict:
+    """Results of a report, merged with the files of its xdist workers if any."""
+    path = Path(path)
+    files = sorted(path.parent.glob(f"{path.stem}.gw*{path.suffix}"))
+    if path.exists():
+        files.insert(0, path)
+    if not files:
+        raise FileNotFoundError(path)
+
+    results = {}
+    for file in files:
+        with open(file) as f:
+            data = json.load(f)
+        assert data["version"] == REPORT_VERSION, f"{file}: unsupported version"
+        results.update(data["results"])
+    return results
+
+
+def rate(count, seconds) -> float:
+    return count / seconds if seconds > 0 else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.fuzz.farm",
+        description="Summarize a fuzz farm report",
+    )
+    parser.add_argument("report")
+    args = parser.parse_args(argv)
+    results = load(args.report)
+
+    print(f"{'shard':<50}{'seed':>12}{'examples':>10}{'seconds':>10}{'ex/s':>9}")
+    by_machine = defaultdict(lambda: defaultdict(lambda: [0, 0.0]))
+    for key in sorted(results):
+        stats = results[key]
+        print(
+            f"{key:<50}{stats['seed']:>12}{stats['examples']:>10}"
+            f"{stats['seconds']:>10.1f}{rate(stats['examples'], stats['seconds']):>9.2f}"
+        )
+        rules = by_machine[key.rsplit("/", 1)[0]]
+        for name, (calls, seconds) in stats["rules"].items():
+            rules[name][0] += calls
+            rules[name][1] += seconds
+
+    for machine, rules in sorted(by_machine.items()):
+        total = sum(seconds for _, seconds in rules.values())
+        print(f"\n{machine}")
+        print(f"  {'rule':<32}{'calls':>9}{'seconds':>10}{'calls/s':>10}{'time':>8}")
+        for name, (calls, seconds) in sorted(
+            rules.items(), key=lambda item: -item[1][1]
+        ):
+            print(
+                f"  {name:<32}{calls:>9}{seconds:>10.1f}{rate(calls, seconds):>10.1f}"
+                f"{rate(seconds, total):>8.1%}"
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -66,7 +66,8 @@ def mint_markets(
     _dc = draw(debt_ceilings)
     _price = draw(initial_prices)
 
-    proto = Llamalend(initial_price=_price)
+    proto = Llamalend.cached()
+    proto.price_oracle.set_price(_price, sender=proto.admin)
 
     _collateral = draw(collaterals)
     _dec = _collateral.decimals()
@@ -103,7 +104,8 @@ def lend_markets(
     _loan_discount, _liq_discount = draw(discounts)
     _price = draw(initial_prices)
 
-    proto = Llamalend(initial_price=_price)
+    proto = Llamalend.cached()
+    proto.price_oracle.set_price(_price, sender=proto.admin)
 
     _borrowed_token = draw(collaterals)
     _collateral_token = draw(collaterals)
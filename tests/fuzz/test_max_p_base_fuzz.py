@@ -0,0 +1,125 @@
+import boa
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from tests.utils.constants import WAD
+from tests.utils.deployers import LEND_CONTROLLER_VIEW_DEPLOYER
+
+# ControllerView._max_p_base before it searched from the logarithm: a walk down
+# from MAX_P_BASE_BANDS below the oracle band, calling the AMM for every band
+_ITERATIVE_MAX_P_BASE = """
+from snekmate.utils import math
+from curve_stablecoin.interfaces import IAMM
+
+MAX_P_BASE_BANDS: constant(int256) = 5
+MAX_SKIP_TICKS: constant(uint256) = 1024
+WAD: constant(uint256) = 10**18
+
+
+@external
+@view
+def max_p_base(_amm: IAMM, _logn_a_ration: int256) -> uint256:
+    p_oracle: uint256 = staticcall _amm.price_oracle()
+    n1: int256 = math._wad_ln(
+        convert(staticcall _amm.get_base_price() * WAD // p_oracle, int256)
+    )
+    if n1 < 0:
+        n1 -= (_logn_a_ration - 1)
+    n1 = unsafe_div(n1, _logn_a_ration) + MAX_P_BASE_BANDS
+    n_min: int256 = staticcall _amm.active_band_with_skip()
+    n1 = max(n1, n_min + 1)
+    p_base: uint256 = staticcall _amm.p_oracle_up(n1)
+
+    for _: uint256 in range(MAX_SKIP_TICKS + 1):
+        n1 -= 1
+        if n1 <= n_min:
+            break
+        p_base_prev: uint256 = p_base
+        p_base = staticcall _amm.p_oracle_up(n1)
+        if p_base > p_oracle:
+            return p_base_prev
+    return p_base
+"""
+
+
+@pytest.fixture(scope="module")
+def market_type():
+    return "lending"
+
+
+@pytest.fixture(scope="module")
+def seed_liquidity(borrowed_token):
+    return 10**10 * 10 ** borrowed_token.decimals()
+
+
+@pytest.fixture(scope="module")
+def iterative():
+    return boa.loads(_ITERATIVE_MAX_P_BASE)
+
+
+@pytest.fixture(scope="module")
+def view(controller):
+    return LEND_CONTROLLER_VIEW_DEPLOYER.at(controller.view())
+
+
+@given(
+    loans=st.lists(
+        st.tuples(
+            st.integers(min_value=4, max_value=50),  # N
+            st.integers(min_value=10**15, max_value=10**21),  # collateral
+            st.integers(min_value=10**16, max_value=WAD),  # fraction of max debt
+        ),
+        min_size=0,
+        max_size=3,
+    ),
+    # Oracle price relative to the current one: deep below the loans to above them
+    p_o_frac=st.integers(min_value=10**15, max_value=3 * WAD),
+    trade_frac=st.integers(min_value=0, max_value=WAD),
+)
+@settings(max_examples=500)
+def test_max_p_base(
+    amm,
+    controller,
+    view,
+    iterative,
+    price_oracle,
+    collateral_token,
+    borrowed_token,
+    admin,
+    loans,
+    p_o_frac,
+    trade_frac,
+):
+    def check():
+        p_base = iterative.max_p_base(amm, view.eval("core.LOGN_A_RATIO"))
+        assert view.eval("core._max_p_base(core.AMM, core.LOGN_A_RATIO)") == p_base
+
+    check()
+
+    for i, (N, collateral, debt_frac) in enumerate(loans):
+        borrower = boa.env.generate_address(f"borrower{i}")
+        collateral = collateral // 10 ** (18 - collateral_token.decimals())
+        debt = controller.max_borrowable(collateral, N) * debt_frac // WAD
+        if debt == 0:
+            continue
+        boa.deal(collateral_token, borrower, collateral)
+        with boa.env.prank(borrower):
+            collateral_token.approve(controller, 2**256 - 1)
+            controller.create_loan(collateral, debt, N)
+        check()
+
+    with boa.env.prank(admin):
+        price_oracle.set_price(price_oracle.price() * p_o_frac // WAD)
+    boa.env.time_travel(3600)
+    check()
+
+    # Converting bands moves the active band and the bands which can't be skipped
+    trader = boa.env.generate_address("trader")
+    amount = controller.total_debt() * trade_frac // WAD
+    if amount > 0:
+        boa.deal(borrowed_token, trader, amount)
+        with boa.env.prank(trader):
+            borrowed_token.approve(amm, 2**256 - 1)
+            amm.exchange(0, 1, amount, 0)
+        check()
@@ -0,0 +1,79 @@
+import os
+
+import boa
+import pytest
+
+from tests.gas.report import GasReport
+from tests.utils import max_approve
+
+N_VALUES = [4, 10, 25, 50]
+
+
+# ── Market-parameter overrides ─────────────────────────────────────────────────
+
+
+# Decimals don't change the code paths being measured
+@pytest.fixture(scope="module")
+def collateral_decimals():
+    return 18
+
+
+@pytest.fixture(scope="module")
+def borrowed_decimals():
+    return 18
+
+
+@pytest.fixture(scope="module")
+def seed_liquidity(borrowed_token):
+    return 10**8 * 10 ** borrowed_token.decimals()
+
+
+# ── Gas recording ─────────────────────────────────────────────────────────────
+
+
+@pytest.fixture(scope="session")
+def gas_report():
+    report = GasReport()
+    yield report
+    path = os.environ.get("GAS_REPORT")
+    if path:
+        report.dump(path)
+
+
+@pytest.fixture(scope="module")
+def record_gas(gas_report, market_type):
+    """Record the gas used by the last call made to `contract`."""
+
+    def fn(function, contract, **params):
+        key = "/".join(
+            [market_type, function, *(f"{k}={v}" for k, v in params.items())]
+        )
+        gas_report.record(key, contract._computation.net_gas_used)
+
+    return fn
+
+
+# ── Loans ─────────────────────────────────────────────────────────────────────
+
+
+@pytest.fixture(scope="module")
+def collateral_amount(collateral_token):
+    return 10 * 10 ** collateral_token.decimals()
+
+
+@pytest.fixture(scope="module")
+def open_loan(controller, collateral_token, borrowed_token, collateral_amount):
+    """Create a loan for a fresh borrower with `debt` (half of max by default)."""
+
+    def fn(N, debt=None, name="borrower"):
+        borrower = boa.env.generate_address(name)
+        if debt is None:
+            debt = controller.max_borrowable(collateral_amount, N) // 2
+        boa.deal(collateral_token, borrower, 2 * collateral_amount)
+        with boa.env.prank(borrower):
+            max_approve(collateral_token, controller)
+            max_approve(borrowed_token, controller)
+            controller.create_loan(collateral_amount, debt, N)
+        return borrower
+
+    return fn
@@ -0,0 +1,146 @@
+"""
+Gas benchmark reports: storage and comparison.
+
+`tests/gas` records the gas used by every benchmarked call under a key like
+`lending/repay_partial/N=10`. With `GAS_REPORT=<path>` set, the results of a
+run are written to `<path>` as JSON (one file per xdist worker, with the
+worker id added before the suffix; all of them are picked up when comparing).
+
+Typical use:
+
+    GAS_REPORT=gas-baseline.json pytest tests/gas
+    ... change contracts ...
+    GAS_REPORT=gas-new.json pytest tests/gas
+    python -m tests.gas.report gas-baseline.json gas-new.json
+
+The comparison prints every changed entry, a per-function summary, and exits
+with status 1 if any entry got more expensive than `--tolerance` allows.
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+REPORT_VERSION = 1
+
+
+class GasReport:
+    def __init__(self):
+        self.results = {}
+
+    def record(self, key: str, gas: int):
+        assert key not in self.results, f"{key} recorded twice"
+        self.results[key] = gas
+
+    def dump(self, path):
+        path = Path(path)
+        worker = os.environ.get("PYTEST_XDIST_WORKER")
+        if worker is not None:
+            path = path.with_name(f"{path.stem}.{worker}{path.suffix}")
+        with open(path, "w") as f:
+            json.dump(
+                {"version": REPORT_VERSION, "results": self.results},
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+            f.write("\n")
+
+
+def load(path) -> dict:
+    """Results of a report, merged with the files of its xdist workers if any."""
+    path = Path(path)
+    files = sorted(path.parent.glob(f"{path.stem}.gw*{path.suffix}"))
+    if path.exists():
+        files.insert(0, path)
+    if not files:
+        raise FileNotFoundError(path)
+
+    results = {}
+    for file in files:
+        with open(file) as f:
+            data = json.load(f)
+        assert data["version"] == REPORT_VERSION, f"{file}: unsupported version"
+        results.update(data["results"])
+    return results
+
+
+def function_name(key: str) -> str:
+    """`lending/repay_full/N=4` -> `repay_full`"""
+    return key.split("/")[1]
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.0):
+    """
+    @return (changes, regressions): changes are (key, old, new) for every
+            entry present in both reports whose gas differs; regressions are
+            the subset which grew by more than `tolerance` (relative)
+    """
+    changes = []
+    regressions = []
+    for key in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[key], current[key]
+        if old == new:
+            continue
+        changes.append((key, old, new))
+        if new > old * (1 + tolerance):
+            regressions.append((key, old, new))
+    return changes, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.gas.report",
+        description="Compare two gas benchmark reports",
+    )
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.0,
+        help="relative increase allowed before an entry counts as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = load(args.baseline)
+    current = load(args.current)
+    changes, regressions = compare(baseline, current, args.tolerance)
+
+    for key, old, new in changes:
+        flag = "REGRESSION" if (key, old, new) in regressions else ""
+        print(
+            f"{key:<50}{old:>10}{new:>10}{new - old:>+9}{(new - old) / old:>+9.2%}  {flag}"
+        )
+
+    by_function = defaultdict(lambda: [0, 0, None])  # changed, regressed, worst delta
+    for key, old, new in changes:
+        stats = by_function[function_name(key)]
+        stats[0] += 1
+        stats[2] = new - old if stats[2] is None else max(stats[2], new - old)
+    for key, _, _ in regressions:
+        by_function[function_name(key)][1] += 1
+
+    print()
+    print(f"{'function':<24}{'changed':>9}{'regressed':>11}{'worst':>9}")
+    for name in sorted(by_function):
+        changed, regressed, worst = by_function[name]
+        print(f"{name:<24}{changed:>9}{regressed:>11}{worst:>+9}")
+
+    for label, keys in (
+        ("only in baseline", baseline.keys() - current.keys()),
+        ("only in current", current.keys() - baseline.keys()),
+    ):
+        if keys:
+            print(f"\n{len(keys)} entries {label}:")
+            for key in sorted(keys):
+                print(f"  {key}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
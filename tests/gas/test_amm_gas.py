@@ -0,0 +1,98 @@
+import boa
+import pytest
+
+from tests.gas.conftest import N_VALUES
+from tests.utils import max_approve
+from tests.utils.constants import MAX_SKIP_TICKS, MAX_TICKS
+
+# Empty bands between the active band and the liquidity the trade reaches.
+# Loans can't start further than MAX_SKIP_TICKS - N bands away, so the last
+# value is clamped per N.
+SKIP_VALUES = [16, 128, 512, MAX_SKIP_TICKS]
+
+
+def _debt_for_skip(controller, amm, collateral_amount, N, skip):
+    """Largest debt for which the loan starts `skip` bands below the active band."""
+    target = amm.active_band() + skip
+    lo, hi = 1, controller.max_borrowable(collateral_amount, N)
+    assert controller.calculate_debt_n1(collateral_amount, hi, N) <= target
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if controller.calculate_debt_n1(collateral_amount, mid, N) >= target:
+            lo = mid
+        else:
+            hi = mid - 1
+    assert controller.calculate_debt_n1(collateral_amount, lo, N) == target
+    return lo
+
+
+@pytest.fixture(scope="module")
+def trader(amm, borrowed_token):
+    _trader = boa.env.generate_address("trader")
+    max_approve(borrowed_token, amm, sender=_trader)
+    return _trader
+
+
+@pytest.fixture(scope="module")
+def skipped_loan(
+    controller, amm, price_oracle, admin, open_loan, collateral_amount, trader
+):
+    """
+    Loan starting `skip` bands below the active band, with the oracle moved to
+    the top of the loan so that a trade has to walk through the empty bands.
+    Returns the actual skip, the top band of the loan and the amount of
+    collateral to buy (about half of the loan).
+    """
+
+    def fn(N, skip):
+        skip = min(skip, MAX_SKIP_TICKS - N)
+        debt = _debt_for_skip(controller, amm, collateral_amount, N, skip)
+        borrower = open_loan(N, debt=debt)
+        n1 = amm.read_user_tick_numbers(borrower)[0]
+        assert n1 - amm.active_band() == skip
+
+        price_oracle.set_price(amm.p_oracle_up(n1), sender=admin)
+        # Past PREV_P_O_DELAY the AMM takes the new oracle price as is
+        boa.env.time_travel(seconds=3600)
+        return skip, n1, amm.get_sum_xy(borrower)[1] // 2
+
+    return fn
+
+
+@pytest.mark.parametrize("skip", SKIP_VALUES)
+@pytest.mark.parametrize("N", N_VALUES)
+def test_exchange(amm, borrowed_token, skipped_loan, trader, record_gas, N, skip):
+    skip, n1, out_amount = skipped_loan(N, skip)
+    in_amount = amm.get_dx(0, 1, out_amount)
+    boa.deal(borrowed_token, trader, in_amount)
+    amm.exchange(0, 1, in_amount, 0, sender=trader)
+    assert amm.active_band() >= n1
+    record_gas("exchange", amm, N=N, skip=skip)
+
+
+@pytest.mark.parametrize("skip", SKIP_VALUES)
+@pytest.mark.parametrize("N", N_VALUES)
+def test_exchange_dy(amm, borrowed_token, skipped_loan, trader, record_gas, N, skip):
+    skip, n1, out_amount = skipped_loan(N, skip)
+    in_amount = amm.get_dx(0, 1, out_amount)
+    boa.deal(borrowed_token, trader, in_amount)
+    amm.exchange_dy(0, 1, out_amount, in_amount, sender=trader)
+    assert amm.active_band() >= n1
+    record_gas("exchange_dy", amm, N=N, skip=skip)
+
+
+@pytest.mark.parametrize("n_bands", [10, 30, 50])
+def test_exchange_bands(
+    amm, borrowed_token, skipped_loan, trader, record_gas, n_bands
+):
+    # The widest loan possible, bought out through its first n_bands bands
+    _, n1, _ = skipped_loan(MAX_TICKS, SKIP_VALUES[0])
+    n_last = n1 + n_bands - 1
+    out_amount = (
+        sum(amm.bands_y(n) for n in range(n1, n_last)) + amm.bands_y(n_last) // 2
+    )
+    in_amount = amm.get_dx(0, 1, out_amount)
+    boa.deal(borrowed_token, trader, in_amount)
+    amm.exchange(0, 1, in_amount, 0, sender=trader)
+    assert amm.active_band() == n_last
+    record_gas("exchange_bands", amm, n_bands=n_bands)
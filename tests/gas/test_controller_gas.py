@@ -0,0 +1,149 @@
+import boa
+import pytest
+
+from tests.gas.conftest import N_VALUES
+from tests.utils import max_approve
+from tests.utils.constants import MAX_UINT256
+
+
+@pytest.mark.parametrize("N", N_VALUES)
+def test_create_loan(controller, open_loan, record_gas, N):
+    open_loan(N)
+    record_gas("create_loan", controller, N=N)
+
+
+@pytest.mark.parametrize("N", N_VALUES)
+def test_borrow_more(controller, open_loan, record_gas, collateral_amount, N):
+    borrower = open_loan(N)
+    boa.env.time_travel(seconds=3600)
+    controller.borrow_more(
+        collateral_amount // 10, controller.debt(borrower) // 10, sender=borrower
+    )
+    record_gas("borrow_more", controller, N=N)
+
+
+@pytest.mark.parametrize("N", N_VALUES)
+def test_add_collateral(controller, open_loan, record_gas, collateral_amount, N):
+    borrower = open_loan(N)
+    boa.env.time_travel(seconds=3600)
+    controller.add_collateral(collateral_amount // 10, sender=borrower)
+    record_gas("add_collateral", controller, N=N)
+
+
+@pytest.mark.parametrize("N", N_VALUES)
+def test_remove_collateral(controller, open_loan, record_gas, collateral_amount, N):
+    borrower = open_loan(N)
+    boa.env.time_travel(seconds=3600)
+    controller.remove_collateral(collateral_amount // 10, sender=borrower)
+    record_gas("remove_collateral", controller, N=N)
+
+
+@pytest.mark.parametrize("N", N_VALUES)
+def test_repay_partial(controller, open_loan, record_gas, N):
+    borrower = open_loan(N)
+    boa.env.time_travel(seconds=3600)
+    controller.repay(controller.debt(borrower) // 2, sender=borrower)
+    record_gas("repay_partial", controller, N=N)
+
+
+@pytest.mark.parametrize("N", N_VALUES)
+def test_repay_full(controller, borrowed_token, open_loan, record_gas, N):
+    borrower = open_loan(N)
+    boa.env.time_travel(seconds=3600)
+    # Interest accrued on top of the borrowed amount
+    boa.deal(borrowed_token, borrower, 2 * controller.debt(borrower))
+    controller.repay(MAX_UINT256, sender=borrower)
+    record_gas("repay_full", controller, N=N)
+
+
+@pytest.mark.parametrize("N", N_VALUES)
+def test_health(controller, open_loan, record_gas, N):
+    borrower = open_loan(N)
+    boa.env.time_travel(seconds=3600)
+    controller.debt(borrower)
+    record_gas("debt", controller, N=N)
+    for full in (False, True):
+        controller.health(borrower, full)
+        record_gas("health", controller, N=N, full=full)
+
+
+@pytest.mark.parametrize("N", N_VALUES)
+def test_liquidate(
+    controller,
+    borrowed_token,
+    price_oracle,
+    admin,
+    open_loan,
+    record_gas,
+    collateral_amount,
+    N,
+):
+    borrower = open_loan(N, debt=controller.max_borrowable(collateral_amount, N))
+    price_oracle.set_price(price_oracle.price() // 2, sender=admin)
+    boa.env.time_travel(seconds=3600)
+    assert controller.health(borrower) < 0
+
+    liquidator = boa.env.generate_address("liquidator")
+    boa.deal(borrowed_token, liquidator, controller.tokens_to_liquidate(borrower))
+    max_approve(borrowed_token, controller, sender=liquidator)
+    controller.liquidate(borrower, 0, sender=liquidator)
+    record_gas("liquidate", controller, N=N)
+
+
+@pytest.mark.parametrize("n_users", [1, 10])
+def test_liquidate_many(
+    controller,
+    borrowed_token,
+    price_oracle,
+    admin,
+    open_loan,
+    record_gas,
+    collateral_amount,
+    n_users,
+):
+    debt = controller.max_borrowable(collateral_amount, 10)
+    borrowers = [open_loan(10, debt=debt, name=f"borrower{i}") for i in range(n_users)]
+    price_oracle.set_price(price_oracle.price() // 2, sender=admin)
+    boa.env.time_travel(seconds=3600)
+
+    liquidator = boa.env.generate_address("liquidator")
+    amount = sum(controller.tokens_to_liquidate(b) for b in borrowers)
+    boa.deal(borrowed_token, liquidator, amount)
+    max_approve(borrowed_token, controller, sender=liquidator)
+    controller.liquidate_many(
+        borrowers, [0] * n_users, [10**18] * n_users, sender=liquidator
+    )
+    record_gas("liquidate_many", controller, users=n_users)
+
+
+N_SCAN_USERS = 1000
+
+
+def test_users_to_liquidate(controller, open_loan, record_gas):
+    # A healthy book none of whose bands has been traded through
+    for i in range(N_SCAN_USERS):
+        open_loan(10, name=f"borrower{i}")
+    assert len(controller.users_to_liquidate()) == 0
+    record_gas("users_to_liquidate", controller, users=N_SCAN_USERS)
+
+
+N_CRASHED_USERS = 100
+
+
+def test_users_to_liquidate_page(
+    controller, price_oracle, admin, open_loan, record_gas, collateral_amount
+):
+    # A crashed book in which every loan is returned
+    debt = controller.max_borrowable(collateral_amount, 10)
+    for i in range(N_CRASHED_USERS):
+        open_loan(10, debt=debt, name=f"borrower{i}")
+    price_oracle.set_price(price_oracle.price() // 2, sender=admin)
+    boa.env.time_travel(seconds=3600)
+
+    page, cursor = controller.users_to_liquidate_page()
+    assert len(page) == cursor == N_CRASHED_USERS
+    record_gas("users_to_liquidate_page", controller, users=N_CRASHED_USERS)
+
+    page, cursor = controller.users_health_page()
+    assert len(page) == cursor == N_CRASHED_USERS
+    record_gas("users_health_page", controller, users=N_CRASHED_USERS)
@@ -0,0 +1,53 @@
+import boa
+import pytest
+
+from tests.utils.constants import ZERO_ADDRESS
+from tests.utils.deployers import (
+    AGG_MONETARY_POLICY4_DEPLOYER,
+    DUMMY_PRICE_ORACLE_DEPLOYER,
+    MOCK_FACTORY_DEPLOYER,
+    MOCK_MARKET_DEPLOYER,
+)
+
+
+# The policy is shared by all mint markets: measure it once
+@pytest.fixture(scope="module")
+def market_type():
+    return "mint"
+
+
+@pytest.mark.parametrize("n_markets", [10, 50, 200])
+def test_agg_monetary_policy4_rate_write(record_gas, n_markets):
+    admin = boa.env.generate_address("admin")
+    factory = MOCK_FACTORY_DEPLOYER.deploy()
+    markets = []
+    for i in range(n_markets):
+        market = MOCK_MARKET_DEPLOYER.deploy()
+        factory.add_market(market.address, 10**30)
+        factory.set_debt(market.address, (i + 1) * 10**24)
+        markets.append(market)
+
+    with boa.env.prank(admin):
+        price_oracle = DUMMY_PRICE_ORACLE_DEPLOYER.deploy(admin, 10**18)
+        mp = AGG_MONETARY_POLICY4_DEPLOYER.deploy(
+            admin,
+            price_oracle.address,
+            factory.address,
+            [ZERO_ADDRESS] * 5,
+            634195839,
+            2 * 10**16,
+            10**17,
+            0,
+            86400,
+        )
+    # The first call reads every market once
+    mp.rate_write(markets[0].address)
+
+    boa.env.time_travel(seconds=600)
+    factory.set_debt(markets[-1].address, 10**24)
+    mp.rate_write(markets[-1].address, sender=markets[-1].address)
+    record_gas("mp_rate_write", mp, markets=n_markets)
+    assert mp.cached_total_debt() == sum(m.total_debt() for m in markets)
+
+    mp.rate(markets[-1].address)
+    record_gas("mp_rate", mp, markets=n_markets)
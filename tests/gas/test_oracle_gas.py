@@ -0,0 +1,33 @@
+import pytest
+
+from tests.utils.deployers import (
+    CRYPTO_FROM_POOLS_RATE_DEPLOYER,
+    MOCK_STORED_RATES_POOL_DEPLOYER,
+)
+
+
+# The oracles are not tied to a market: measure them once
+@pytest.fixture(scope="module")
+def market_type():
+    return "lending"
+
+
+@pytest.mark.parametrize("n_pools", [1, 2, 3])
+def test_crypto_from_pools_rate(record_gas, n_pools):
+    pools = [
+        MOCK_STORED_RATES_POOL_DEPLOYER.deploy([2 * 10**18], [10**18, 11 * 10**17])
+        for _ in range(n_pools)
+    ]
+    oracle = CRYPTO_FROM_POOLS_RATE_DEPLOYER.deploy(
+        [p.address for p in pools], [0] * n_pools, [1] * n_pools
+    )
+
+    oracle.price()
+    record_gas("oracle_price", oracle, pools=n_pools, same_block=False)
+    oracle.price_w()
+    record_gas("oracle_price_w", oracle, pools=n_pools, same_block=False)
+    # Every later read in the block, e.g. the AMM's and the controller's
+    oracle.price_w()
+    record_gas("oracle_price_w", oracle, pools=n_pools, same_block=True)
+    oracle.price()
+    record_gas("oracle_price", oracle, pools=n_pools, same_block=True)
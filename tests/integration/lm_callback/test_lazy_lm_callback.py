@@ -0,0 +1,134 @@
+"""
+LazyLMCallback must accrue the same rewards as LMCallback while being cheaper
+on routine operations. Both callbacks are run through the same loan book and
+trades (each inside its own anchor) and their rewards and gas are compared.
+Run with `-s` to see the gas table.
+"""
+
+import boa
+import pytest
+
+from tests.utils.constants import MAX_UINT256
+from tests.utils.deployers import LAZY_LM_CALLBACK_DEPLOYER, LM_CALLBACK_DEPLOYER
+
+WEEK = 7 * 86400
+DAY = 86400
+N_BORROWERS = 3
+
+
+def _gas(contract):
+    return contract._computation.net_gas_used
+
+
+def _run_scenario(
+    deployer,
+    n_bands,
+    admin,
+    amm,
+    crv,
+    gauge_controller,
+    minter,
+    controller,
+    configurator,
+    lm_factory,
+    collateral_token,
+    borrowed_token,
+    trader,
+):
+    gas = {}
+    with boa.env.anchor():
+        with boa.env.prank(admin):
+            cb = deployer.deploy(amm, crv, gauge_controller, minter, lm_factory)
+            configurator.set_callback(controller, cb)
+            gauge_controller.add_gauge(cb.address, 0, 10**18)
+        boa.env.time_travel(seconds=2 * WEEK + 5)
+
+        borrowers = [
+            boa.env.generate_address(f"borrower{i}") for i in range(N_BORROWERS)
+        ]
+        for i, borrower in enumerate(borrowers):
+            boa.deal(collateral_token, borrower, 2 * 10**21)
+            collateral_token.approve(controller, MAX_UINT256, sender=borrower)
+            borrowed_token.approve(controller, MAX_UINT256, sender=borrower)
+            controller.create_loan(
+                10**21, 10**21 * (600 + 400 * i), n_bands, sender=borrower
+            )
+        gas["create_loan"] = _gas(controller)
+
+        boa.env.time_travel(seconds=DAY)
+        controller.add_collateral(10**20, sender=borrowers[0])
+        gas["add_collateral"] = _gas(controller)
+
+        boa.env.time_travel(seconds=DAY)
+        controller.remove_collateral(10**20, sender=borrowers[0])
+        gas["remove_collateral"] = _gas(controller)
+
+        boa.env.time_travel(seconds=DAY)
+        cb.user_checkpoint(borrowers[1], sender=borrowers[1])
+        gas["user_checkpoint"] = _gas(cb)
+
+        boa.env.time_travel(seconds=3600)
+        cb.user_checkpoint(borrowers[1], sender=borrowers[1])
+        gas["user_checkpoint (same week)"] = _gas(cb)
+
+        # Trade into the bands of the riskiest loan so that collateral per share changes
+        amm.exchange_dy(0, 1, 10**20, 2**255, sender=trader)
+        gas["exchange_dy"] = _gas(amm)
+
+        boa.env.time_travel(seconds=2 * WEEK)
+        repayer = borrowers[0]
+        boa.deal(borrowed_token, repayer, 2 * controller.debt(repayer))
+        controller.repay(MAX_UINT256, sender=repayer)
+        gas["repay (full)"] = _gas(controller)
+
+        boa.env.time_travel(seconds=WEEK)
+        for borrower in borrowers:
+            cb.user_checkpoint(borrower, sender=borrower)
+        rewards = [cb.integrate_fraction(b) for b in borrowers]
+
+    return rewards, gas
+
+
+@pytest.mark.parametrize("n_bands", [4, 10, 25, 50])
+def test_lazy_lm_callback(
+    n_bands,
+    admin,
+    amm,
+    crv,
+    gauge_controller,
+    minter,
+    controller,
+    configurator,
+    lm_factory,
+    collateral_token,
+    borrowed_token,
+    trader,
+):
+    args = (
+        admin,
+        amm,
+        crv,
+        gauge_controller,
+        minter,
+        controller,
+        configurator,
+        lm_factory,
+        collateral_token,
+        borrowed_token,
+        trader,
+    )
+    rewards, gas = _run_scenario(LM_CALLBACK_DEPLOYER, n_bands, *args)
+    lazy_rewards, lazy_gas = _run_scenario(LAZY_LM_CALLBACK_DEPLOYER, n_bands, *args)
+
+    # Settling a band in one step instead of several only changes rounding
+    assert all(r > 0 for r in rewards)
+    assert lazy_rewards == pytest.approx(rewards, rel=1e-12)
+
+    print(f"\nN = {n_bands}")
+    print(f"{'operation':<30}{'LMCallback':>12}{'Lazy':>12}{'diff':>10}")
+    for op in gas:
+        print(f"{op:<30}{gas[op]:>12}{lazy_gas[op]:>12}{lazy_gas[op] - gas[op]:>+10}")
+
+    # Operations which don't change collateral per share skip the band loop
+    for op in ("user_checkpoint", "user_checkpoint (same week)", "repay (full)"):
+        assert lazy_gas[op] < gas[op], op
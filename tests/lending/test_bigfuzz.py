@@ -6,11 +6,11 @@ from hypothesis import settings
 from hypothesis import strategies as st
 from hypothesis.stateful import (
     RuleBasedStateMachine,
-    run_state_machine_as_test,
     rule,
     invariant,
 )
 
+from tests.fuzz.farm import shards
 from tests.utils.constants import ZERO_ADDRESS
 
 
@@ -499,6 +499,7 @@ class BigFuzz(RuleBasedStateMachine):
         )
 
 
+@pytest.mark.parametrize("shard", shards())
 def test_big_fuzz(
     vault,
     borrowed_token,
@@ -510,10 +511,17 @@ def test_big_fuzz(
     controller,
     price_oracle,
     fake_leverage,
+    fuzz_farm,
+    shard,
 ):
-    BigFuzz.TestCase.settings = settings(max_examples=2000, stateful_step_count=20)
+    fuzz_settings = settings(max_examples=2000, stateful_step_count=20)
     # Or quick check
-    # BigFuzz.TestCase.settings = settings(max_examples=25, stateful_step_count=20)
+    # fuzz_settings = settings(max_examples=25, stateful_step_count=20)
     for k, v in locals().items():
         setattr(BigFuzz, k, v)
-    run_state_machine_as_test(BigFuzz)
+    fuzz_farm.run(
+        BigFuzz,
+        shard,
+        fuzz_settings,
+        key=f"lending/{collateral_token.decimals()}-{borrowed_token.decimals()}",
+    )
@@ -0,0 +1,207 @@
+"""AggregateStablePrice3 against a model of its price over randomized pool histories.
+
+The model recomputes the price from the pools on every read, as the aggregator did
+before it started returning the price saved by price_w for the rest of the block.
+Like Curve pools, the mocks only move their oracles between blocks.
+"""
+
+import random
+
+import boa
+import pytest
+
+from tests.utils.constants import WAD
+from tests.utils.deployers import AGGREGATE_STABLE_PRICE3_DEPLOYER
+from tests.utils.mp_reference import legacy_exp
+from tests.utils.oracle_replay import StablePoolSeries, aggregate_stable_price
+
+SIGMA = 10**15
+TVL_MA_TIME = 50000
+MIN_LIQUIDITY = 100_000 * 10**18
+N_BLOCKS = 40
+
+_POOL_MOCK = """
+coins: public(address[2])
+price_oracle: public({price_oracle})
+D_oracle: public(uint256)
+totalSupply: public(uint256)
+get_virtual_price: public(uint256)
+
+@deploy
+def __init__(_stablecoin: address, _is_inverse: bool):
+    self.coins[0 if _is_inverse else 1] = _stablecoin
+    self.get_virtual_price = 10**18
+
+@external
+def set_state(_price: uint256, _supply: uint256, _virtual_price: uint256, _D: uint256):
+    self.price_oracle{index} = _price
+    self.totalSupply = _supply
+    self.get_virtual_price = _virtual_price
+    self.D_oracle = _D
+"""
+
+
+def _pool(stablecoin, is_ng, is_inverse):
+    source = _POOL_MOCK.format(
+        price_oracle="uint256[1]" if is_ng else "uint256", index="[0]" if is_ng else ""
+    )
+    return boa.loads(source, stablecoin, is_inverse)
+
+
+def _random_state(rng):
+    supply = rng.choice([10**22, 10**23, 10**24, 10**25]) * rng.randint(1, 10)
+    return (
+        rng.randint(97 * 10**16, 103 * 10**16),
+        supply,
+        rng.randint(WAD, 11 * 10**17),
+        supply * rng.randint(9, 11) // 10,
+    )
+
+
+def _set_random_state(rng, pool):
+    pool.set_state(*_random_state(rng))
+
+
+class AggregatorModel:
+    """The aggregator's price recomputed from the pools on every read."""
+
+    def __init__(self, agg, pools):
+        self.pools = pools
+        self.pairs = [agg.price_pairs(i) for i in range(len(pools))]
+        self.last_tvl = [agg.last_tvl(i) for i in range(len(pools))]
+        self.last_timestamp = agg.last_timestamp()
+
+    def ema_tvl(self):
+        alpha = WAD
+        if self.last_timestamp < boa.env.timestamp:
+            alpha = legacy_exp(
+                -((boa.env.timestamp - self.last_timestamp) * WAD // TVL_MA_TIME), None
+            )
+        tvls = []
+        for pool, (_, _, is_ng), tvl in zip(self.pools, self.pairs, self.last_tvl):
+            if is_ng:
+                tvl = pool.D_oracle()
+            elif alpha != WAD:
+                new_tvl = pool.totalSupply() * WAD // pool.get_virtual_price()
+                tvl = (new_tvl * (WAD - alpha) + tvl * alpha) // WAD
+            tvls.append(tvl)
+        return tvls
+
+    def price(self, tvls=None):
+        if tvls is None:
+            tvls = self.ema_tvl()
+        prices = [0] * len(tvls)
+        D = [0] * len(tvls)
+        for i, ((_, is_inverse, is_ng), pool) in enumerate(zip(self.pairs, self.pools)):
+            if tvls[i] >= MIN_LIQUIDITY:
+                p = pool.price_oracle(0) if is_ng else pool.price_oracle()
+                prices[i] = 10**36 // p if is_inverse else p
+                D[i] = tvls[i]
+        if sum(D) == 0:
+            return WAD
+        p_avg = sum(d * p for d, p in zip(D, prices)) // sum(D)
+        e = [abs(p - p_avg) ** 2 // (SIGMA**2 // WAD) for p in prices]
+        weights = [d * legacy_exp(min(e) - x, None) // WAD for d, x in zip(D, e)]
+        return sum(w * p for w, p in zip(weights, prices)) // sum(weights)
+
+    def price_w(self):
+        tvls = self.ema_tvl()
+        self.last_tvl = tvls
+        self.last_timestamp = boa.env.timestamp
+        return self.price(tvls)
+
+
+@pytest.fixture(scope="module")
+def admin():
+    return boa.env.generate_address("admin")
+
+
+@pytest.fixture
+def stablecoin():
+    return boa.env.generate_address("stablecoin")
+
+
+@pytest.fixture
+def aggregator(admin, stablecoin):
+    with boa.env.prank(admin):
+        return AGGREGATE_STABLE_PRICE3_DEPLOYER.deploy(stablecoin, SIGMA, admin)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_randomized_history(aggregator, stablecoin, admin, seed):
+    rng = random.Random(seed)
+    pools = [
+        _pool(stablecoin, is_ng, is_inverse)
+        for is_ng, is_inverse in [(False, False), (True, False), (False, True), (True, False)]
+    ]
+    for pool in pools:
+        _set_random_state(rng, pool)
+        aggregator.add_price_pair(pool.address, sender=admin)
+    model = AggregatorModel(aggregator, pools)
+
+    for _ in range(N_BLOCKS):
+        boa.env.time_travel(seconds=rng.choice([1, 12, 600, 3600, 86400]))
+        for pool in pools:
+            if rng.random() < 0.5:
+                _set_random_state(rng, pool)
+        for _ in range(rng.randint(1, 4)):
+            if rng.random() < 0.5:
+                assert aggregator.price() == model.price()
+            elif model.last_timestamp == boa.env.timestamp:
+                assert aggregator.price_w() == aggregator.last_price()
+            else:
+                assert aggregator.price_w() == model.price_w()
+                assert [aggregator.last_tvl(i) for i in range(len(pools))] == model.last_tvl
+        assert aggregator.price() == model.price()
+
+
+def test_pair_changes_after_price_w(aggregator, stablecoin, admin):
+    rng = random.Random(0)
+    pools = [_pool(stablecoin, True, False) for _ in range(3)]
+    for pool in pools[:2]:
+        _set_random_state(rng, pool)
+        aggregator.add_price_pair(pool.address, sender=admin)
+    pools[2].set_state(102 * 10**16, 10**25, WAD, 10**25)
+
+    boa.env.time_travel(seconds=600)
+    aggregator.price_w()
+    aggregator.add_price_pair(pools[2].address, sender=admin)
+    model = AggregatorModel(aggregator, pools)
+    assert aggregator.price() == aggregator.price_w() == model.price()
+
+    aggregator.remove_price_pair(0, sender=admin)
+    model = AggregatorModel(aggregator, [pools[2], pools[1]])
+    assert aggregator.price() == aggregator.price_w() == model.price()
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_replay(aggregator, stablecoin, admin, seed):
+    rng = random.Random(seed)
+    kinds = [(False, False), (True, False), (False, True), (True, True)]
+    timestamps = [boa.env.timestamp]
+    states = [[_random_state(rng) for _ in kinds]]
+    for _ in range(N_BLOCKS - 1):
+        timestamps.append(timestamps[-1] + rng.choice([0, 1, 12, 600, 3600, 86400]))
+        states.append([_random_state(rng) if rng.random() < 0.5 else s for s in states[-1]])
+
+    pools = [_pool(stablecoin, is_ng, is_inverse) for is_ng, is_inverse in kinds]
+    for pool, state in zip(pools, states[0]):
+        pool.set_state(*state)
+        aggregator.add_price_pair(pool.address, sender=admin)
+    outputs = []
+    for t, row in zip(timestamps, states):
+        if t > boa.env.timestamp:
+            boa.env.time_travel(seconds=t - boa.env.timestamp)
+        for pool, state in zip(pools, row):
+            pool.set_state(*state)
+        outputs.append(aggregator.price_w())
+
+    series = []
+    for j, (is_ng, is_inverse) in enumerate(kinds):
+        price, supply, virtual_price, D = zip(*(row[j] for row in states))
+        series.append(
+            StablePoolSeries(
+                price, supply, virtual_price=virtual_price, D=D if is_ng else None, is_inverse=is_inverse
+            )
+        )
+    assert outputs == aggregate_stable_price(timestamps, series, SIGMA)
@@ -0,0 +1,56 @@
+import boa
+import pytest
+
+from tests.utils.deployers import (
+    CRYPTO_FROM_POOLS_RATE_DEPLOYER,
+    MOCK_STORED_RATES_POOL_DEPLOYER,
+)
+
+RATE = 11 * 10**17
+
+
+def _chain(n_pools):
+    # Collateral is coin 1 of every pool; the first pool's collateral carries a rate
+    pools = [
+        MOCK_STORED_RATES_POOL_DEPLOYER.deploy(
+            [(2 + i) * 10**18], [10**18, RATE] if i == 0 else []
+        )
+        for i in range(n_pools)
+    ]
+    oracle = CRYPTO_FROM_POOLS_RATE_DEPLOYER.deploy(
+        [p.address for p in pools], [0] * n_pools, [1] * n_pools
+    )
+    return pools, oracle
+
+
+def _expected(pools):
+    price = 10**18
+    for pool in pools:
+        price = price * pool.price_oracle(0) // 10**18
+    return price * RATE // 10**18
+
+
+@pytest.mark.parametrize("n_pools", [1, 3])
+def test_price(n_pools):
+    pools, oracle = _chain(n_pools)
+    assert oracle.price() == _expected(pools)
+    assert oracle.price_w() == _expected(pools)
+    assert oracle.price() == _expected(pools)
+
+
+def test_price_is_cached_within_block():
+    pools, oracle = _chain(2)
+    # No price_w in this block yet: price() reads the pools
+    pools[1].set_price(0, 5 * 10**18)
+    price = _expected(pools)
+    assert oracle.price() == price
+
+    assert oracle.price_w() == price
+    pools[1].set_price(0, 6 * 10**18)
+    assert oracle.price() == price
+    assert oracle.price_w() == price
+
+    boa.env.time_travel(seconds=1)
+    assert oracle.price() == _expected(pools)
+    assert oracle.price_w() == _expected(pools)
+    assert oracle.price() > price
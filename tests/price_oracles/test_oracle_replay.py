@@ -0,0 +1,124 @@
+"""tests.utils.oracle_replay against the deployed oracles over randomized histories."""
+
+import csv
+import random
+
+import boa
+import pytest
+
+from tests.utils import oracle_replay as replay
+from tests.utils.constants import WAD
+from tests.utils.deployers import (
+    DUMMY_PRICE_ORACLE_DEPLOYER,
+    EMA_PRICE_ORACLE_DEPLOYER,
+    ERC4626_EMA_WRAPPER_DEPLOYER,
+)
+
+N_ROWS = 60
+
+_VAULT_MOCK = """
+share_price: public(uint256)
+
+@deploy
+def __init__(_share_price: uint256):
+    self.share_price = _share_price
+
+@external
+@view
+def convertToAssets(_shares: uint256) -> uint256:
+    return _shares * self.share_price // 10**18
+
+@external
+def set_share_price(_share_price: uint256):
+    self.share_price = _share_price
+"""
+
+
+@pytest.fixture(scope="module")
+def admin():
+    return boa.env.generate_address("admin")
+
+
+def _history(seed, n_rows=N_ROWS):
+    """Timestamps (with repeated blocks) and two random walks starting at WAD."""
+    rng = random.Random(seed)
+    timestamps = [boa.env.timestamp]
+    prices = [3000 * WAD]
+    share_prices = [WAD]
+    for _ in range(n_rows - 1):
+        timestamps.append(timestamps[-1] + rng.choice([0, 1, 12, 600, 3600, 86400]))
+        prices.append(prices[-1] * rng.randint(95, 105) // 100)
+        share_prices.append(share_prices[-1] * rng.randint(97, 104) // 100)
+    return timestamps, prices, share_prices
+
+
+def _go_to(timestamp):
+    if timestamp > boa.env.timestamp:
+        boa.env.time_travel(seconds=timestamp - boa.env.timestamp)
+
+
+@pytest.mark.parametrize("seed", range(2))
+@pytest.mark.parametrize("ma_exp_time", [30, 866, 86400])
+def test_ema_price_oracle(admin, seed, ma_exp_time):
+    timestamps, prices, _ = _history(seed)
+    source = DUMMY_PRICE_ORACLE_DEPLOYER.deploy(admin, prices[0])
+    selector = source.price.prepare_calldata()[:4].rjust(32, b"\x00")
+    oracle = EMA_PRICE_ORACLE_DEPLOYER.deploy(ma_exp_time, source.address, selector)
+
+    outputs = []
+    for t, p in zip(timestamps, prices):
+        _go_to(t)
+        source.set_price(p, sender=admin)
+        outputs.append(oracle.price_w())
+    assert outputs == replay.ema_price_oracle(timestamps, prices, ma_exp_time)
+
+
+@pytest.mark.parametrize("seed", range(2))
+@pytest.mark.parametrize("ema_time", [600, 86400])
+def test_erc4626_ema_wrapper(admin, seed, ema_time):
+    timestamps, prices, share_prices = _history(seed)
+    base = DUMMY_PRICE_ORACLE_DEPLOYER.deploy(admin, prices[0])
+    vault = boa.loads(_VAULT_MOCK, share_prices[0])
+    oracle = ERC4626_EMA_WRAPPER_DEPLOYER.deploy(base.address, vault.address, ema_time)
+
+    outputs = []
+    for t, p, s in zip(timestamps, prices, share_prices):
+        _go_to(t)
+        base.set_price(p, sender=admin)
+        vault.set_share_price(s)
+        outputs.append(oracle.price_w())
+    assert outputs == replay.erc4626_ema_wrapper(timestamps, prices, share_prices, ema_time)
+
+
+def test_required_deviation():
+    old = [100 * WAD] * 4 + [3]
+    new = [100 * WAD, 105 * WAD, 105 * WAD + 1, 95 * WAD, 4]
+    required = replay.required_deviation(old, new)
+    assert required == [1, 500, 501, 500, 3334]
+    for max_deviation in [1, 500, 501, 3334]:
+        assert replay.deviation_allowed(old, new, max_deviation) == [
+            r <= max_deviation for r in required
+        ]
+
+
+def test_load_history_and_sweep(tmp_path):
+    timestamps, prices, _ = _history(0)
+    path = tmp_path / "history.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "price"])
+        writer.writerows(zip(timestamps, prices))
+
+    history = replay.load_history(path)
+    assert history == {"timestamp": timestamps, "price": prices}
+
+    outputs = replay.sweep(
+        replay.ema_price_oracle, history["timestamp"], history["price"], ma_exp_time=[10, 600, 3600]
+    )
+    # MIN_MA_EXP_TIME is 30 s
+    assert list(outputs) == [(600,), (3600,)]
+    assert outputs[(600,)] == replay.ema_price_oracle(timestamps, prices, 600)
+
+    path.write_text("timestamp,price\n2,1\n1,1\n")
+    with pytest.raises(AssertionError):
+        replay.load_history(path)
@@ -6,11 +6,11 @@ from hypothesis import settings
 from hypothesis import strategies as st
 from hypothesis.stateful import (
     RuleBasedStateMachine,
-    run_state_machine_as_test,
     rule,
     invariant,
 )
 
+from tests.fuzz.farm import shards
 from tests.utils.deployers import AMM_DEPLOYER, MINT_CONTROLLER_DEPLOYER
 
 # Variables and methods to check
@@ -517,7 +517,7 @@ class BigFuzz(RuleBasedStateMachine):
 
 
 @pytest.mark.parametrize(
-    "_tmp", range(4)
+    "shard", shards(4)
 )  # This splits the test into 8 small chunks which are easier to parallelize
 @pytest.mark.parametrize("collateral_digits", [8, 18])
 def test_big_fuzz(
@@ -530,7 +530,8 @@ def test_big_fuzz(
     accounts,
     get_fake_leverage,
     admin,
-    _tmp,
+    fuzz_farm,
+    shard,
 ):
     from tests.utils.deployers import ERC20_MOCK_DEPLOYER
 
@@ -542,12 +543,14 @@ def test_big_fuzz(
     )
     fake_leverage = get_fake_leverage(collateral_token, market_controller)
 
-    BigFuzz.TestCase.settings = settings(max_examples=50, stateful_step_count=20)
+    fuzz_settings = settings(max_examples=50, stateful_step_count=20)
     # Or quick check
-    # BigFuzz.TestCase.settings = settings(max_examples=25, stateful_step_count=20)
+    # fuzz_settings = settings(max_examples=25, stateful_step_count=20)
     for k, v in locals().items():
         setattr(BigFuzz, k, v)
-    run_state_machine_as_test(BigFuzz)
+    fuzz_farm.run(
+        BigFuzz, shard, fuzz_settings, key=f"stableborrow/{collateral_digits}"
+    )
 
 
 def test_noraise(
@@ -0,0 +1,55 @@
+import boa
+import pytest
+
+from tests.utils import max_approve
+from tests.utils.constants import MIN_TICKS, WAD
+
+RATE = 10**11
+TIME_DELTA = 86400
+
+
+@pytest.fixture(scope="module")
+def borrower(controller, collateral_token, borrowed_token):
+    borrower = boa.env.generate_address("borrower")
+    collateral = 1000 * 10 ** collateral_token.decimals()
+    boa.deal(collateral_token, borrower, collateral)
+    with boa.env.prank(borrower):
+        max_approve(collateral_token, controller)
+        controller.create_loan(
+            collateral, 100 * 10 ** borrowed_token.decimals(), MIN_TICKS
+        )
+    return borrower
+
+
+@pytest.fixture(autouse=True)
+def accrue_interest(amm):
+    amm.eval(f"self.rate = {RATE}")
+    amm.eval("self.rate_time = block.timestamp")
+    boa.env.time_travel(TIME_DELTA)
+
+
+def test_cache_rate_mul(controller, amm):
+    rate_mul = amm.get_rate_mul()
+    assert rate_mul > WAD
+    assert controller.eval("core._cached_rate_mul") == 0
+    assert controller.eval("core._rate_mul()") == rate_mul
+    assert controller.eval("core._cache_rate_mul()") == rate_mul
+
+
+def test_cached_within_transaction(controller, borrower):
+    # A value no AMM would return shows which one the debt is computed with
+    stale_rate_mul = controller.eval(f"core._debt({borrower})")[1] // 2
+    rate_mul = controller.eval(
+        f"core._cached_rate_mul = {stale_rate_mul}\nreturn core._debt({borrower})[1]"
+    )
+    assert rate_mul == stale_rate_mul
+
+
+def test_not_cached_across_transactions(controller, amm, borrower):
+    controller.eval("core._cache_rate_mul()")
+    debt = controller.debt(borrower)
+
+    boa.env.time_travel(TIME_DELTA)
+    assert controller.eval("core._cached_rate_mul") == 0
+    assert controller.eval("core._rate_mul()") == amm.get_rate_mul()
+    assert controller.debt(borrower) > debt
@@ -0,0 +1,79 @@
+import boa
+import pytest
+from textwrap import dedent
+
+MAX_UINT64 = 2**64 - 1
+MAX_UINT128 = 2**128 - 1
+
+
+@pytest.fixture(scope="module", autouse=True)
+def expose_internal(controller):
+    controller.inject_function(
+        dedent(
+            """
+        @external
+        def save_loan(_user: address, _initial_debt: uint256, _rate_mul: uint256):
+            core._save_loan(_user, _initial_debt, _rate_mul)
+        """
+        )
+    )
+    controller.inject_function(
+        dedent(
+            """
+        @external
+        @view
+        def read_loan(_user: address) -> (uint256, uint256):
+            loan: core.IController.Loan = core._loan(_user)
+            return loan.initial_debt, loan.rate_mul
+        """
+        )
+    )
+    controller.inject_function(
+        dedent(
+            """
+        @external
+        def save_user_param(_user: address, _shift: uint256, _value: uint256):
+            core._save_user_param(_user, _shift, _value)
+        """
+        )
+    )
+
+
+def _params(controller, user):
+    return (
+        controller.liquidation_discounts(user),
+        controller.extra_health(user),
+        controller.loan_ix(user),
+    )
+
+
+def test_loan_roundtrip(controller):
+    user = boa.env.generate_address()
+    for debt, rate_mul in [(1, 10**18), (MAX_UINT128, MAX_UINT128), (0, 3 * 10**18)]:
+        controller.inject.save_loan(user, debt, rate_mul)
+        assert controller.inject.read_loan(user) == (debt, rate_mul)
+        assert controller.loan_exists(user) == (debt > 0)
+
+
+def test_loan_overflow(controller):
+    user = boa.env.generate_address()
+    with boa.reverts():
+        controller.inject.save_loan(user, MAX_UINT128 + 1, 10**18)
+    with boa.reverts():
+        controller.inject.save_loan(user, 1, MAX_UINT128 + 1)
+
+
+def test_user_params_are_independent(controller):
+    user = boa.env.generate_address()
+    other = boa.env.generate_address()
+    shifts = {0: 0, 1: 64, 2: 128}  # liquidation_discount, extra_health, loan_ix
+
+    expected = [0, 0, 0]
+    for i, value in [(1, 5 * 10**16), (0, MAX_UINT64), (2, 12345), (0, 6 * 10**16), (1, 0)]:
+        controller.inject.save_user_param(user, shifts[i], value)
+        expected[i] = value
+        assert _params(controller, user) == tuple(expected)
+    assert _params(controller, other) == (0, 0, 0)
+
+    with boa.reverts():
+        controller.inject.save_user_param(user, shifts[2], MAX_UINT64 + 1)
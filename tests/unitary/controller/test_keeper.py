@@ -0,0 +1,102 @@
+import boa
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+from tests.utils import max_approve
+from tests.utils.keeper import IntervalTree, LiquidationKeeper
+
+N_LOANS = 12
+
+
+@given(
+    intervals=st.lists(
+        st.tuples(st.integers(-100, 100), st.integers(3, 49)), max_size=60
+    ),
+    queries=st.lists(
+        st.tuples(st.integers(-160, 160), st.integers(0, 80)), min_size=1, max_size=20
+    ),
+)
+def test_interval_tree(intervals, queries):
+    ranges = {f"u{i}": (n1, n1 + dn) for i, (n1, dn) in enumerate(intervals)}
+    tree = IntervalTree(ranges)
+    for lo, width in queries:
+        hi = lo + width
+        expected = {u for u, (n1, n2) in ranges.items() if n1 <= hi and n2 >= lo}
+        found = tree.overlapping(lo, hi)
+        assert len(found) == len(set(found))
+        assert set(found) == expected
+
+
+@pytest.fixture(scope="function")
+def borrowers(controller, collateral_token):
+    """Loans with different widths and leverage so they sit in different bands."""
+    users = []
+    for i in range(N_LOANS):
+        borrower = boa.env.generate_address(f"borrower{i}")
+        collateral_amount = (i + 1) * 10 ** collateral_token.decimals() // 10
+        N = 4 + i % 7
+        boa.deal(collateral_token, borrower, collateral_amount)
+        with boa.env.prank(borrower):
+            max_approve(collateral_token, controller)
+            debt = controller.max_borrowable(collateral_amount, N) * (3 + i % 7) // 10
+            controller.create_loan(collateral_amount, debt, N)
+        users.append(borrower)
+    return users
+
+
+def _status(controller, user, p):
+    """0 above the user's bands, 1 inside them, 2 below them."""
+    p_up, p_down = controller.user_prices(user)
+    return 0 if p > p_up else 1 if p > p_down else 2
+
+
+def test_band_for_price(controller, amm, borrowers):
+    keeper = LiquidationKeeper(controller, amm)
+    for n in range(-5, 60, 3):
+        assert keeper.band_for_price(amm.p_oracle_up(n)) == n
+        assert keeper.band_for_price(amm.p_oracle_up(n) + 1) == n - 1
+
+
+@pytest.mark.parametrize("move", [0.99, 0.9, 0.75, 0.5, 1.1])
+def test_affected_users(controller, amm, price_oracle, admin, borrowers, move):
+    keeper = LiquidationKeeper(controller, amm)
+    keeper.refresh()
+    assert set(keeper.ranges) == {str(b) for b in borrowers}
+
+    p_old = price_oracle.price()
+    p_new = int(p_old * move)
+    affected = keeper.affected_users(p_old, p_new)
+
+    # Every loan whose soft-liquidation status changes is re-checked ...
+    for user in borrowers:
+        if _status(controller, user, p_old) != _status(controller, user, p_new):
+            assert str(user) in affected
+    # ... and only loans with bands between the two prices are
+    n_lo, n_hi = sorted([keeper.band_for_price(p_old), keeper.band_for_price(p_new)])
+    assert set(affected) == {
+        str(user)
+        for user in borrowers
+        if amm.read_user_tick_numbers(user)[0] <= n_hi
+        and amm.read_user_tick_numbers(user)[1] >= n_lo
+    }
+
+    price_oracle.set_price(p_new, sender=admin)
+    for user, health in keeper.check(p_old, p_new):
+        assert health == controller.health(user, True)
+
+
+def test_update_user(controller, amm, borrowed_token, borrowers):
+    keeper = LiquidationKeeper(controller, amm)
+    keeper.refresh()
+
+    repaid = borrowers[0]
+    boa.deal(borrowed_token, repaid, controller.debt(repaid))
+    with boa.env.prank(repaid):
+        max_approve(borrowed_token, controller)
+        controller.repay(2**256 - 1)
+    keeper.update_user(repaid)
+
+    assert str(repaid) not in keeper.ranges
+    p = amm.p_oracle_up(keeper.ranges[str(borrowers[1])][0])
+    assert str(repaid) not in keeper.affected_users(p * 2, p // 2)
+    assert str(borrowers[1]) in keeper.affected_users(p * 2, p // 2)
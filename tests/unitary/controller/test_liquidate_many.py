@@ -0,0 +1,107 @@
+import boa
+import pytest
+from tests.utils import max_approve
+from tests.utils.constants import WAD
+
+N_BANDS = 6
+FRACS = [WAD, WAD // 2, 3 * WAD // 10]
+
+
+@pytest.fixture(scope="function")
+def borrowers(controller, collateral_token, borrowed_token):
+    users = []
+    for i in range(len(FRACS)):
+        borrower = boa.env.generate_address(f"borrower{i}")
+        collateral_amount = (i + 1) * 10 ** collateral_token.decimals() // 10
+        boa.deal(collateral_token, borrower, collateral_amount)
+        with boa.env.prank(borrower):
+            max_approve(collateral_token, controller)
+            debt = controller.max_borrowable(collateral_amount, N_BANDS)
+            controller.create_loan(collateral_amount, debt, N_BANDS)
+        users.append(borrower)
+    return users
+
+
+@pytest.fixture(scope="function")
+def liquidator(controller, borrowed_token, borrowers):
+    liquidator = boa.env.generate_address("liquidator")
+    amount = sum(
+        controller.tokens_to_liquidate(b, frac) for b, frac in zip(borrowers, FRACS)
+    )
+    boa.deal(borrowed_token, liquidator, amount + 1)
+    max_approve(borrowed_token, controller, sender=liquidator)
+    return liquidator
+
+
+def _state(controller, borrowed_token, collateral_token, borrowers, liquidator):
+    return {
+        "users": [list(controller.user_state(b)) for b in borrowers],
+        "total_debt": controller.total_debt(),
+        "borrowed": borrowed_token.balanceOf(liquidator),
+        "collateral": collateral_token.balanceOf(liquidator),
+        "controller": borrowed_token.balanceOf(controller),
+        "n_loans": controller.n_loans(),
+    }
+
+
+def test_liquidate_many_matches_liquidate(
+    controller,
+    borrowed_token,
+    collateral_token,
+    price_oracle,
+    admin,
+    borrowers,
+    liquidator,
+):
+    price_oracle.set_price(price_oracle.price() // 2, sender=admin)
+    boa.env.time_travel(seconds=3600)
+    for borrower in borrowers:
+        assert controller.health(borrower) < 0
+
+    with boa.env.anchor():
+        for borrower, frac in zip(borrowers, FRACS):
+            controller.liquidate(borrower, 0, frac, sender=liquidator)
+        expected = _state(
+            controller, borrowed_token, collateral_token, borrowers, liquidator
+        )
+
+    controller.liquidate_many(borrowers, [0] * len(FRACS), FRACS, sender=liquidator)
+    assert (
+        _state(controller, borrowed_token, collateral_token, borrowers, liquidator)
+        == expected
+    )
+    assert not controller.loan_exists(borrowers[0])
+    assert controller.loan_exists(borrowers[1])
+
+
+def test_liquidate_many_checks_every_user(
+    controller, collateral_token, price_oracle, admin, borrowers, liquidator
+):
+    price_oracle.set_price(price_oracle.price() // 2, sender=admin)
+    boa.env.time_travel(seconds=3600)
+
+    # A loan opened after the crash is healthy: the whole batch reverts
+    healthy = boa.env.generate_address("healthy")
+    collateral_amount = 10 ** collateral_token.decimals()
+    boa.deal(collateral_token, healthy, collateral_amount)
+    with boa.env.prank(healthy):
+        max_approve(collateral_token, controller)
+        controller.create_loan(
+            collateral_amount,
+            controller.max_borrowable(collateral_amount, N_BANDS) // 2,
+            N_BANDS,
+        )
+
+    with boa.reverts("Not enough rekt"):
+        controller.liquidate_many(
+            [borrowers[0], healthy], [0, 0], [WAD, WAD], sender=liquidator
+        )
+
+    with boa.reverts():
+        controller.liquidate_many(borrowers, [0], FRACS, sender=liquidator)
+
+    # Per-user slippage is checked as in liquidate
+    with boa.reverts("Slippage"):
+        controller.liquidate_many(
+            borrowers[:1], [2**256 - 1], [WAD], sender=liquidator
+        )
@@ -0,0 +1,107 @@
+import boa
+import pytest
+from tests.utils import max_approve
+from tests.utils.market_indexer import MarketIndexer, boa_logs
+
+N_LOANS = 4
+
+
+class Recorder:
+    """Collects the logs of every transaction sent through `call`."""
+
+    def __init__(self):
+        self.logs = []
+        self.n_txs = 0
+
+    def call(self, contract, method, *args, **kwargs):
+        result = getattr(contract, method)(*args, **kwargs)
+        self.logs += boa_logs(contract, self.n_txs)
+        self.n_txs += 1
+        return result
+
+
+def assert_mirrors(indexer, controller, amm, users):
+    model = indexer.amm
+    assert model.active_band == amm.active_band()
+    assert model.min_band == amm.min_band()
+    assert model.max_band == amm.max_band()
+    for n in range(model.min_band - 1, model.max_band + 2):
+        assert model.bands_x(n) == amm.bands_x(n)
+        assert model.bands_y(n) == amm.bands_y(n)
+    for user in users:
+        assert model.read_user_ticks(user) == list(amm.read_user_ticks(user))
+        assert indexer.user_state(user, boa.env.evm.patch.timestamp) == list(
+            controller.user_state(user)
+        )
+
+
+@pytest.fixture(scope="function")
+def market_history(
+    controller, amm, collateral_token, borrowed_token, price_oracle, admin
+):
+    """A market going through every action which changes bands or loans."""
+    indexer = MarketIndexer.from_contracts(amm, controller, price_oracle)
+    recorder = Recorder()
+    users = [boa.env.generate_address(f"borrower{i}") for i in range(N_LOANS)]
+
+    for i, user in enumerate(users):
+        collateral = (i + 1) * 10 ** collateral_token.decimals()
+        boa.deal(collateral_token, user, 2 * collateral)
+        with boa.env.prank(user):
+            max_approve(collateral_token, controller)
+            max_approve(borrowed_token, controller)
+            debt = controller.max_borrowable(collateral, 5 + i) // 2
+            recorder.call(controller, "create_loan", collateral, debt, 5 + i)
+        boa.env.time_travel(seconds=600)
+
+    with boa.env.prank(users[0]):
+        recorder.call(controller, "add_collateral", 10 ** collateral_token.decimals())
+        recorder.call(controller, "borrow_more", 0, controller.debt(users[0]) // 10)
+    with boa.env.prank(users[1]):
+        recorder.call(controller, "repay", controller.debt(users[1]) // 3)
+    boa.env.time_travel(seconds=3600)
+
+    # Move the oracle down and trade both ways through the top bands
+    price_oracle.set_price(price_oracle.price() * 9 // 10, sender=admin)
+    trader = boa.env.generate_address("trader")
+    boa.deal(borrowed_token, trader, controller.total_debt())
+    boa.deal(collateral_token, trader, 10 * 10 ** collateral_token.decimals())
+    with boa.env.prank(trader):
+        max_approve(borrowed_token, amm)
+        max_approve(collateral_token, amm)
+        recorder.call(amm, "exchange", 0, 1, controller.total_debt() // 4, 0)
+        boa.env.time_travel(seconds=60)
+        out_amount = amm.get_dy(1, 0, 10 ** collateral_token.decimals() // 10)
+        recorder.call(amm, "exchange_dy", 1, 0, out_amount, 2**256 - 1)
+
+    # Partial self-liquidation of a soft-liquidated loan, then a full repay
+    with boa.env.prank(users[0]):
+        boa.deal(borrowed_token, users[0], controller.debt(users[0]))
+        recorder.call(controller, "liquidate", users[0], 0, 4 * 10**17)
+    with boa.env.prank(users[2]):
+        boa.deal(borrowed_token, users[2], controller.debt(users[2]))
+        recorder.call(controller, "repay", 2**256 - 1)
+
+    return indexer, recorder, users
+
+
+def test_replay(controller, amm, market_history):
+    # The reader reads the live contracts: nothing it reads changed after the history
+    indexer, recorder, users = market_history
+    indexer.process(recorder.logs)
+    assert_mirrors(indexer, controller, amm, users)
+    assert indexer.loans.keys() == {str(u) for u in users if controller.loan_exists(u)}
+
+
+def test_checkpoint_and_resume(controller, amm, market_history, tmp_path):
+    indexer, recorder, users = market_history
+    path = str(tmp_path / "checkpoint.json")
+    half = recorder.n_txs // 2
+
+    indexer.process([log for log in recorder.logs if log.tx_index < half])
+    indexer.save(path)
+    resumed = MarketIndexer.load(path, indexer.reader)
+
+    # Transactions already in the checkpoint are skipped, even when sent again
+    resumed.process(recorder.logs)
+    assert_mirrors(resumed, controller, amm, users)
@@ -64,3 +64,9 @@ def test_users_to_liquidate_overflow(
     # and return up to 1000 results instead of reverting.
     result = controller.users_to_liquidate()
     assert len(result) == DYNARRAY_LIMIT
+
+    # The paged scan says where to resume
+    page, cursor = controller.users_to_liquidate_page()
+    assert len(page) == DYNARRAY_LIMIT and cursor == DYNARRAY_LIMIT
+    page, cursor = controller.users_to_liquidate_page(cursor)
+    assert len(page) == 1 and cursor == n_overflow
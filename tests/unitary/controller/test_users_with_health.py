@@ -0,0 +1,120 @@
+import boa
+import pytest
+from tests.utils import max_approve
+from tests.utils.amm_reference import AMMModel
+from tests.utils.health_scan import HealthScanner, snapshot_loans
+
+N_LOANS = 12
+
+
+@pytest.fixture(scope="function")
+def borrowers(controller, collateral_token):
+    """Loans with different widths and leverage so they sit in different bands."""
+    users = []
+    for i in range(N_LOANS):
+        borrower = boa.env.generate_address(f"borrower{i}")
+        collateral_amount = (i + 1) * 10 ** collateral_token.decimals() // 10
+        N = 4 + i % 7
+        boa.deal(collateral_token, borrower, collateral_amount)
+        with boa.env.prank(borrower):
+            max_approve(collateral_token, controller)
+            debt = controller.max_borrowable(collateral_amount, N) * (6 + i % 5) // 10
+            controller.create_loan(collateral_amount, debt, N)
+        users.append(borrower)
+    return users
+
+
+def _assert_scan_matches(controller, amm, users):
+    loans = snapshot_loans(controller)
+    scanner = HealthScanner(AMMModel.from_contract(amm, users))
+
+    for loan in loans:
+        for full in (True, False):
+            assert scanner.health(loan, full)[0] == controller.health(loan.user, full)
+        assert scanner.get_x_down(loan.user) == amm.get_x_down(loan.user)
+
+    expected = [
+        (p.user, p.x, p.y, p.debt, p.health)
+        for p in scanner.users_with_health(loans, 0, True)
+    ]
+    assert [tuple(p) for p in controller.users_to_liquidate()] == expected
+
+    # Paginated scans see the same positions
+    paginated = controller.users_to_liquidate(3, 5)
+    assert [tuple(p) for p in paginated] == [
+        (p.user, p.x, p.y, p.debt, p.health)
+        for p in scanner.users_with_health(loans[3:8], 0, True)
+    ]
+
+
+def test_healthy_book(controller, amm, borrowers):
+    _assert_scan_matches(controller, amm, borrowers)
+    assert len(controller.users_to_liquidate()) == 0
+
+
+def test_soft_liquidated_book(
+    controller, amm, borrowed_token, price_oracle, admin, borrowers
+):
+    # Move the oracle down and let a trader buy collateral out of the top bands
+    price_oracle.set_price(price_oracle.price() * 9 // 10, sender=admin)
+    boa.env.time_travel(seconds=3600)
+
+    trader = boa.env.generate_address("trader")
+    amount = controller.total_debt() // 3
+    boa.deal(borrowed_token, trader, amount)
+    max_approve(borrowed_token, amm, sender=trader)
+    amm.exchange(0, 1, amount, 0, sender=trader)
+    assert amm.active_band() > min(amm.read_user_tick_numbers(u)[0] for u in borrowers)
+
+    _assert_scan_matches(controller, amm, borrowers)
+
+
+def test_crashed_book(controller, amm, price_oracle, admin, borrowers):
+    price_oracle.set_price(price_oracle.price() // 2, sender=admin)
+    boa.env.time_travel(seconds=3600)
+
+    _assert_scan_matches(controller, amm, borrowers)
+    assert len(controller.users_to_liquidate()) > 0
+
+
+def _scan_pages(controller, page_size, gas_reserve=0, gas=None):
+    """Follow the cursor of users_to_liquidate_page until the book is scanned."""
+    kwargs = {} if gas is None else {"gas": gas}
+    positions, cursor = [], 0
+    while cursor < controller.n_loans():
+        page, next_cursor = controller.users_to_liquidate_page(
+            cursor, page_size, gas_reserve, **kwargs
+        )
+        assert cursor < next_cursor <= cursor + page_size
+        positions += [tuple(p) for p in page]
+        cursor = next_cursor
+    assert cursor == controller.n_loans()
+    return positions
+
+
+@pytest.mark.parametrize("page_size", [1, 5, N_LOANS])
+def test_pages(controller, amm, price_oracle, admin, borrowers, page_size):
+    price_oracle.set_price(price_oracle.price() // 2, sender=admin)
+    boa.env.time_travel(seconds=3600)
+    expected = [tuple(p) for p in controller.users_to_liquidate()]
+    assert len(expected) > 0
+
+    assert _scan_pages(controller, page_size) == expected
+    # Pages cut by gas resume where they stopped
+    assert _scan_pages(controller, page_size, 2 * 10**6, gas=3 * 10**6) == expected
+
+    # Only the user and the health, with the same health and a custom threshold
+    page, cursor = controller.users_health_page(0, 0, 0, 0)
+    assert [tuple(p) for p in page] == [(p[0], p[4]) for p in expected]
+    assert cursor == N_LOANS
+    page, _ = controller.users_health_page(0, 0, 2**255 - 1, 0)
+    assert [p[0] for p in page] == [controller.loans(i) for i in range(N_LOANS)]
+    assert [p[1] for p in page] == [controller.health(p[0], True) for p in page]
+
+
+def test_page_gas_reserve(controller, borrowers):
+    # Not enough gas for any loan: nothing is scanned and the cursor doesn't move
+    assert controller.users_to_liquidate_page(3, 0, 2**255) == ([], 3)
+    assert controller.users_health_page(3, 0, 0, 2**255) == ([], 3)
+    # Past the end of the book
+    assert controller.users_to_liquidate_page(N_LOANS + 1, 0, 0) == ([], N_LOANS + 1)
@@ -0,0 +1,100 @@
+import boa
+import pytest
+
+from tests.utils import max_approve
+from tests.utils.constants import MIN_TICKS, ZERO_ADDRESS
+from tests.utils.deployers import LEND_CONTROLLER_VIEW_DEPLOYER
+from tests.utils.market_reader import MarketReader
+
+N_BANDS = 6
+
+
+@pytest.fixture(scope="module")
+def view(controller):
+    return LEND_CONTROLLER_VIEW_DEPLOYER.at(controller.view())
+
+
+@pytest.fixture(scope="module")
+def collateral_amount(collateral_token):
+    return int(N_BANDS * 0.05 * 10 ** collateral_token.decimals())
+
+
+@pytest.fixture(scope="module")
+def borrower(controller, collateral_token, collateral_amount):
+    borrower = boa.env.generate_address("borrower")
+    boa.deal(collateral_token, borrower, collateral_amount)
+    with boa.env.prank(borrower):
+        max_approve(collateral_token, controller)
+        controller.create_loan(
+            collateral_amount,
+            controller.max_borrowable(collateral_amount, N_BANDS),
+            N_BANDS,
+        )
+    return borrower
+
+
+def expected_state(controller, d_collateral, N, user):
+    total_debt = controller.total_debt()
+    borrow_cap = controller.borrow_cap()
+    available_balance = controller.available_balance()
+    admin_fees = controller.admin_fees()
+    return {
+        "total_debt": total_debt,
+        "borrow_cap": borrow_cap,
+        "available_balance": available_balance,
+        "admin_fees": admin_fees,
+        "cap": min(
+            max(available_balance - admin_fees, 0), max(borrow_cap - total_debt, 0)
+        ),
+        "max_borrowable": controller.max_borrowable(d_collateral, N, user),
+        "tokens_to_shrink": controller.tokens_to_shrink(user, d_collateral)
+        if user != ZERO_ADDRESS
+        else 0,
+    }
+
+
+def test_market_state_no_user(view, controller, collateral_amount):
+    state = view.market_state(collateral_amount, N_BANDS)._asdict()
+    assert state == expected_state(controller, collateral_amount, N_BANDS, ZERO_ADDRESS)
+    assert state["max_borrowable"] > 0
+
+
+def test_market_state_with_loan(view, controller, borrower, collateral_amount):
+    d_collateral = collateral_amount // 2
+    state = view.market_state(d_collateral, MIN_TICKS, borrower)._asdict()
+    assert state == expected_state(controller, d_collateral, MIN_TICKS, borrower)
+    assert state["total_debt"] == controller.debt(borrower)
+
+
+def test_market_state_borrow_cap(view, controller, configurator, admin, borrower):
+    configurator.set_borrow_cap(controller, controller.total_debt() // 2, sender=admin)
+    state = view.market_state(0, N_BANDS)._asdict()
+    assert state == expected_state(controller, 0, N_BANDS, ZERO_ADDRESS)
+    assert state["cap"] == 0
+    assert state["max_borrowable"] == 0
+
+
+def test_market_reader(factory, vault, controller, borrower, collateral_amount):
+    depositor = boa.env.generate_address("depositor")
+    reader = MarketReader(factory)
+    snapshots = reader.read(owner=depositor, d_collateral=collateral_amount, N=N_BANDS)
+
+    assert len(snapshots) == factory.market_count()
+    for snapshot in snapshots:
+        market = factory.markets(snapshot.index)
+        assert snapshot.vault.address == market.vault
+        assert snapshot.controller.address == market.controller
+        assert snapshot.vault_state == snapshot.vault.vault_state(depositor)
+        assert snapshot.market_state == reader.markets[
+            snapshot.index
+        ].view.market_state(collateral_amount, N_BANDS)
+
+    ours = [s for s in snapshots if s.controller.address == controller.address]
+    assert len(ours) == 1
+    assert ours[0].vault_state.total_assets == vault.totalAssets()
+    assert ours[0].market_state.total_debt == controller.total_debt()
+
+    # Contracts are resolved once; later reads reuse them
+    markets = list(reader.markets)
+    reader.read()
+    assert all(a is b for a, b in zip(markets, reader.markets))
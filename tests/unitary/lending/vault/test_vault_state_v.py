@@ -0,0 +1,75 @@
+import boa
+import pytest
+
+from tests.utils.constants import MAX_UINT256, ZERO_ADDRESS
+
+
+def expected_state(vault, controller, owner):
+    return {
+        "total_assets": vault.totalAssets(),
+        "total_supply": vault.totalSupply(),
+        "price_per_share": vault.pricePerShare(),
+        "borrow_apr": vault.borrow_apr(),
+        "lend_apr": vault.lend_apr(),
+        "total_debt": controller.total_debt(),
+        "available_balance": max(
+            controller.available_balance() - controller.admin_fees(), 0
+        ),
+        "max_supply": vault.maxSupply(),
+        "max_deposit": vault.maxDeposit(owner),
+        "balance": vault.balanceOf(owner),
+        "max_withdraw": vault.maxWithdraw(owner),
+        "max_redeem": vault.maxRedeem(owner),
+    }
+
+
+@pytest.fixture(scope="module")
+def depositor():
+    return boa.env.generate_address("depositor")
+
+
+def test_vault_state_no_debt(vault, controller, depositor, deposit_into_vault):
+    deposit_into_vault(depositor)
+    state = vault.vault_state(depositor)._asdict()
+    assert state == expected_state(vault, controller, depositor)
+    assert state["lend_apr"] == 0
+
+
+def test_vault_state_with_debt(
+    vault, controller, amm, depositor, deposit_into_vault, admin_percentage
+):
+    deposit_into_vault(depositor)
+    amm.eval(f"self.rate = {10**9}")
+    controller.eval(
+        f"core._total_debt.initial_debt = {controller.available_balance() // 2}"
+    )
+    controller.eval(f"core._total_debt.rate_mul = {10**18}")
+    amm.eval(f"self.rate_mul = {int(1.2 * 10**18)}")
+
+    state = vault.vault_state(depositor)._asdict()
+    assert state == expected_state(vault, controller, depositor)
+    assert state["lend_apr"] > 0
+
+
+def test_vault_state_liquidity_limited(
+    vault, controller, depositor, deposit_into_vault
+):
+    deposit_into_vault(depositor)
+    controller.eval(f"self._available_balance = {controller.available_balance() // 3}")
+
+    state = vault.vault_state(depositor)._asdict()
+    assert state == expected_state(vault, controller, depositor)
+    assert state["max_withdraw"] < vault.convertToAssets(state["balance"])
+
+
+def test_vault_state_supply_cap(vault, controller, admin, depositor):
+    vault.set_max_supply(vault.totalAssets() * 2, sender=admin)
+    state = vault.vault_state(depositor)._asdict()
+    assert state == expected_state(vault, controller, depositor)
+    assert state["max_deposit"] < MAX_UINT256
+
+
+def test_vault_state_default_owner(vault, controller):
+    state = vault.vault_state()._asdict()
+    assert state == expected_state(vault, controller, ZERO_ADDRESS)
+    assert state["balance"] == 0
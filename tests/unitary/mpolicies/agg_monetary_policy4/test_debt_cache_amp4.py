@@ -0,0 +1,77 @@
+"""Tests for the cached controller debts of AggMonetaryPolicy4."""
+
+import boa
+
+from tests.utils.deployers import MOCK_MARKET_DEPLOYER
+
+N_MARKETS = 7
+N_DEBT_REFRESH = 2
+
+
+def _add_markets(admin, mock_factory, n):
+    markets = []
+    with boa.env.prank(admin):
+        for i in range(n):
+            market = MOCK_MARKET_DEPLOYER.deploy()
+            mock_factory.add_market(market.address, 10**30)
+            mock_factory.set_debt(market.address, (i + 1) * 10**23)
+            markets.append(market)
+    return markets
+
+
+def _total(markets):
+    return sum(m.total_debt() for m in markets)
+
+
+def test_new_controllers_are_read(admin, mock_factory, mp):
+    markets = _add_markets(admin, mock_factory, N_MARKETS)
+    mp.rate_write(markets[0].address)
+
+    assert mp.n_controllers() == N_MARKETS
+    for market in markets:
+        assert mp.is_controller(market.address)
+        assert mp.controller_debt(market.address) == market.total_debt()
+    assert mp.cached_total_debt() == _total(markets)
+
+
+def test_caller_debt_is_fresh(admin, mock_factory, mp):
+    markets = _add_markets(admin, mock_factory, N_MARKETS)
+    mp.rate_write(markets[0].address)
+    rate = mp.rate(markets[3].address)
+
+    mock_factory.set_debt(markets[3].address, 5 * 10**24)
+    # rate() sees the new debt of the market it is asked for before any write
+    assert mp.rate(markets[3].address) > rate
+    assert mp.rate(markets[3].address) == mp.rate_write(markets[3].address)
+    assert mp.controller_debt(markets[3].address) == 5 * 10**24
+    assert mp.cached_total_debt() == _total(markets)
+
+
+def test_stale_debts_are_refreshed_in_turn(admin, mock_factory, mp):
+    markets = _add_markets(admin, mock_factory, N_MARKETS)
+    mp.rate_write(markets[0].address)
+
+    # Debts changing without a rate_write (interest of idle markets)
+    for i, market in enumerate(markets[1:]):
+        mock_factory.set_debt(market.address, (i + 10) * 10**23)
+    assert mp.cached_total_debt() < _total(markets)
+
+    for _ in range(-(-N_MARKETS // N_DEBT_REFRESH)):
+        mp.rate_write(markets[0].address)
+    for market in markets:
+        assert mp.controller_debt(market.address) == market.total_debt()
+    assert mp.cached_total_debt() == _total(markets)
+
+
+def test_unknown_controller_is_not_cached(admin, mock_factory, mp):
+    markets = _add_markets(admin, mock_factory, 2)
+    mp.rate_write(markets[0].address)
+    total = mp.cached_total_debt()
+
+    stranger = MOCK_MARKET_DEPLOYER.deploy()
+    stranger.set_debt(10**26)
+    mp.rate_write(stranger.address)
+
+    assert not mp.is_controller(stranger.address)
+    assert mp.controller_debt(stranger.address) == 0
+    assert mp.cached_total_debt() == total
@@ -0,0 +1,263 @@
+"""Differential tests of tests.utils.mp_reference against the deployed policies."""
+
+import boa
+import pytest
+
+from tests.utils import mp_reference as ref
+from tests.utils.constants import WAD, ZERO_ADDRESS
+from tests.utils.deployers import (
+    AGG_MONETARY_POLICY4_DEPLOYER,
+    DUMMY_PRICE_ORACLE_DEPLOYER,
+    ERC20_MOCK_DEPLOYER,
+    HYPERBOLIC_DYNAMIC_MP_DEPLOYER,
+    HYPERBOLIC_MP_DEPLOYER,
+    KINKED_MONETARY_POLICY_DEPLOYER,
+    MOCK_CONTROLLER_MP_DEPLOYER,
+    MOCK_FACTORY_DEPLOYER,
+    MOCK_MARKET_DEPLOYER,
+    MOCK_RATE_CALCULATOR_DEPLOYER,
+    MOCK_RATE_SETTER_DEPLOYER,
+    SECONDARY_MONETARY_POLICY_DEPLOYER,
+    SEMILOG_MONETARY_POLICY_DEPLOYER,
+    SUSDE_MONETARY_POLICY_DEPLOYER,
+)
+
+_ETHENA_VAULT_MOCK = """
+totalAssets: public(uint256)
+vestingAmount: public(uint256)
+lastDistributionTimestamp: public(uint256)
+
+@deploy
+def __init__(_total_assets: uint256, _vesting_amount: uint256):
+    self.totalAssets = _total_assets
+    self.vestingAmount = _vesting_amount
+    self.lastDistributionTimestamp = block.timestamp
+"""
+
+RESERVES = 10**24
+UTILIZATIONS = [0, 10**15, 3 * 10**17, 85 * 10**16, 95 * 10**16, 99 * 10**16]
+# (d_reserves, d_debt) for future_rate
+CHANGES = [(0, 0), (10**23, 0), (-(10**23), 0), (10**22, 10**22), (0, -(10**22))]
+CURVES = [
+    (85 * 10**16, 5 * 10**17, 3 * WAD),
+    (5 * 10**17, 10**16, 20 * WAD),
+    (99 * 10**16, 9 * 10**17, 11 * 10**17),
+]
+# Secondary and Susde store r_minf unsigned: the second curve is rejected by them
+UNSIGNED_CURVES = [CURVES[0], CURVES[2]]
+RATE = 3 * 10**9  # ~10% APR
+
+
+@pytest.fixture(scope="module")
+def factory():
+    return MOCK_FACTORY_DEPLOYER.deploy()
+
+
+@pytest.fixture(scope="module")
+def borrowed_token():
+    return ERC20_MOCK_DEPLOYER.deploy(18)
+
+
+def _legacy_markets(borrowed_token):
+    """0.3.10 policies read total_debt and balanceOf(controller): one market per utilization."""
+    markets = []
+    for u in UTILIZATIONS:
+        market = MOCK_MARKET_DEPLOYER.deploy()
+        market.set_debt(RESERVES * u // WAD)
+        boa.deal(borrowed_token, market.address, RESERVES - RESERVES * u // WAD)
+        markets.append(market)
+    return markets
+
+
+def _utilizations(borrowed_token, markets):
+    return [
+        ref.legacy_utilization(borrowed_token.balanceOf(m.address), m.total_debt())
+        for m in markets
+    ]
+
+
+@pytest.mark.parametrize("params", CURVES)
+def test_kinked(factory, borrowed_token, params):
+    base_rate = RATE * 31536000
+    mp = KINKED_MONETARY_POLICY_DEPLOYER.deploy(factory, borrowed_token, *params, base_rate)
+    curve = ref.HyperbolicCurve.kinked(*params, base_rate)
+    assert ref.HyperbolicCurve.from_contract(mp) == curve
+
+    markets = _legacy_markets(borrowed_token)
+    expected = curve.rates(_utilizations(borrowed_token, markets))
+    for market, rate in zip(markets, expected):
+        if rate is None:
+            with boa.reverts("Negative rate"):
+                mp.rate(market.address)
+        else:
+            assert mp.rate(market.address) == rate
+
+
+@pytest.mark.parametrize("params", UNSIGNED_CURVES)
+@pytest.mark.parametrize("rate_shift", [0, 10**8])
+def test_secondary(factory, borrowed_token, params, rate_shift):
+    amm = MOCK_RATE_SETTER_DEPLOYER.deploy(RATE)
+    mp = SECONDARY_MONETARY_POLICY_DEPLOYER.deploy(
+        factory, amm, borrowed_token, *params, rate_shift
+    )
+    curve = ref.HyperbolicCurve.secondary(*params, rate_shift)
+    assert ref.HyperbolicCurve.from_contract(mp) == curve
+
+    markets = _legacy_markets(borrowed_token)
+    utilizations = _utilizations(borrowed_token, markets)
+    for r0 in [RATE, 10**7]:
+        amm.set_rate(r0)
+        rates = curve.rates(utilizations, r0)
+        assert [mp.rate(m.address) for m in markets] == rates
+
+    market = markets[3]
+    balance = borrowed_token.balanceOf(market.address)
+    for d_reserves, d_debt in CHANGES:
+        u = ref.legacy_utilization(balance, market.total_debt(), d_reserves, d_debt)
+        assert mp.future_rate(market.address, d_reserves, d_debt) == curve.rate(u, 10**7)
+
+
+def test_susde(factory, borrowed_token):
+    vault = boa.loads(_ETHENA_VAULT_MOCK, 10**24, 10**19)
+    params = CURVES[0]
+    mp = SUSDE_MONETARY_POLICY_DEPLOYER.deploy(factory, vault, borrowed_token, *params, 0)
+    curve = ref.HyperbolicCurve.susde(*params, 0)
+    assert ref.HyperbolicCurve.from_contract(mp) == curve
+
+    markets = _legacy_markets(borrowed_token)
+    rates = curve.rates(_utilizations(borrowed_token, markets), mp.ma_susde_rate())
+    assert [mp.rate(m.address) for m in markets] == rates
+
+
+@pytest.mark.parametrize("rates", [(10**15 // 31536000, 10**19 // 31536000), (10**9, 10**10)])
+def test_semilog(factory, borrowed_token, rates):
+    mp = SEMILOG_MONETARY_POLICY_DEPLOYER.deploy(borrowed_token, *rates, factory)
+    curve = ref.SemilogCurve.semilog(*rates)
+    assert ref.SemilogCurve.from_contract(mp) == curve
+
+    markets = _legacy_markets(borrowed_token)
+    assert [mp.rate(m.address) for m in markets] == [
+        curve.market_rate(borrowed_token.balanceOf(m.address), m.total_debt())
+        for m in markets
+    ]
+
+    market = markets[2]
+    balance = borrowed_token.balanceOf(market.address)
+    for d_reserves, d_debt in CHANGES:
+        assert mp.future_rate(market.address, d_reserves, d_debt) == curve.market_rate(
+            balance, market.total_debt(), d_reserves, d_debt
+        )
+
+    # With WAD of reserves the debt is the utilization itself
+    utilization_markets = []
+    for u in UTILIZATIONS:
+        market = MOCK_MARKET_DEPLOYER.deploy()
+        market.set_debt(u)
+        boa.deal(borrowed_token, market.address, WAD - u)
+        utilization_markets.append(market)
+    assert [mp.rate(m.address) for m in utilization_markets] == curve.rates(UTILIZATIONS)
+
+
+def _v2_controllers():
+    controllers = []
+    for u in UTILIZATIONS:
+        controller = MOCK_CONTROLLER_MP_DEPLOYER.deploy(ZERO_ADDRESS)
+        # 1% of the available balance belongs to the admin
+        controller.set_state(RESERVES * u // WAD, RESERVES - RESERVES * u // WAD + 10**22, 10**22)
+        controllers.append(controller)
+    return controllers
+
+
+def _v2_utilization(controller, d_reserves=0, d_debt=0):
+    return ref.utilization(
+        controller.available_balance(),
+        controller.total_debt(),
+        controller.admin_fees(),
+        d_reserves,
+        d_debt,
+    )
+
+
+@pytest.mark.parametrize("params", CURVES)
+@pytest.mark.parametrize("rate_shift", [0, 10**8])
+def test_hyperbolic_mp(params, rate_shift):
+    u0, alpha, beta = params
+    curve = ref.HyperbolicCurve.hyperbolic_mp(u0, RATE, alpha, beta, rate_shift)
+    rates = []
+    for controller in _v2_controllers():
+        mp = HYPERBOLIC_MP_DEPLOYER.deploy(controller, u0, RATE, alpha, beta, rate_shift)
+        rates.append(mp.rate())
+        for d_reserves, d_debt in CHANGES:
+            try:
+                u = _v2_utilization(controller, d_reserves, d_debt)
+            except AssertionError:
+                with boa.reverts():
+                    mp.future_rate(d_reserves, d_debt)
+                continue
+            assert mp.future_rate(d_reserves, d_debt) == curve.rate(u)
+    assert ref.HyperbolicCurve.from_contract(mp) == curve
+    assert rates == curve.rates([_v2_utilization(c) for c in _v2_controllers()])
+
+
+@pytest.mark.parametrize("params", CURVES)
+def test_hyperbolic_dynamic_mp(params):
+    curve = ref.HyperbolicCurve.hyperbolic_dynamic_mp(*params, 0)
+    calculator = MOCK_RATE_CALCULATOR_DEPLOYER.deploy(RATE)
+    controllers = _v2_controllers()
+    policies = [
+        HYPERBOLIC_DYNAMIC_MP_DEPLOYER.deploy(c, calculator, *params, 0) for c in controllers
+    ]
+    assert ref.HyperbolicCurve.from_contract(policies[0]) == curve
+
+    r0 = policies[0].target_rate()
+    assert r0 == ref.hyperbolic_dynamic_target_rate(RATE)
+    utilizations = [_v2_utilization(c) for c in controllers]
+    assert [mp.rate() for mp in policies] == curve.rates(utilizations, r0)
+
+
+@pytest.mark.parametrize("price", [98 * 10**16, WAD, 101 * 10**16])
+@pytest.mark.parametrize("sigma", [10**14, 2 * 10**16, 10**18])
+def test_agg_monetary_policy4(factory, price, sigma):
+    admin = boa.env.generate_address("admin")
+    with boa.env.prank(admin):
+        price_oracle = DUMMY_PRICE_ORACLE_DEPLOYER.deploy(admin, price)
+        mp = AGG_MONETARY_POLICY4_DEPLOYER.deploy(
+            admin, price_oracle, factory, [ZERO_ADDRESS] * 5, 634195839, sigma, 10**17, 10**8, 86400
+        )
+    curve = ref.AggCurve.agg_monetary_policy4(634195839, sigma, 10**17, 10**8)
+    assert ref.AggCurve.from_contract(mp) == curve
+
+    ceiling = 10**25
+    markets = []
+    for u in UTILIZATIONS + [WAD]:
+        market = MOCK_MARKET_DEPLOYER.deploy()
+        factory.add_market(market.address, ceiling)
+        factory.set_debt(market.address, ceiling * u // WAD)
+        markets.append(market)
+    fills = [ref.fill(m.total_debt(), ceiling) for m in markets]
+    # A fresh policy's EMA of the PegKeepers' debt ratio is the target fraction
+    assert [mp.rate(m.address) for m in markets] == curve.rates(fills, price, 10**17)
+
+
+def test_curve_grid_skips_rejected_parameters(factory, borrowed_token):
+    amm = MOCK_RATE_SETTER_DEPLOYER.deploy(RATE)
+    axes = dict(
+        target_utilization=[0, 5 * 10**17, 85 * 10**16, WAD],
+        low_ratio=[10**15, 5 * 10**17, 9 * 10**17, 2 * WAD],
+        high_ratio=[WAD, 11 * 10**17, 3 * WAD, 101 * WAD],
+        rate_shift=[0],
+    )
+    grid = ref.curve_grid(ref.HyperbolicCurve.secondary, **axes)
+    assert 0 < len(grid) < 4 * 4 * 4
+
+    for key in ref.curve_grid(lambda **kw: kw, **axes):
+        if key in grid:
+            mp = SECONDARY_MONETARY_POLICY_DEPLOYER.deploy(factory, amm, borrowed_token, *key)
+            assert ref.HyperbolicCurve.from_contract(mp) == grid[key]
+        else:
+            with boa.reverts():
+                SECONDARY_MONETARY_POLICY_DEPLOYER.deploy(factory, amm, borrowed_token, *key)
+
+    table = ref.evaluate(grid, UTILIZATIONS, r0=RATE)
+    assert table.keys() == grid.keys()
+    assert all(len(rates) == len(UTILIZATIONS) for rates in table.values())
@@ -0,0 +1,323 @@
+"""Binary-search quoting against one AMM snapshot.
+
+`calc_swap_out`, `calc_swap_in` and `get_amount_for_price` walk the bands from
+the active one until the trade is filled. Everything they compute for a band
+they walk through in full does not depend on the amount: only the band where
+the trade stops does. `AMMQuoter` walks each direction once for an
+`AMMModel` snapshot. It keeps the per-band values and their running sums, so
+a quote is a bisection over those sums plus the contract's math for the last
+band. Results are bit-identical to the on-chain views as long as the
+snapshot is current (same block, same oracle price).
+
+Amounts inside the curves are in the contract's internal units (multiplied by
+the token precision), like `bands_x` / `bands_y`.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from itertools import accumulate
+from math import isqrt
+from typing import List, Tuple
+
+from tests.utils.amm_reference import (
+    MAX_SKIP_TICKS,
+    MAX_TICKS,
+    WAD,
+    AMMModel,
+    sub_or_zero,
+)
+
+
+@dataclass
+class _Band:
+    """A liquid band of a trade walk, from the side of the trade.
+
+    `in_` / `out` are the band's balances of the coin going in / out, and
+    `f_in` / `g_out` the matching invariant offsets: (x, y, f, g) for a pump,
+    (y, x, g, f) for a dump.
+    """
+
+    in_: int
+    out: int
+    f_in: int
+    g_out: int
+    inv: int
+    antifee: int
+
+    def full_in(self) -> int:
+        """Input needed to take all of `out`, before the minimum of 1."""
+        return ((self.inv // self.g_out - self.f_in) - self.in_) * self.antifee // WAD
+
+    def out_for_in(self, in_amount_left: int) -> int:
+        """Output for the rest of an exact-input trade ending in this band."""
+        dest = in_amount_left * WAD // self.antifee
+        last_tick_j = min(
+            self.inv // (self.f_in + (self.in_ + dest)) - self.g_out + 1, self.out
+        )
+        return self.out - last_tick_j
+
+    def in_for_out(self, out_amount_left: int) -> int:
+        """Input for the rest of an exact-output trade ending in this band."""
+        last_tick_j = self.out - out_amount_left
+        dest = self.inv // (self.g_out + last_tick_j) - self.f_in - self.in_
+        return dest * self.antifee // WAD
+
+
+class DepthCurve:
+    """Cumulative input and output of a trade walking all liquid bands in one direction."""
+
+    def __init__(self, bands: List[_Band]):
+        self.bands = bands
+        full_in = [band.full_in() for band in bands]
+        # in_depth[k] / out_depth[k]: spent / received after taking bands 0 .. k - 1
+        self.in_depth = [0, *accumulate(max(dx, 1) for dx in full_in)]
+        self.out_depth = [0, *accumulate(band.out for band in bands)]
+        # An exact-input trade stops in the first band k with in_depth[k] + full_in[k] >= amount,
+        # an exact-output one in the first band k with out_depth[k + 1] >= amount
+        self._in_stops = [depth + dx for depth, dx in zip(self.in_depth, full_in)]
+
+    def swap_out(self, in_amount: int) -> Tuple[int, int]:
+        """(in, out) of `calc_swap_out` before rounding to the token precision."""
+        k = bisect_left(self._in_stops, in_amount)
+        if k == len(self.bands):
+            return self.in_depth[k], self.out_depth[k]
+        out_amount = self.out_depth[k] + self.bands[k].out_for_in(
+            in_amount - self.in_depth[k]
+        )
+        return in_amount, out_amount
+
+    def swap_in(self, out_amount: int) -> Tuple[int, int]:
+        """(in, out) of `calc_swap_in` before rounding to the token precision."""
+        k = bisect_left(self.out_depth, out_amount, lo=1) - 1
+        if k == len(self.bands):
+            return self.in_depth[k], self.out_depth[k]
+        in_amount = self.in_depth[k] + self.bands[k].in_for_out(
+            out_amount - self.out_depth[k]
+        )
+        return in_amount, out_amount
+
+
+@dataclass
+class _PriceStep:
+    """A band `get_amount_for_price` walks through, between AMM prices p_down and p_up."""
+
+    p_down: int
+    p_up: int
+    x: int
+    y: int
+    f: int
+    g: int
+    inv: int
+    antifee: int
+    not_empty: bool
+
+
+class PriceCurve:
+    """Cumulative amounts of `get_amount_for_price` walking in one direction."""
+
+    def __init__(self, pump: bool, steps: List[_PriceStep]):
+        self.pump = pump
+        self.steps = steps
+        full = [self._full(step) for step in steps]
+        self.depth = [0, *accumulate(full)]
+        # Band price ranges are adjacent: ascending for a pump, descending for a dump
+        if pump:
+            self._keys = [step.p_up for step in steps]
+        else:
+            self._keys = [-step.p_down for step in steps]
+
+    def _full(self, step: _PriceStep) -> int:
+        if not step.not_empty:
+            return 0
+        if self.pump:
+            return ((step.inv // step.g - step.f) - step.x) * step.antifee // WAD
+        return ((step.inv // step.f - step.g) - step.y) * step.antifee // WAD
+
+    def amount(self, p: int) -> int:
+        """Amount before rounding to the token precision."""
+        first = self.steps[0]
+        if (self.pump and p < first.p_down) or (not self.pump and p > first.p_up):
+            # The walk never gets to a band containing p
+            return self.depth[-1]
+        k = bisect_left(self._keys, p if self.pump else -p)
+        if k == len(self.steps):
+            return self.depth[-1]
+        step = self.steps[k]
+        amount = self.depth[k]
+        if step.not_empty:
+            ynew = sub_or_zero(isqrt(step.inv * WAD // p), step.g)
+            xnew = sub_or_zero(step.inv // (step.g + ynew), step.f)
+            if self.pump:
+                amount += sub_or_zero(xnew, step.x) * step.antifee // WAD
+            else:
+                amount += sub_or_zero(ynew, step.y) * step.antifee // WAD
+        return amount
+
+
+class AMMQuoter:
+    """get_dy / get_dx / get_amount_for_price of an AMM snapshot by bisection.
+
+    Build it from an `AMMModel` (or a deployed contract with `from_contract`)
+    once per block: the walks are done in the constructor and every quote
+    after that is O(log(bands)).
+    """
+
+    def __init__(self, model: AMMModel):
+        self.model = model
+        self.p_o = model.price_oracle_ro()
+        self.pump = DepthCurve(self._trade_walk(True))
+        self.dump = DepthCurve(self._trade_walk(False))
+        self.pump_to_price = PriceCurve(True, self._price_walk(True))
+        self.dump_to_price = PriceCurve(False, self._price_walk(False))
+        n = model.active_band
+        self._p = model._get_p(n, model.bands_x(n), model.bands_y(n))
+
+    @classmethod
+    def from_contract(cls, amm) -> "AMMQuoter":
+        return cls(AMMModel.from_contract(amm))
+
+    # --- walks ----------------------------------------------------------------
+
+    def _antifee(self, x: int, y: int, p_o_up: int) -> int:
+        fee = max(self.model.fee, self.p_o[1])
+        if x > 0 or y > 0:
+            fee = max(self.model.get_dynamic_fee(self.p_o[0], p_o_up), fee)
+        return WAD**2 // (WAD - min(fee, WAD - 1))
+
+    def _trade_walk(self, pump: bool) -> List[_Band]:
+        """Liquid bands of `calc_swap_out` / `calc_swap_in` with an unlimited amount."""
+        m = self.model
+        p_o = self.p_o[0]
+        n = m.active_band
+        p_o_up = m.p_oracle_up(n)
+        x = m.bands_x(n)
+        y = m.bands_y(n)
+        j = MAX_TICKS
+        p_ratio_min = 10**36 // m.MAX_ORACLE_DN_POW
+        bands = []
+
+        for i in range(MAX_TICKS + MAX_SKIP_TICKS):
+            f = g = inv = 0
+            if x > 0 or y > 0:
+                if j == MAX_TICKS:
+                    j = 0
+                f, g, inv = m._band_invariant(x, y, p_o, p_o_up)
+            antifee = self._antifee(x, y, p_o_up)
+            p_ratio = p_o_up * WAD // p_o
+
+            if pump:
+                if y != 0 and g != 0:
+                    bands.append(_Band(x, y, f, g, inv, antifee))
+                if i == MAX_TICKS + MAX_SKIP_TICKS - 1:
+                    break
+                if n == m.max_band or j == MAX_TICKS - 1 or p_ratio < p_ratio_min:
+                    break
+                n += 1
+                p_o_up = p_o_up * m.Aminus1 // m.A
+                x = 0
+                y = m.bands_y(n)
+            else:
+                if x != 0 and f != 0:
+                    bands.append(_Band(y, x, g, f, inv, antifee))
+                if i == MAX_TICKS + MAX_SKIP_TICKS - 1:
+                    break
+                if n == m.min_band or j == MAX_TICKS - 1 or p_ratio > m.MAX_ORACLE_DN_POW:
+                    break
+                n -= 1
+                p_o_up = p_o_up * m.A // m.Aminus1
+                x = m.bands_x(n)
+                y = 0
+
+            if j != MAX_TICKS:
+                j += 1
+
+        return bands
+
+    def _price_walk(self, pump: bool) -> List[_PriceStep]:
+        """Bands of `get_amount_for_price` in one direction, up to where the walk ends."""
+        m = self.model
+        p_o = self.p_o[0]
+        n = m.active_band
+        p_o_up = m.p_oracle_up(n)
+        p_down = p_o**2 // p_o_up * p_o // p_o_up
+        p_up = p_down * m.A2 // m.Aminus12
+        j = MAX_TICKS
+        steps = []
+
+        for i in range(MAX_TICKS + MAX_SKIP_TICKS):
+            assert p_o_up > 0
+            x = m.bands_x(n)
+            y = m.bands_y(n)
+            not_empty = x > 0 or y > 0
+            f = g = inv = 0
+            if not_empty:
+                f, g, inv = m._band_invariant(x, y, p_o, p_o_up)
+                if j == MAX_TICKS:
+                    j = 0
+            antifee = self._antifee(x, y, p_o_up)
+            steps.append(_PriceStep(p_down, p_up, x, y, f, g, inv, antifee, not_empty))
+            p_ratio = p_o_up * WAD // p_o
+
+            if pump:
+                if n == m.max_band or j == MAX_TICKS - 1:
+                    break
+                if p_ratio < 10**36 // m.MAX_ORACLE_DN_POW:
+                    break
+                n += 1
+                p_down = p_up
+                p_up = p_up * m.A2 // m.Aminus12
+                p_o_up = p_o_up * m.Aminus1 // m.A
+            else:
+                if n == m.min_band or j == MAX_TICKS - 1:
+                    break
+                if p_ratio > m.MAX_ORACLE_DN_POW:
+                    break
+                n -= 1
+                p_up = p_down
+                p_down = p_down * m.Aminus12 // m.A2
+                p_o_up = p_o_up * m.A // m.Aminus1
+
+            if j != MAX_TICKS:
+                j += 1
+
+        return steps
+
+    # --- quotes ---------------------------------------------------------------
+
+    def _trade(self, i: int, j: int, amount: int, is_in: bool) -> Tuple[int, int]:
+        in_precision, out_precision = self.model._precisions(i, j)
+        if amount == 0:
+            return 0, 0
+        curve = self.pump if i == 0 else self.dump
+        if is_in:
+            in_amount, out_amount = curve.swap_out(amount * in_precision)
+        else:
+            in_amount, out_amount = curve.swap_in(amount * out_precision)
+        # Round the input up and the output down, like the contract
+        return (in_amount + in_precision - 1) // in_precision, out_amount // out_precision
+
+    def get_dy(self, i: int, j: int, in_amount: int) -> int:
+        return self._trade(i, j, in_amount, True)[1]
+
+    def get_dxdy(self, i: int, j: int, in_amount: int) -> Tuple[int, int]:
+        return self._trade(i, j, in_amount, True)
+
+    def get_dx(self, i: int, j: int, out_amount: int) -> int:
+        in_amount, out_done = self._trade(i, j, out_amount, False)
+        assert out_done == out_amount
+        return in_amount
+
+    def get_dydx(self, i: int, j: int, out_amount: int) -> Tuple[int, int]:
+        in_amount, out_done = self._trade(i, j, out_amount, False)
+        return out_done, in_amount
+
+    def get_amount_for_price(self, p: int) -> Tuple[int, bool]:
+        pump = p >= self._p
+        curve = self.pump_to_price if pump else self.dump_to_price
+        amount = curve.amount(p)
+        if amount == 0:
+            return 0, pump
+        precision = (
+            self.model.BORROWED_PRECISION if pump else self.model.COLLATERAL_PRECISION
+        )
+        return (amount - 1) // precision + 1, pump
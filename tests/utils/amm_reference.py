@@ -0,0 +1,1114 @@
+"""Pure-Python reference model of the LLAMMA band math in AMM.vy.
+
+Mirrors the contract's fixed-point arithmetic exactly (floor division for
+`unsafe_div`, snekmate's `_wad_exp` / `_wad_ln`, the oracle limiter and the
+dynamic fee) so quotes computed off-chain are bit-identical to the on-chain
+views. Trades, deposits and withdrawals mutate the model the same way the
+contract mutates storage, so a snapshot can be used for what-if sweeps
+without executing any EVM code.
+
+Bands are held as contiguous lists covering `[min_band, max_band]` rather than
+per-band mappings; reads outside of that range return zero like an untouched
+storage slot. Python ints are used throughout (rather than fixed-width numpy
+arrays) because intermediate products routinely exceed 2**128.
+
+The model has no boa dependency so it can be used outside of the test suite;
+`from_contract` is the only helper that expects a boa `VyperContract`.
+Differential tests live in tests/amm/test_amm_reference.py.
+"""
+
+from dataclasses import dataclass, field
+from math import isqrt
+from typing import Dict, List, Tuple
+
+# Constants mirrored from curve_stablecoin/constants.vy and AMM.vy
+WAD = 10**18
+MAX_TICKS = 50
+MAX_SKIP_TICKS = 1024
+DEAD_SHARES = 1000
+PREV_P_O_DELAY = 2 * 60
+MAX_P_O_CHG = 12500 * 10**14
+
+_UINT256_MASK = 2**256 - 1
+
+
+def _to_int256(x: int) -> int:
+    """Reinterprets an unsigned 256-bit word as a two's complement int256."""
+    x &= _UINT256_MASK
+    return x - 2**256 if x >= 2**255 else x
+
+
+def _sdiv(a: int, b: int) -> int:
+    """Signed division truncating toward zero, matching EVM SDIV / Vyper `//`."""
+    q = abs(a) // abs(b)
+    return -q if (a < 0) != (b < 0) else q
+
+
+def sub_or_zero(a: int, b: int) -> int:
+    """Replicates `crv_math.sub_or_zero`."""
+    return a - b if a > b else 0
+
+
+def wad_exp(x: int) -> int:
+    """Replicates snekmate's `math._wad_exp`."""
+    if x <= -41_446_531_673_892_822_313:
+        return 0
+    assert x < 135_305_999_368_893_231_589, "math: wad_exp overflow"
+
+    x = _sdiv(x << 78, 5**18)
+    k = (_sdiv(x << 96, 54_916_777_467_707_473_351_141_471_128) + 2**95) >> 96
+    x = x - k * 54_916_777_467_707_473_351_141_471_128
+
+    y = ((x + 1_346_386_616_545_796_478_920_950_773_328) * x >> 96) + (
+        57_155_421_227_552_351_082_224_309_758_442
+    )
+    p = (
+        (
+            ((y + x - 94_201_549_194_550_492_254_356_042_504_812) * y >> 96)
+            + 28_719_021_644_029_726_153_956_944_680_412_240
+        )
+        * x
+    ) + (4_385_272_521_454_847_904_659_076_985_693_276 << 96)
+
+    q = ((x - 2_855_989_394_907_223_263_936_484_059_900) * x >> 96) + (
+        50_020_603_652_535_783_019_961_831_881_945
+    )
+    q = (q * x >> 96) - 533_845_033_583_426_703_283_633_433_725_380
+    q = (q * x >> 96) + 3_604_857_256_930_695_427_073_651_918_091_429
+    q = (q * x >> 96) - 14_423_608_567_350_463_180_887_372_962_807_573
+    q = (q * x >> 96) + 26_449_188_498_355_588_339_934_803_723_976_023
+
+    r = _sdiv(p, q)
+    result = (
+        (r & _UINT256_MASK)
+        * 3_822_833_074_963_236_453_042_738_258_902_158_003_155_416_615_667
+        & _UINT256_MASK
+    ) >> (195 - k)
+    assert result < 2**255
+    return result
+
+
+def wad_ln(x: int) -> int:
+    """Replicates snekmate's `math._wad_ln`."""
+    assert x >= 0, "math: wad_ln undefined"
+    if x == 0:
+        return 0
+
+    k = x.bit_length() - 1 - 96
+    x = _to_int256(((x << (159 - k)) & _UINT256_MASK) >> 159)
+
+    p = ((x + 3_273_285_459_638_523_848_632_254_066_296) * x >> 96) + (
+        24_828_157_081_833_163_892_658_089_445_524
+    )
+    p = (p * x >> 96) + 43_456_485_725_739_037_958_740_375_743_393
+    p = (p * x >> 96) - 11_111_509_109_440_967_052_023_855_526_967
+    p = (p * x >> 96) - 45_023_709_667_254_063_763_336_534_515_857
+    p = (p * x >> 96) - 14_706_773_417_378_608_786_704_636_184_526
+    p = p * x - (795_164_235_651_350_426_258_249_787_498 << 96)
+
+    q = ((x + 5_573_035_233_440_673_466_300_451_813_936) * x >> 96) + (
+        71_694_874_799_317_883_764_090_561_454_958
+    )
+    q = (q * x >> 96) + 283_447_036_172_924_575_727_196_451_306_956
+    q = (q * x >> 96) + 401_686_690_394_027_663_651_624_208_769_553
+    q = (q * x >> 96) + 204_048_457_590_392_012_362_485_061_816_622
+    q = (q * x >> 96) + 31_853_899_698_501_571_402_653_359_427_138
+    q = (q * x >> 96) + 909_429_971_244_387_300_277_376_558_375
+
+    r = _sdiv(p, q)
+    return (
+        r * 1_677_202_110_996_718_588_342_820_967_067_443_963_516_166
+        + k
+        * 16_597_577_552_685_614_221_487_285_958_193_947_469_193_820_559_219_878_177_908_093_499_208_371
+        + 600_920_179_829_731_861_736_702_779_321_621_459_595_472_258_049_074_101_567_377_883_020_018_308
+    ) >> 174
+
+
+@dataclass
+class DetailedTrade:
+    """Mirror of `IAMM.DetailedTrade`."""
+
+    in_amount: int = 0
+    out_amount: int = 0
+    n1: int = 0
+    n2: int = 0
+    ticks_in: List[int] = field(default_factory=list)
+    last_tick_j: int = 0
+
+
+class AMMModel:
+    """In-memory LLAMMA whose views and mutations match AMM.vy bit for bit.
+
+    State variables keep the contract's names. `timestamp` plays the role of
+    `block.timestamp` and `raw_oracle_price` is what the external price oracle
+    returns from `price()` / `price_w()`; both can be changed between calls to
+    model the passage of time or oracle moves.
+    """
+
+    def __init__(
+        self,
+        A: int,
+        base_price: int,
+        fee: int,
+        borrowed_precision: int = 1,
+        collateral_precision: int = 1,
+        sqrt_band_ratio: int = 0,
+        raw_oracle_price: int = 0,
+        timestamp: int = 0,
+    ):
+        self.A = A
+        self.Aminus1 = A - 1
+        self.A2 = A**2
+        self.Aminus12 = (A - 1) ** 2
+        self.BASE_PRICE = base_price
+        self.BORROWED_PRECISION = borrowed_precision
+        self.COLLATERAL_PRECISION = collateral_precision
+        self.SQRT_BAND_RATIO = sqrt_band_ratio or isqrt(10**36 * A // (A - 1))
+        self.LOG_A_RATIO = wad_ln(A * WAD // (A - 1))
+        pow_ = WAD
+        for _ in range(50):
+            pow_ = pow_ * A // (A - 1)
+        self.MAX_ORACLE_DN_POW = pow_
+
+        self.fee = fee
+        self.rate = 0
+        self.rate_time = timestamp
+        self.rate_mul = WAD
+        self.active_band = 0
+        self.min_band = 0
+        self.max_band = 0
+
+        self.raw_oracle_price = raw_oracle_price
+        self.timestamp = timestamp
+        self.old_p_o = raw_oracle_price
+        self.old_dfee = 0
+        self.prev_p_o_time = timestamp
+
+        # Contiguous band storage: index i holds band `_band_offset + i`
+        self._band_offset = 0
+        self._bands_x: List[int] = [0]
+        self._bands_y: List[int] = [0]
+        self._total_shares: List[int] = [0]
+
+        # user -> (n1, n2, shares per band)
+        self.user_shares: Dict[str, Tuple[int, int, List[int]]] = {}
+
+    # --- construction helpers ---------------------------------------------
+
+    @classmethod
+    def from_contract(cls, amm, users=()) -> "AMMModel":
+        """Snapshot a deployed AMM (boa `VyperContract`) into a model.
+
+        Private storage and immutables are read with `eval`, so this only works
+        against contracts loaded from source in boa.
+        """
+        import boa
+
+        model = cls(
+            A=amm.A(),
+            base_price=amm.eval("BASE_PRICE"),
+            fee=amm.fee(),
+            borrowed_precision=amm.eval("BORROWED_PRECISION"),
+            collateral_precision=amm.eval("COLLATERAL_PRECISION"),
+            sqrt_band_ratio=amm.eval("SQRT_BAND_RATIO"),
+            raw_oracle_price=amm.eval("staticcall self._price_oracle.price()"),
+            timestamp=boa.env.evm.patch.timestamp,
+        )
+        model.rate = amm.rate()
+        model.rate_time = amm.eval("self.rate_time")
+        model.rate_mul = amm.eval("self.rate_mul")
+        model.active_band = amm.active_band()
+        model.min_band = amm.min_band()
+        model.max_band = amm.max_band()
+        model.old_p_o = amm.eval("self.old_p_o")
+        model.old_dfee = amm.eval("self.old_dfee")
+        model.prev_p_o_time = amm.eval("self.prev_p_o_time")
+
+        n1 = min(model.min_band, model.active_band)
+        n2 = max(model.max_band, model.active_band)
+        model._band_offset = n1
+        model._bands_x = [amm.bands_x(n) for n in range(n1, n2 + 1)]
+        model._bands_y = [amm.bands_y(n) for n in range(n1, n2 + 1)]
+        model._total_shares = [
+            amm.eval(f"self.total_shares[{n}]") for n in range(n1, n2 + 1)
+        ]
+
+        for user in users:
+            if amm.has_liquidity(user):
+                ns = amm.read_user_tick_numbers(user)
+                model.user_shares[str(user)] = (
+                    ns[0],
+                    ns[1],
+                    list(amm.read_user_ticks(user)),
+                )
+        return model
+
+    def _extend(self, n1: int, n2: int):
+        """Grow the contiguous band arrays so that they cover `[n1, n2]`."""
+        lo = self._band_offset
+        hi = lo + len(self._bands_x) - 1
+        if n1 < lo:
+            pad = [0] * (lo - n1)
+            self._bands_x[:0] = pad
+            self._bands_y[:0] = pad
+            self._total_shares[:0] = pad
+            self._band_offset = n1
+        if n2 > hi:
+            pad = [0] * (n2 - hi)
+            self._bands_x.extend(pad)
+            self._bands_y.extend(pad)
+            self._total_shares.extend(pad)
+
+    def bands_x(self, n: int) -> int:
+        i = n - self._band_offset
+        return self._bands_x[i] if 0 <= i < len(self._bands_x) else 0
+
+    def bands_y(self, n: int) -> int:
+        i = n - self._band_offset
+        return self._bands_y[i] if 0 <= i < len(self._bands_y) else 0
+
+    def total_shares(self, n: int) -> int:
+        i = n - self._band_offset
+        return self._total_shares[i] if 0 <= i < len(self._total_shares) else 0
+
+    def _set_band(self, n: int, x: int, y: int):
+        # Both coins of a band share one storage slot in the AMM
+        assert x <= 2**128 - 1 and y <= 2**128 - 1
+        self._extend(n, n)
+        i = n - self._band_offset
+        self._bands_x[i] = x
+        self._bands_y[i] = y
+
+    # --- prices -----------------------------------------------------------
+
+    def limit_p_o(self, p: int) -> Tuple[int, int]:
+        """Replicates `limit_p_o`. Returns (limited_price_oracle, dynamic_fee)."""
+        p_new = p
+        dt = PREV_P_O_DELAY - min(PREV_P_O_DELAY, self.timestamp - self.prev_p_o_time)
+        ratio = 0
+
+        if dt > 0:
+            old_p_o = self.old_p_o
+            if p > old_p_o:
+                ratio = old_p_o * WAD // p
+                if ratio < 10**36 // MAX_P_O_CHG:
+                    p_new = old_p_o * MAX_P_O_CHG // WAD
+                    ratio = 10**36 // MAX_P_O_CHG
+            else:
+                ratio = p * WAD // old_p_o
+                if ratio < 10**36 // MAX_P_O_CHG:
+                    p_new = old_p_o * WAD // MAX_P_O_CHG
+                    ratio = 10**36 // MAX_P_O_CHG
+
+            ratio = min(
+                (WAD + self.old_dfee - ratio**3 // 10**36) * dt // PREV_P_O_DELAY,
+                WAD - 1,
+            )
+
+        return p_new, ratio
+
+    def price_oracle_ro(self) -> Tuple[int, int]:
+        return self.limit_p_o(self.raw_oracle_price)
+
+    def price_oracle_w(self) -> Tuple[int, int]:
+        p = self.limit_p_o(self.raw_oracle_price)
+        self.prev_p_o_time = self.timestamp
+        self.old_p_o = p[0]
+        self.old_dfee = p[1]
+        return p
+
+    def price_oracle(self) -> int:
+        return self.price_oracle_ro()[0]
+
+    def get_dynamic_fee(self, p_o: int, p_o_up: int) -> int:
+        A, Aminus1 = self.A, self.Aminus1
+        p_c_d = p_o**2 // p_o_up * p_o // p_o_up
+        p_c_u = p_c_d * A // Aminus1 * A // Aminus1
+        if p_o < p_c_d:
+            return (p_c_d - p_o) * (WAD // 4) // p_c_d
+        elif p_o > p_c_u:
+            return (p_o - p_c_u) * (WAD // 4) // p_o
+        return 0
+
+    def get_rate_mul(self) -> int:
+        return (
+            self.rate_mul * (WAD + self.rate * (self.timestamp - self.rate_time)) // WAD
+        )
+
+    def get_base_price(self) -> int:
+        return self.BASE_PRICE * self.get_rate_mul() // WAD
+
+    def set_rate(self, rate: int) -> int:
+        rate_mul = self.get_rate_mul()
+        self.rate_mul = rate_mul
+        self.rate_time = self.timestamp
+        self.rate = rate
+        return rate_mul
+
+    def p_oracle_up(self, n: int) -> int:
+        exp_result = wad_exp(-n * self.LOG_A_RATIO)
+        assert exp_result > 1000  # dev: limit precision of the multiplier
+        return self.get_base_price() * exp_result // WAD
+
+    def p_oracle_down(self, n: int) -> int:
+        return self.p_oracle_up(n + 1)
+
+    def _p_current_band(self, n: int) -> int:
+        p_base = self.p_oracle_up(n)
+        p_oracle = self.price_oracle_ro()[0]
+        return p_oracle**2 // p_base * p_oracle // p_base
+
+    def p_current_up(self, n: int) -> int:
+        return self._p_current_band(n + 1)
+
+    def p_current_down(self, n: int) -> int:
+        return self._p_current_band(n)
+
+    def get_y0(self, x: int, y: int, p_o: int, p_o_up: int) -> int:
+        """Replicates `_get_y0`."""
+        assert p_o != 0
+        A = self.A
+        b = 0
+        if x != 0:
+            b = p_o_up * self.Aminus1 * x // p_o
+        if y != 0:
+            b += A * p_o**2 // p_o_up * y // WAD
+        if x > 0 and y > 0:
+            D = b**2 + (4 * A * p_o) * y // WAD * x
+            return (b + isqrt(D)) * WAD // (2 * A * p_o)
+        return b * WAD // (A * p_o)
+
+    def _get_p(self, n: int, x: int, y: int) -> int:
+        A, Aminus1 = self.A, self.Aminus1
+        p_o_up = self.p_oracle_up(n)
+        p_o = self.price_oracle_ro()[0]
+        assert p_o_up != 0
+
+        if x == 0:
+            if y == 0:
+                return p_o**2 // p_o_up * p_o // p_o_up * A // Aminus1
+            return p_o**2 // p_o_up * p_o // p_o_up
+        if y == 0:
+            p_o_up = p_o_up * Aminus1 // A
+            return p_o**2 // p_o_up * p_o // p_o_up
+
+        y0 = self.get_y0(x, y, p_o, p_o_up)
+        f = A * y0 * p_o // p_o_up * p_o
+        g = Aminus1 * y0 * p_o_up // p_o
+        return (f + x * WAD) // (g + y)
+
+    def get_p(self) -> int:
+        n = self.active_band
+        return self._get_p(n, self.bands_x(n), self.bands_y(n))
+
+    # --- swaps ------------------------------------------------------------
+
+    def _band_invariant(self, x: int, y: int, p_o: int, p_o_up: int):
+        """(f, g, Inv) for a non-empty band, as computed inline in the contract."""
+        y0 = self.get_y0(x, y, p_o, p_o_up)
+        f = self.A * y0 * p_o // p_o_up * p_o // WAD
+        g = self.Aminus1 * y0 * p_o_up // p_o
+        return f, g, (f + x) * (g + y)
+
+    def calc_swap_out(
+        self,
+        pump: bool,
+        in_amount: int,
+        p_o: Tuple[int, int],
+        in_precision: int,
+        out_precision: int,
+    ) -> DetailedTrade:
+        """Replicates `calc_swap_out`."""
+        A, Aminus1 = self.A, self.Aminus1
+        min_band = self.min_band
+        max_band = self.max_band
+        out = DetailedTrade()
+        out.n2 = self.active_band
+        p_o_up = self.p_oracle_up(out.n2)
+        x = self.bands_x(out.n2)
+        y = self.bands_y(out.n2)
+
+        in_amount_left = in_amount
+        fee = max(self.fee, p_o[1])
+        j = MAX_TICKS
+        last_i = MAX_TICKS + MAX_SKIP_TICKS - 1
+        p_ratio_min = 10**36 // self.MAX_ORACLE_DN_POW
+
+        for i in range(MAX_TICKS + MAX_SKIP_TICKS):
+            f = g = Inv = 0
+            dynamic_fee = fee
+
+            if x > 0 or y > 0:
+                if j == MAX_TICKS:
+                    out.n1 = out.n2
+                    j = 0
+                f, g, Inv = self._band_invariant(x, y, p_o[0], p_o_up)
+                dynamic_fee = max(self.get_dynamic_fee(p_o[0], p_o_up), fee)
+
+            antifee = WAD**2 // (WAD - min(dynamic_fee, WAD - 1))
+
+            if j != MAX_TICKS:
+                out.ticks_in.append(x if pump else y)
+
+            p_ratio = p_o_up * WAD // p_o[0]
+
+            if pump:
+                if y != 0 and g != 0:
+                    x_dest = (Inv // g - f) - x
+                    dx = x_dest * antifee // WAD
+                    if dx >= in_amount_left:
+                        x_dest = in_amount_left * WAD // antifee
+                        out.last_tick_j = min(Inv // (f + (x + x_dest)) - g + 1, y)
+                        x += in_amount_left
+                        out.out_amount += y - out.last_tick_j
+                        out.ticks_in[j] = x
+                        out.in_amount = in_amount
+                        break
+                    else:
+                        dx = max(dx, 1)
+                        in_amount_left -= dx
+                        out.ticks_in[j] = x + dx
+                        out.in_amount += dx
+                        out.out_amount += y
+
+                if i != last_i:
+                    if out.n2 == max_band:
+                        break
+                    if j == MAX_TICKS - 1:
+                        break
+                    if p_ratio < p_ratio_min:
+                        break
+                    out.n2 += 1
+                    p_o_up = p_o_up * Aminus1 // A
+                    x = 0
+                    y = self.bands_y(out.n2)
+
+            else:
+                if x != 0 and f != 0:
+                    y_dest = (Inv // f - g) - y
+                    dy = y_dest * antifee // WAD
+                    if dy >= in_amount_left:
+                        y_dest = in_amount_left * WAD // antifee
+                        out.last_tick_j = min(Inv // (g + (y + y_dest)) - f + 1, x)
+                        y += in_amount_left
+                        out.out_amount += x - out.last_tick_j
+                        out.ticks_in[j] = y
+                        out.in_amount = in_amount
+                        break
+                    else:
+                        dy = max(dy, 1)
+                        in_amount_left -= dy
+                        out.ticks_in[j] = y + dy
+                        out.in_amount += dy
+                        out.out_amount += x
+
+                if i != last_i:
+                    if out.n2 == min_band:
+                        break
+                    if j == MAX_TICKS - 1:
+                        break
+                    if p_ratio > self.MAX_ORACLE_DN_POW:
+                        break
+                    out.n2 -= 1
+                    p_o_up = p_o_up * A // Aminus1
+                    x = self.bands_x(out.n2)
+                    y = 0
+
+            if j != MAX_TICKS:
+                j += 1
+
+        out.in_amount = (
+            (out.in_amount + in_precision - 1) // in_precision * in_precision
+        )
+        out.out_amount = out.out_amount // out_precision * out_precision
+        return out
+
+    def calc_swap_in(
+        self,
+        pump: bool,
+        out_amount: int,
+        p_o: Tuple[int, int],
+        in_precision: int,
+        out_precision: int,
+    ) -> DetailedTrade:
+        """Replicates `calc_swap_in`."""
+        A, Aminus1 = self.A, self.Aminus1
+        min_band = self.min_band
+        max_band = self.max_band
+        out = DetailedTrade()
+        out.n2 = self.active_band
+        p_o_up = self.p_oracle_up(out.n2)
+        x = self.bands_x(out.n2)
+        y = self.bands_y(out.n2)
+
+        out_amount_left = out_amount
+        fee = max(self.fee, p_o[1])
+        j = MAX_TICKS
+        last_i = MAX_TICKS + MAX_SKIP_TICKS - 1
+        p_ratio_min = 10**36 // self.MAX_ORACLE_DN_POW
+
+        for i in range(MAX_TICKS + MAX_SKIP_TICKS):
+            f = g = Inv = 0
+            dynamic_fee = fee
+
+            if x > 0 or y > 0:
+                if j == MAX_TICKS:
+                    out.n1 = out.n2
+                    j = 0
+                f, g, Inv = self._band_invariant(x, y, p_o[0], p_o_up)
+                dynamic_fee = max(self.get_dynamic_fee(p_o[0], p_o_up), fee)
+
+            antifee = WAD**2 // (WAD - min(dynamic_fee, WAD - 1))
+
+            if j != MAX_TICKS:
+                out.ticks_in.append(x if pump else y)
+
+            p_ratio = p_o_up * WAD // p_o[0]
+
+            if pump:
+                if y != 0 and g != 0:
+                    if y >= out_amount_left:
+                        out.last_tick_j = y - out_amount_left
+                        x_dest = Inv // (g + out.last_tick_j) - f - x
+                        dx = x_dest * antifee // WAD
+                        out.out_amount = out_amount
+                        out.in_amount += dx
+                        out.ticks_in[j] = x + dx
+                        break
+                    else:
+                        x_dest = (Inv // g - f) - x
+                        dx = max(x_dest * antifee // WAD, 1)
+                        out_amount_left -= y
+                        out.in_amount += dx
+                        out.out_amount += y
+                        out.ticks_in[j] = x + dx
+
+                if i != last_i:
+                    if out.n2 == max_band:
+                        break
+                    if j == MAX_TICKS - 1:
+                        break
+                    if p_ratio < p_ratio_min:
+                        break
+                    out.n2 += 1
+                    p_o_up = p_o_up * Aminus1 // A
+                    x = 0
+                    y = self.bands_y(out.n2)
+
+            else:
+                if x != 0 and f != 0:
+                    if x >= out_amount_left:
+                        out.last_tick_j = x - out_amount_left
+                        y_dest = Inv // (f + out.last_tick_j) - g - y
+                        dy = y_dest * antifee // WAD
+                        out.out_amount = out_amount
+                        out.in_amount += dy
+                        out.ticks_in[j] = y + dy
+                        break
+                    else:
+                        y_dest = (Inv // f - g) - y
+                        dy = max(y_dest * antifee // WAD, 1)
+                        out_amount_left -= x
+                        out.in_amount += dy
+                        out.out_amount += x
+                        out.ticks_in[j] = y + dy
+
+                if i != last_i:
+                    if out.n2 == min_band:
+                        break
+                    if j == MAX_TICKS - 1:
+                        break
+                    if p_ratio > self.MAX_ORACLE_DN_POW:
+                        break
+                    out.n2 -= 1
+                    p_o_up = p_o_up * A // Aminus1
+                    x = self.bands_x(out.n2)
+                    y = 0
+
+            if j != MAX_TICKS:
+                j += 1
+
+        out.in_amount = (
+            (out.in_amount + in_precision - 1) // in_precision * in_precision
+        )
+        out.out_amount = out.out_amount // out_precision * out_precision
+        return out
+
+    def _precisions(self, i: int, j: int) -> Tuple[int, int]:
+        assert (i == 0 and j == 1) or (i == 1 and j == 0), "Wrong index"
+        if i == 0:
+            return self.BORROWED_PRECISION, self.COLLATERAL_PRECISION
+        return self.COLLATERAL_PRECISION, self.BORROWED_PRECISION
+
+    def get_dxdy_trade(self, i: int, j: int, amount: int, is_in: bool) -> DetailedTrade:
+        """Replicates `_get_dxdy`."""
+        in_precision, out_precision = self._precisions(i, j)
+        if amount == 0:
+            return DetailedTrade()
+        p_o = self.price_oracle_ro()
+        if is_in:
+            out = self.calc_swap_out(
+                i == 0, amount * in_precision, p_o, in_precision, out_precision
+            )
+        else:
+            out = self.calc_swap_in(
+                i == 0, amount * out_precision, p_o, in_precision, out_precision
+            )
+        out.in_amount //= in_precision
+        out.out_amount //= out_precision
+        return out
+
+    def get_dy(self, i: int, j: int, in_amount: int) -> int:
+        return self.get_dxdy_trade(i, j, in_amount, True).out_amount
+
+    def get_dxdy(self, i: int, j: int, in_amount: int) -> Tuple[int, int]:
+        out = self.get_dxdy_trade(i, j, in_amount, True)
+        return out.in_amount, out.out_amount
+
+    def get_dx(self, i: int, j: int, out_amount: int) -> int:
+        trade = self.get_dxdy_trade(i, j, out_amount, False)
+        assert trade.out_amount == out_amount
+        return trade.in_amount
+
+    def get_dydx(self, i: int, j: int, out_amount: int) -> Tuple[int, int]:
+        out = self.get_dxdy_trade(i, j, out_amount, False)
+        return out.out_amount, out.in_amount
+
+    def _exchange(
+        self, i: int, j: int, amount: int, minmax_amount: int, use_in_amount: bool
+    ) -> List[int]:
+        """Replicates `_exchange` (without token transfers or LM callbacks)."""
+        assert (i == 0 and j == 1) or (i == 1 and j == 0), "Wrong index"
+        # Commit the oracle update only once we know the trade doesn't revert
+        p_o = self.limit_p_o(self.raw_oracle_price)
+        if amount == 0:
+            self.price_oracle_w()
+            return [0, 0]
+
+        in_precision, out_precision = self._precisions(i, j)
+        if use_in_amount:
+            out = self.calc_swap_out(
+                i == 0, amount * in_precision, p_o, in_precision, out_precision
+            )
+        else:
+            amount_to_swap = _UINT256_MASK
+            if amount < amount_to_swap:
+                amount_to_swap = amount * out_precision
+            out = self.calc_swap_in(
+                i == 0, amount_to_swap, p_o, in_precision, out_precision
+            )
+        in_amount_done = out.in_amount // in_precision
+        out_amount_done = out.out_amount // out_precision
+        if use_in_amount:
+            assert out_amount_done >= minmax_amount, "Slippage"
+        else:
+            assert in_amount_done <= minmax_amount and (
+                out_amount_done == amount or amount == _UINT256_MASK
+            ), "Slippage"
+
+        self.price_oracle_w()
+        if out_amount_done == 0 or in_amount_done == 0:
+            return [0, 0]
+
+        n = min(out.n1, out.n2)
+        n_diff = abs(out.n2 - out.n1)
+        for k in range(MAX_TICKS):
+            x = 0
+            y = 0
+            if i == 0:
+                x = out.ticks_in[k]
+                if n == out.n2:
+                    y = out.last_tick_j
+            else:
+                y = out.ticks_in[n_diff - k]
+                if n == out.n2:
+                    x = out.last_tick_j
+            self._set_band(n, x, y)
+            if k == n_diff:
+                break
+            n += 1
+
+        self.active_band = out.n2
+        return [in_amount_done, out_amount_done]
+
+    def exchange(
+        self, i: int, j: int, in_amount: int, min_amount: int = 0
+    ) -> List[int]:
+        return self._exchange(i, j, in_amount, min_amount, True)
+
+    def exchange_dy(
+        self, i: int, j: int, out_amount: int, max_amount: int = _UINT256_MASK
+    ) -> List[int]:
+        return self._exchange(i, j, out_amount, max_amount, False)
+
+    def get_amount_for_price(self, p: int) -> Tuple[int, bool]:
+        """Replicates `get_amount_for_price`."""
+        A, Aminus1 = self.A, self.Aminus1
+        min_band = self.min_band
+        max_band = self.max_band
+        n = self.active_band
+        p_o = self.price_oracle_ro()
+        p_o_up = self.p_oracle_up(n)
+        p_down = p_o[0] ** 2 // p_o_up * p_o[0] // p_o_up
+        p_up = p_down * self.A2 // self.Aminus12
+        amount = 0
+        f = g = Inv = 0
+        j = MAX_TICKS
+        pump = True
+
+        fee = max(self.fee, p_o[1])
+
+        for i in range(MAX_TICKS + MAX_SKIP_TICKS):
+            assert p_o_up > 0
+            x = self.bands_x(n)
+            y = self.bands_y(n)
+            if i == 0:
+                if p < self._get_p(n, x, y):
+                    pump = False
+            dynamic_fee = fee
+            not_empty = x > 0 or y > 0
+
+            if not_empty:
+                f, g, Inv = self._band_invariant(x, y, p_o[0], p_o_up)
+                if j == MAX_TICKS:
+                    j = 0
+                dynamic_fee = max(self.get_dynamic_fee(p_o[0], p_o_up), fee)
+
+            antifee = WAD**2 // (WAD - min(dynamic_fee, WAD - 1))
+
+            if p <= p_up:
+                if p >= p_down:
+                    if not_empty:
+                        ynew = sub_or_zero(isqrt(Inv * WAD // p), g)
+                        xnew = sub_or_zero(Inv // (g + ynew), f)
+                        if pump:
+                            amount += sub_or_zero(xnew, x) * antifee // WAD
+                        else:
+                            amount += sub_or_zero(ynew, y) * antifee // WAD
+                    break
+
+            p_ratio = p_o_up * WAD // p_o[0]
+
+            if pump:
+                if not_empty:
+                    amount += ((Inv // g - f) - x) * antifee // WAD
+                if n == max_band:
+                    break
+                if j == MAX_TICKS - 1:
+                    break
+                if p_ratio < 10**36 // self.MAX_ORACLE_DN_POW:
+                    break
+                n += 1
+                p_down = p_up
+                p_up = p_up * self.A2 // self.Aminus12
+                p_o_up = p_o_up * Aminus1 // A
+
+            else:
+                if not_empty:
+                    amount += ((Inv // f - g) - y) * antifee // WAD
+                if n == min_band:
+                    break
+                if j == MAX_TICKS - 1:
+                    break
+                if p_ratio > self.MAX_ORACLE_DN_POW:
+                    break
+                n -= 1
+                p_up = p_down
+                p_down = p_down * self.Aminus12 // self.A2
+                p_o_up = p_o_up * A // Aminus1
+
+            if j != MAX_TICKS:
+                j += 1
+
+        if amount == 0:
+            return 0, pump
+
+        if pump:
+            amount = (amount - 1) // self.BORROWED_PRECISION + 1
+        else:
+            amount = (amount - 1) // self.COLLATERAL_PRECISION + 1
+        return amount, pump
+
+    # --- liquidity ----------------------------------------------------------
+
+    def read_user_tick_numbers(self, user) -> List[int]:
+        n1, n2, _ = self.user_shares.get(str(user), (0, 0, []))
+        return [n1, n2]
+
+    def read_user_ticks(self, user) -> List[int]:
+        return list(self.user_shares.get(str(user), (0, 0, [0]))[2])
+
+    def has_liquidity(self, user) -> bool:
+        ticks = self.read_user_ticks(user)
+        return len(ticks) > 0 and ticks[0] != 0
+
+    def deposit_range(self, user, amount: int, n1: int, n2: int):
+        """Replicates `deposit_range` (without the LM callback)."""
+        user = str(user)
+        n0 = self.active_band
+        assert n2 < 2**127
+        assert n1 > -(2**127)
+
+        n_bands = n2 - n1 + 1
+        assert n_bands <= MAX_TICKS
+
+        y_per_band = amount * self.COLLATERAL_PRECISION // n_bands
+        assert y_per_band > 100, "Amount too low"
+        assert not self.has_liquidity(user)  # dev: User must have no liquidity
+
+        for i in range(MAX_SKIP_TICKS + 1):
+            if n1 > n0:
+                if i != 0:
+                    self.active_band = n0
+                break
+            # dev: Deposit below current band
+            assert self.bands_x(n0) == 0 and i < MAX_SKIP_TICKS
+            n0 -= 1
+
+        self._extend(n1, n2)
+        user_shares = []
+        for i in range(n_bands):
+            band = n1 + i
+            k = band - self._band_offset
+            assert self._bands_x[k] == 0, "Band not empty"
+            y = y_per_band
+            if i == 0:
+                y = amount * self.COLLATERAL_PRECISION - y * (n_bands - 1)
+
+            total_y = self._bands_y[k]
+            s = self._total_shares[k]
+            ds = (s + DEAD_SHARES) * y // (total_y + 1)
+            assert ds > 0, "Amount too low"
+            user_shares.append(ds)
+            s += ds
+            assert s <= 2**128 - 1
+            self._total_shares[k] = s
+            self._set_band(band, 0, total_y + y)
+
+        self.min_band = min(self.min_band, n1)
+        self.max_band = max(self.max_band, n2)
+        self.user_shares[user] = (n1, n2, user_shares)
+
+    def withdraw(self, user, frac: int = WAD) -> List[int]:
+        """Replicates `withdraw` (without the LM callback)."""
+        user = str(user)
+        assert frac <= WAD
+        n1, n2, old_user_shares = self.user_shares.get(user, (0, 0, [0]))
+        assert old_user_shares[0] > 0, "No deposits"
+        return self.withdraw_shares(
+            user, [frac * s // WAD for s in old_user_shares], frac == WAD
+        )
+
+    def withdraw_shares(self, user, removed: List[int], full: bool) -> List[int]:
+        """`withdraw` with the shares removed from each band given directly.
+
+        `withdraw(user, frac)` removes `frac * shares // WAD` from each band.
+        Callers which know the user's shares before and after a withdrawal but
+        not `frac` (an indexer replaying events) can pass the difference.
+        """
+        user = str(user)
+        n1, n2, old_user_shares = self.user_shares[user]
+        user_shares = list(old_user_shares)
+
+        n = n1
+        total_x = 0
+        total_y = 0
+        min_band = self.min_band
+        old_min_band = min_band
+        old_max_band = self.max_band
+        max_band = n - 1
+
+        for i in range(MAX_TICKS):
+            x = self.bands_x(n)
+            y = self.bands_y(n)
+            ds = removed[i]
+            user_shares[i] -= ds
+            s = self.total_shares(n)
+            new_shares = s - ds
+            assert new_shares >= 0
+            s += DEAD_SHARES
+            dx = (x + 1) * ds // s
+            dy = (y + 1) * ds // s
+
+            x -= dx
+            y -= dy
+            if new_shares == 0:
+                x = 0
+                y = 0
+
+            if n == min_band and x == 0 and y == 0:
+                min_band += 1
+            if x > 0 or y > 0:
+                max_band = n
+            self._set_band(n, x, y)
+            self._total_shares[n - self._band_offset] = new_shares
+            total_x += dx
+            total_y += dy
+
+            if n == n2:
+                break
+            n += 1
+
+        if full:
+            # Only the first packed slot (two bands) is cleared on-chain
+            stale = list(old_user_shares)
+            stale[:2] = [0] * len(stale[:2])
+            self.user_shares[user] = (n1, n2, stale)
+        else:
+            self.user_shares[user] = (n1, n2, user_shares)
+
+        if old_min_band != min_band:
+            self.min_band = min_band
+        if old_max_band <= n2:
+            self.max_band = max_band
+
+        return [
+            total_x // self.BORROWED_PRECISION,
+            total_y // self.COLLATERAL_PRECISION,
+        ]
+
+    # --- user views -------------------------------------------------------
+
+    def get_xy_up(self, user, use_y: bool) -> int:
+        """Replicates `get_xy_up`."""
+        A, Aminus1 = self.A, self.Aminus1
+        SQRT_BAND_RATIO = self.SQRT_BAND_RATIO
+        ns = self.read_user_tick_numbers(user)
+        ticks = self.read_user_ticks(user)
+        if ticks[0] == 0:
+            return 0
+        p_o = self.price_oracle_ro()[0]
+        assert p_o != 0
+
+        n = ns[0] - 1
+        n_active = self.active_band
+        p_o_down = self.p_oracle_up(ns[0])
+        XY = 0
+
+        for i in range(MAX_TICKS):
+            n += 1
+            if n > ns[1]:
+                break
+            x = 0
+            y = 0
+            if n >= n_active:
+                y = self.bands_y(n)
+            if n <= n_active:
+                x = self.bands_x(n)
+            p_o_up = p_o_down
+            p_o_down = p_o_down * Aminus1 // A
+            if x == 0 and y == 0:
+                continue
+
+            total_share = self.total_shares(n)
+            user_share = ticks[i]
+            if total_share == 0 or user_share == 0:
+                continue
+            total_share += DEAD_SHARES
+
+            p_current_mid = p_o**2 // p_o_down * p_o // p_o_up
+
+            if x == 0 or y == 0:
+                if p_o > p_o_up:
+                    y_equiv = y
+                    if y == 0:
+                        y_equiv = x * WAD // p_current_mid
+                    if use_y:
+                        XY += y_equiv * user_share // total_share
+                    else:
+                        XY += (
+                            y_equiv
+                            * p_o_up
+                            // SQRT_BAND_RATIO
+                            * user_share
+                            // total_share
+                        )
+                    continue
+
+                elif p_o < p_o_down:
+                    x_equiv = x
+                    if x == 0:
+                        x_equiv = y * p_current_mid // WAD
+                    if use_y:
+                        XY += (
+                            x_equiv
+                            * SQRT_BAND_RATIO
+                            // p_o_up
+                            * user_share
+                            // total_share
+                        )
+                    else:
+                        XY += x_equiv * user_share // total_share
+                    continue
+
+            y0 = self.get_y0(x, y, p_o, p_o_up)
+            f = A * y0 * p_o // p_o_up * p_o // WAD
+            g = Aminus1 * y0 * p_o_up // p_o
+            Inv = (f + x) * (g + y)
+
+            if p_o > p_o_up:
+                y_o = sub_or_zero(Inv // f, g)
+                if use_y:
+                    XY += y_o * user_share // total_share
+                else:
+                    XY += y_o * p_o_up // SQRT_BAND_RATIO * user_share // total_share
+
+            elif p_o < p_o_down:
+                x_o = sub_or_zero(Inv // g, f)
+                if use_y:
+                    XY += x_o * SQRT_BAND_RATIO // p_o_up * user_share // total_share
+                else:
+                    XY += x_o * user_share // total_share
+
+            else:
+                y_o = A * y0 * (p_o - p_o_down) // p_o
+                x_o = sub_or_zero(Inv // (g + y_o), f)
+                if use_y:
+                    XY += (
+                        (y_o + x_o * WAD // isqrt(p_o_up * p_o))
+                        * user_share
+                        // total_share
+                    )
+                else:
+                    XY += (
+                        (x_o + y_o * isqrt(p_o_down * p_o) // WAD)
+                        * user_share
+                        // total_share
+                    )
+
+        if use_y:
+            return XY // self.COLLATERAL_PRECISION
+        return XY // self.BORROWED_PRECISION
+
+    def get_y_up(self, user) -> int:
+        return self.get_xy_up(user, True)
+
+    def get_x_down(self, user) -> int:
+        return self.get_xy_up(user, False)
+
+    def _get_xy(self, user) -> Tuple[List[int], List[int]]:
+        """Unscaled per-band amounts of `_get_xy`."""
+        n1, n2, ticks = self.user_shares.get(str(user), (0, 0, [0]))
+        xs = []
+        ys = []
+        if ticks[0] != 0:
+            for i, n in enumerate(range(n1, n2 + 1)):
+                total_shares = self.total_shares(n) + DEAD_SHARES
+                ds = ticks[i]
+                xs.append((self.bands_x(n) + 1) * ds // total_shares)
+                ys.append((self.bands_y(n) + 1) * ds // total_shares)
+        return xs, ys
+
+    def get_sum_xy(self, user) -> List[int]:
+        xs, ys = self._get_xy(user)
+        return [
+            sum(xs) // self.BORROWED_PRECISION,
+            sum(ys) // self.COLLATERAL_PRECISION,
+        ]
+
+    def get_xy(self, user) -> List[List[int]]:
+        xs, ys = self._get_xy(user)
+        return [
+            [x // self.BORROWED_PRECISION for x in xs],
+            [y // self.COLLATERAL_PRECISION for y in ys],
+        ]
@@ -0,0 +1,177 @@
+"""
+Persistent compilation cache for test deployers.
+
+boa already keeps a disk cache of compiled contracts, but to compute its key it
+parses and analyzes the contract together with every module it imports, which
+is most of the compile time for the big contracts (AMM, controllers, zaps).
+Here the key is computed from raw file contents only: the contract source, the
+sources of everything it transitively imports, the vyper/titanoboa versions
+and the compiler args. A hit is a single unpickle.
+
+Entries are written through boa's `DiskCache` (temp file + atomic rename), so
+concurrent pytest-xdist workers can share one cache directory: the worst case
+is two workers compiling the same contract once each.
+
+The cache lives in `~/.cache/curve-stablecoin` by default; set
+`CURVE_STABLECOIN_COMPILE_CACHE` to another directory, or to an empty string
+to disable it.
+"""
+
+import hashlib
+import os
+import re
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+import boa
+import vyper
+from boa.util.disk_cache import DiskCache
+from vvm.utils.versioning import detect_version_specifier_set
+from vyper.cli.vyper_compile import get_search_paths
+
+_IMPORT_RE = re.compile(
+    r"^[ \t]*(?:from[ \t]+([\w.]+)[ \t]+import[ \t]+(?:\(([^)]*)\)|([\w \t,]+))"
+    r"|import[ \t]+([\w.]+))",
+    re.MULTILINE,
+)
+_ALIAS_RE = re.compile(r"^(\w+)(?:\s+as\s+\w+)?$")
+
+
+def _version_salt() -> str:
+    try:
+        boa_version = version("titanoboa")
+    except PackageNotFoundError:
+        boa_version = "unknown"
+    return f"{vyper.__version__}.{vyper.__commit__}-boa{boa_version}"
+
+
+def _make_cache():
+    cache_dir = os.environ.get(
+        "CURVE_STABLECOIN_COMPILE_CACHE", "~/.cache/curve-stablecoin"
+    )
+    if not cache_dir:
+        return None
+    return DiskCache(cache_dir, _version_salt())
+
+
+_cache = _make_cache()
+
+
+def _imported_modules(source: str):
+    """Dotted names of the modules imported by a vyper source (best effort)."""
+    for m in _IMPORT_RE.finditer(source):
+        base, paren_names, names, module = m.groups()
+        if module is not None:
+            yield module
+            continue
+        for name in (paren_names or names).replace("\n", " ").split(","):
+            alias = _ALIAS_RE.match(name.strip())
+            if alias is None:
+                continue
+            # `from . import x` and `from pkg import x` import module `x`;
+            # anything that does not resolve to a file is a builtin interface
+            # and is already covered by the vyper version.
+            yield (
+                f"{base}.{alias.group(1)}" if base.strip(".") else base + alias.group(1)
+            )
+
+
+def _resolve(module: str, importer: Path, search_paths):
+    """All files `module` could refer to; extra candidates only widen the key."""
+    if module.startswith("."):
+        level = len(module) - len(module.lstrip("."))
+        root = importer.parent
+        for _ in range(level - 1):
+            root = root.parent
+        roots = [root]
+        module = module.lstrip(".")
+    else:
+        roots = [importer.parent, *search_paths]
+
+    rel = Path(*module.split("."))
+    for root in roots:
+        for suffix in (".vy", ".vyi", ".json"):
+            candidate = Path(root) / rel.with_suffix(suffix)
+            if candidate.is_file():
+                yield candidate.resolve()
+
+
+def source_fingerprint(path: Path) -> str:
+    """Hash of `path` and of every source file it transitively imports."""
+    search_paths = get_search_paths(None)
+    seen = {}
+    stack = [Path(path).resolve()]
+    while stack:
+        file = stack.pop()
+        if file in seen:
+            continue
+        source = file.read_bytes()
+        seen[file] = hashlib.sha256(source).hexdigest()
+        if file.suffix == ".json":
+            continue
+        for module in _imported_modules(source.decode()):
+            stack.extend(_resolve(module, file, search_paths))
+
+    h = hashlib.sha256()
+    for file in sorted(seen):
+        h.update(f"{file}:{seen[file]}\n".encode())
+    return h.hexdigest()
+
+
+def load_partial(path, compiler_args=None):
+    """Cached drop-in for `boa.load_partial(path, compiler_args)`."""
+    path = Path(path)
+    if _cache is None:
+        return boa.load_partial(path, compiler_args=compiler_args)
+
+    # Contracts pinned to another vyper version go through vvm, which boa
+    # caches on its own
+    specifier_set = detect_version_specifier_set(path.read_text())
+    if specifier_set is not None and not specifier_set.contains(vyper.__version__):
+        return boa.load_partial(path, compiler_args=compiler_args)
+
+    deployer_class = boa.interpret._get_default_deployer_class()
+    key = repr(
+        (
+            str(path.resolve()),
+            source_fingerprint(path),
+            sorted((k, str(v)) for k, v in (compiler_args or {}).items()),
+            repr(deployer_class),
+        )
+    )
+    compiler_data = _cache.caching_lookup(
+        key,
+        lambda: boa.load_partial(path, compiler_args=compiler_args).compiler_data,
+    )
+    return deployer_class(compiler_data, filename=str(path))
+
+
+class LazyDeployer:
+    """
+    Stand-in for the `VyperDeployer` of a contract which is only compiled (or
+    fetched from the cache) on first use, so importing `tests.utils.deployers`
+    doesn't pay for contracts a test session never touches.
+    """
+
+    def __init__(self, path, compiler_args=None):
+        self._path = Path(path)
+        self._compiler_args = compiler_args
+        self._deployer = None
+
+    def _load(self):
+        if self._deployer is None:
+            self._deployer = load_partial(self._path, self._compiler_args)
+        return self._deployer
+
+    def __getattr__(self, name):
+        # Only called for attributes not set in __init__
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        state = "loaded" if self._deployer is not None else "not loaded"
+        return f"<LazyDeployer {self._path.name} ({state})>"
@@ -20,6 +20,7 @@ SWAD = CONSTANTS_DEPLOYER._constants.SWAD
 DEAD_SHARES = CONSTANTS_DEPLOYER._constants.DEAD_SHARES
 MIN_TICKS = CONSTANTS_DEPLOYER._constants.MIN_TICKS
 MAX_TICKS = CONSTANTS_DEPLOYER._constants.MAX_TICKS
+MAX_SKIP_TICKS = CONSTANTS_DEPLOYER._constants.MAX_SKIP_TICKS
 __version__ = CONSTANTS_DEPLOYER._constants.__version__
 SKIP_CONFIG_UINT256 = CONSTANTS_DEPLOYER._constants.SKIP_CONFIG_UINT256
 SKIP_CONFIG_ADDRESS = CONSTANTS_DEPLOYER._constants.SKIP_CONFIG_ADDRESS
@@ -1,14 +1,17 @@
 """
 Centralized deployers for all contracts used in tests.
-Each deployer is a VyperDeployer object returned using boa.load_partial().
+Each deployer is a LazyDeployer standing in for the VyperDeployer that
+boa.load_partial() would return: contracts are compiled on first use and
+compilation results are cached on disk (see tests.utils.compile_cache).
 """
 
 import curve_stablecoin
 from pathlib import Path
 
-import boa
 from vyper.compiler.settings import OptimizationLevel
 
+from tests.utils.compile_cache import LazyDeployer
+
 # Base compiler args
 compiler_args_default = {"experimental_codegen": False}
 
@@ -40,30 +43,30 @@ STABLESWAP_NG_PATH = (
 ZAPS_CONTRACT_PATH = _PACKAGE_ROOT / "zaps"
 
 # Constants contract (for accessing constants)
-CONSTANTS_DEPLOYER = boa.load_partial(
+CONSTANTS_DEPLOYER = LazyDeployer(
     BASE_CONTRACT_PATH / "constants.vy", compiler_args=compiler_args_default
 )
 
 # Core contracts
-AMM_DEPLOYER = boa.load_partial(
+AMM_DEPLOYER = LazyDeployer(
     BASE_CONTRACT_PATH / "AMM.vy", compiler_args=compiler_args_codesize
 )
-CONTROLLER_DEPLOYER = boa.load_partial(
+CONTROLLER_DEPLOYER = LazyDeployer(
     BASE_CONTRACT_PATH / "controller.vy", compiler_args=compiler_args_codesize
 )
-CONTROLLER_VIEW_DEPLOYER = boa.load_partial(
+CONTROLLER_VIEW_DEPLOYER = LazyDeployer(
     BASE_CONTRACT_PATH / "ControllerView.vy", compiler_args=compiler_args_codesize
 )
-MINT_CONTROLLER_DEPLOYER = boa.load_partial(
+MINT_CONTROLLER_DEPLOYER = LazyDeployer(
     BASE_CONTRACT_PATH / "MintController.vy", compiler_args=compiler_args_codesize
 )
-CONTROLLER_FACTORY_DEPLOYER = boa.load_partial(
+CONTROLLER_FACTORY_DEPLOYER = LazyDeployer(
     BASE_CONTRACT_PATH / "ControllerFactory.vy", compiler_args=compiler_args_default
 )
-CONFIGURATOR_DEPLOYER = boa.load_partial(
+CONFIGURATOR_DEPLOYER = LazyDeployer(
     BASE_CONTRACT_PATH / "Configurator.vy", compiler_args=compiler_args_default
 )
-STABLECOIN_DEPLOYER = boa.load_partial(
+STABLECOIN_DEPLOYER = LazyDeployer(
     BASE_CONTRACT_PATH / "Stablecoin.vy", compiler_args=compiler_args_default
 )
 # STABLESWAP_DEPLOYER = boa.load_partial(
@@ -71,246 +74,268 @@ STABLECOIN_DEPLOYER = boa.load_partial(
 # )
 
 # Lending contracts - all have #pragma optimize codesize
-VAULT_DEPLOYER = boa.load_partial(
+VAULT_DEPLOYER = LazyDeployer(
     LENDING_CONTRACT_PATH / "Vault.vy", compiler_args=compiler_args_codesize
 )
-LEND_CONTROLLER_DEPLOYER = boa.load_partial(
+LEND_CONTROLLER_DEPLOYER = LazyDeployer(
     LENDING_CONTRACT_PATH / "LendController.vy", compiler_args=compiler_args_codesize
 )
-LEND_CONTROLLER_VIEW_DEPLOYER = boa.load_partial(
+LEND_CONTROLLER_VIEW_DEPLOYER = LazyDeployer(
     LENDING_CONTRACT_PATH / "LendControllerView.vy", compiler_args=compiler_args_default
 )
-LENDING_FACTORY_DEPLOYER = boa.load_partial(
+LENDING_FACTORY_DEPLOYER = LazyDeployer(
     LENDING_CONTRACT_PATH / "LendFactory.vy", compiler_args=compiler_args_codesize
 )
 
 # Flashloan contracts
-FLASH_LENDER_DEPLOYER = boa.load_partial(
+FLASH_LENDER_DEPLOYER = LazyDeployer(
     FLASHLOAN_CONTRACT_PATH / "FlashLender.vy", compiler_args=compiler_args_default
 )
 
-PARTIAL_REPAY_ZAP_MINT_DEPLOYER = boa.load_partial(
+PARTIAL_REPAY_ZAP_MINT_DEPLOYER = LazyDeployer(
     ZAPS_CONTRACT_PATH / "PartialRepayZapMint.vy",
     compiler_args=compiler_args_default,
 )
-PARTIAL_REPAY_ZAP_LENDING_DEPLOYER = boa.load_partial(
+PARTIAL_REPAY_ZAP_LENDING_DEPLOYER = LazyDeployer(
     ZAPS_CONTRACT_PATH / "PartialRepayZapLending.vy",
     compiler_args=compiler_args_default,
 )
+EXCHANGE_TO_PRICE_ZAP_DEPLOYER = LazyDeployer(
+    ZAPS_CONTRACT_PATH / "ExchangeToPriceZap.vy",
+    compiler_args=compiler_args_default,
+)
 
 # Monetary policies - all have no pragma
-CONSTANT_MONETARY_POLICY_DEPLOYER = boa.load_partial(
+CONSTANT_MONETARY_POLICY_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "ConstantMonetaryPolicy.vy",
     compiler_args=compiler_args_default,
 )
-CONSTANT_MONETARY_POLICY_LENDING_DEPLOYER = boa.load_partial(
+CONSTANT_MONETARY_POLICY_LENDING_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "ConstantMonetaryPolicyLending.vy",
     compiler_args=compiler_args_default,
 )
-SEMILOG_MONETARY_POLICY_DEPLOYER = boa.load_partial(
+SEMILOG_MONETARY_POLICY_DEPLOYER = LazyDeployer(
     MPOLICIES_CONTRACT_PATH / "SemilogMonetaryPolicy.vy",
     compiler_args=compiler_args_default,
 )
-SECONDARY_MONETARY_POLICY_DEPLOYER = boa.load_partial(
+SECONDARY_MONETARY_POLICY_DEPLOYER = LazyDeployer(
     MPOLICIES_CONTRACT_PATH / "SecondaryMonetaryPolicy.vy",
     compiler_args=compiler_args_default,
 )
-AGG_MONETARY_POLICY4_DEPLOYER = boa.load_partial(
+KINKED_MONETARY_POLICY_DEPLOYER = LazyDeployer(
+    MPOLICIES_CONTRACT_PATH / "KinkedMonetaryPolicy.vy",
+    compiler_args=compiler_args_default,
+)
+SUSDE_MONETARY_POLICY_DEPLOYER = LazyDeployer(
+    MPOLICIES_CONTRACT_PATH / "SusdeMonetaryPolicy.vy",
+    compiler_args=compiler_args_default,
+)
+AGG_MONETARY_POLICY4_DEPLOYER = LazyDeployer(
     MPOLICIES_CONTRACT_PATH / "AggMonetaryPolicy4.vy",
     compiler_args=compiler_args_default,
 )
-HYPERBOLIC_DYNAMIC_MP_DEPLOYER = boa.load_partial(
+HYPERBOLIC_DYNAMIC_MP_DEPLOYER = LazyDeployer(
     MPOLICIES_CONTRACT_PATH / "v2" / "HyperbolicDynamicMP.vy",
     compiler_args=compiler_args_default,
 )
-HYPERBOLIC_MP_DEPLOYER = boa.load_partial(
+HYPERBOLIC_MP_DEPLOYER = LazyDeployer(
     MPOLICIES_CONTRACT_PATH / "v2" / "HyperbolicMP.vy",
     compiler_args=compiler_args_default,
 )
 
 # Price oracles
-DUMMY_PRICE_ORACLE_DEPLOYER = boa.load_partial(
+DUMMY_PRICE_ORACLE_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "DummyPriceOracle.vy", compiler_args=compiler_args_default
 )
-BROKEN_PRICE_ORACLE_DEPLOYER = boa.load_partial(
+BROKEN_PRICE_ORACLE_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "BrokenPriceOracle.vy", compiler_args=compiler_args_default
 )
-CRYPTO_FROM_POOL_DEPLOYER = boa.load_partial(
+CRYPTO_FROM_POOL_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "CryptoFromPool.vy",
     compiler_args=compiler_args_default,
 )
-CRYPTO_FROM_ORACLE_AND_ERC4626_DEPLOYER = boa.load_partial(
+CRYPTO_FROM_POOLS_RATE_DEPLOYER = LazyDeployer(
+    PRICE_ORACLES_CONTRACT_PATH / "CryptoFromPoolsRate.vy",
+    compiler_args=compiler_args_gas,
+)
+CRYPTO_FROM_ORACLE_AND_ERC4626_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "CryptoFromOracleAndERC4626.vy",
     compiler_args=compiler_args_default,
 )
-ERC4626_EMA_WRAPPER_DEPLOYER = boa.load_partial(
+ERC4626_EMA_WRAPPER_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "v2" / "ERC4626EMAWrapper.vy",
     compiler_args=compiler_args_default,
 )
-EMA_PRICE_ORACLE_DEPLOYER = boa.load_partial(
+EMA_PRICE_ORACLE_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "EmaPriceOracle.vy",
     compiler_args=compiler_args_default,
 )
-AGGREGATE_STABLE_PRICE3_DEPLOYER = boa.load_partial(
+AGGREGATE_STABLE_PRICE3_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "AggregateStablePrice3.vy",
     compiler_args=compiler_args_default,
 )
-CRYPTO_WITH_STABLE_PRICE_DEPLOYER = boa.load_partial(
+CRYPTO_WITH_STABLE_PRICE_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "CryptoWithStablePrice.vy",
     compiler_args=compiler_args_default,
 )
-CRYPTO_WITH_STABLE_PRICE_AND_CHAINLINK_DEPLOYER = boa.load_partial(
+CRYPTO_WITH_STABLE_PRICE_AND_CHAINLINK_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "CryptoWithStablePriceAndChainlink.vy",
     compiler_args=compiler_args_default,
 )
-ORACLE_FROM_CURVE_POOLS_DEPLOYER = boa.load_partial(
+ORACLE_FROM_CURVE_POOLS_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "v2" / "OracleFromCurvePools.vy",
     compiler_args=compiler_args_default,
 )
 
 # Proxy oracle contracts - have #pragma optimize gas
-PROXY_ORACLE_DEPLOYER = boa.load_partial(
+PROXY_ORACLE_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "proxy" / "ProxyOracle.vy",
     compiler_args=compiler_args_gas,
 )
-PROXY_ORACLE_FACTORY_DEPLOYER = boa.load_partial(
+PROXY_ORACLE_FACTORY_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "proxy" / "ProxyOracleFactory.vy",
     compiler_args=compiler_args_gas,
 )
 
 # LP oracle contracts
-LP_ORACLE_STABLE_DEPLOYER = boa.load_partial(
+LP_ORACLE_STABLE_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "lp-oracles" / "LPOracleStable.vy",
     compiler_args=compiler_args_default,
 )
-LP_ORACLE_CRYPTO_DEPLOYER = boa.load_partial(
+LP_ORACLE_CRYPTO_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "lp-oracles" / "LPOracleCrypto.vy",
     compiler_args=compiler_args_default,
 )
 # LPOracleFactory.vy has #pragma optimize gas
-LP_ORACLE_FACTORY_DEPLOYER = boa.load_partial(
+LP_ORACLE_FACTORY_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "lp-oracles" / "LPOracleFactory.vy",
     compiler_args=compiler_args_gas,
 )
 
 # Stabilizer contracts
-PEG_KEEPER_V2_DEPLOYER = boa.load_partial(
+PEG_KEEPER_V2_DEPLOYER = LazyDeployer(
     STABILIZER_CONTRACT_PATH / "PegKeeperV2.vy", compiler_args=compiler_args_default
 )
-PEG_KEEPER_REGULATOR_DEPLOYER = boa.load_partial(
+PEG_KEEPER_REGULATOR_DEPLOYER = LazyDeployer(
     STABILIZER_CONTRACT_PATH / "PegKeeperRegulator.vy",
     compiler_args=compiler_args_default,
 )
-PEG_KEEPER_OFFBOARDING_DEPLOYER = boa.load_partial(
+PEG_KEEPER_OFFBOARDING_DEPLOYER = LazyDeployer(
     STABILIZER_CONTRACT_PATH / "PegKeeperOffboarding.vy",
     compiler_args=compiler_args_default,
 )
 
 # Callback contracts
-LM_CALLBACK_DEPLOYER = boa.load_partial(
+LM_CALLBACK_DEPLOYER = LazyDeployer(
     BASE_CONTRACT_PATH / "LMCallback.vy", compiler_args=compiler_args_default
 )
+LAZY_LM_CALLBACK_DEPLOYER = LazyDeployer(
+    BASE_CONTRACT_PATH / "LazyLMCallback.vy", compiler_args=compiler_args_default
+)
 
 # Testing/Mock contracts
-ERC20_MOCK_DEPLOYER = boa.load_partial(
+ERC20_MOCK_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "ERC20Mock.vy", compiler_args=compiler_args_default
 )
-ERC20_CRV_DEPLOYER = boa.load_partial(
+ERC20_CRV_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "ERC20CRV.vy", compiler_args=compiler_args_default
 )
-WETH_DEPLOYER = boa.load_partial(
+WETH_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "WETH.vy", compiler_args=compiler_args_default
 )
-VOTING_ESCROW_DEPLOYER = boa.load_partial(
+VOTING_ESCROW_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "VotingEscrow.vy", compiler_args=compiler_args_default
 )
-GAUGE_CONTROLLER_DEPLOYER = boa.load_partial(
+GAUGE_CONTROLLER_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "GaugeController.vy", compiler_args=compiler_args_default
 )
-MINTER_DEPLOYER = boa.load_partial(
+MINTER_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "Minter.vy", compiler_args=compiler_args_default
 )
-FAKE_LEVERAGE_DEPLOYER = boa.load_partial(
+FAKE_LEVERAGE_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "FakeLeverage.vy", compiler_args=compiler_args_default
 )
-DUMMY_CALLBACK_DEPLOYER = boa.load_partial(
+DUMMY_CALLBACK_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "DummyCallback.vy", compiler_args=compiler_args_default
 )
-VAULT_REENTRANCY_CALLBACK_DEPLOYER = boa.load_partial(
+VAULT_REENTRANCY_CALLBACK_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "VaultReentrancyCallback.vy",
     compiler_args=compiler_args_default,
 )
-LEVERAGE_ZAP_LENDING_DEPLOYER = boa.load_partial(
+LEVERAGE_ZAP_LENDING_DEPLOYER = LazyDeployer(
     ZAPS_CONTRACT_PATH / "LeverageZapLend.vy",
     compiler_args=compiler_args_codesize,
 )
-LEVERAGE_ZAP_MINT_DEPLOYER = boa.load_partial(
+LEVERAGE_ZAP_MINT_DEPLOYER = LazyDeployer(
     ZAPS_CONTRACT_PATH / "LeverageZapMint.vy",
     compiler_args=compiler_args_codesize,
 )
 
-DUMMY_ROUTER_DEPLOYER = boa.load_partial(
+DUMMY_ROUTER_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "DummyRouter.vy",
 )
 
-DUMMY_FLASH_BORROWER_DEPLOYER = boa.load_partial(
+DUMMY_FLASH_BORROWER_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "DummyFlashBorrower.vy", compiler_args=compiler_args_default
 )
-DUMMY_LM_CALLBACK_DEPLOYER = boa.load_partial(
+DUMMY_LM_CALLBACK_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "DummyLMCallback.vy", compiler_args=compiler_args_default
 )
-LM_CALLBACK_WITH_REVERTS_DEPLOYER = boa.load_partial(
+LM_CALLBACK_WITH_REVERTS_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "LMCallbackWithReverts.vy",
     compiler_args=compiler_args_default,
 )
-MOCK_FACTORY_DEPLOYER = boa.load_partial(
+MOCK_FACTORY_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "MockFactory.vy", compiler_args=compiler_args_default
 )
-MOCK_MARKET_DEPLOYER = boa.load_partial(
+MOCK_MARKET_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "MockMarket.vy", compiler_args=compiler_args_default
 )
-MOCK_RATE_SETTER_DEPLOYER = boa.load_partial(
+MOCK_RATE_SETTER_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "MockRateSetter.vy", compiler_args=compiler_args_default
 )
-MOCK_RATE_CALCULATOR_DEPLOYER = boa.load_partial(
+MOCK_RATE_CALCULATOR_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "MockRateCalculator.vy", compiler_args=compiler_args_default
 )
-MOCK_CONTROLLER_MP_DEPLOYER = boa.load_partial(
+MOCK_CONTROLLER_MP_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "MockControllerMP.vy", compiler_args=compiler_args_default
 )
-MOCK_PEG_KEEPER_DEPLOYER = boa.load_partial(
+MOCK_PEG_KEEPER_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "MockPegKeeper.vy", compiler_args=compiler_args_default
 )
-MOCK_RATE_ORACLE_DEPLOYER = boa.load_partial(
+MOCK_STORED_RATES_POOL_DEPLOYER = LazyDeployer(
+    TESTING_CONTRACT_PATH / "MockStoredRatesPool.vy", compiler_args=compiler_args_default
+)
+MOCK_RATE_ORACLE_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "MockRateOracle.vy", compiler_args=compiler_args_default
 )
-CHAINLINK_AGGREGATOR_MOCK_DEPLOYER = boa.load_partial(
+CHAINLINK_AGGREGATOR_MOCK_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "ChainlinkAggregatorMock.vy",
     compiler_args=compiler_args_default,
 )
-TRICRYPTO_MOCK_DEPLOYER = boa.load_partial(
+TRICRYPTO_MOCK_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "TricryptoMock.vy", compiler_args=compiler_args_default
 )
-MOCK_SWAP2_DEPLOYER = boa.load_partial(
+MOCK_SWAP2_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "MockSwap2.vy", compiler_args=compiler_args_default
 )
-MOCK_SWAP3_DEPLOYER = boa.load_partial(
+MOCK_SWAP3_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "MockSwap3.vy", compiler_args=compiler_args_default
 )
-SWAP_FACTORY_DEPLOYER = boa.load_partial(
+SWAP_FACTORY_DEPLOYER = LazyDeployer(
     TESTING_CONTRACT_PATH / "SwapFactory.vy", compiler_args=compiler_args_default
 )
 
 # LP oracle testing contracts
-MOCK_STABLE_SWAP_DEPLOYER = boa.load_partial(
+MOCK_STABLE_SWAP_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "lp-oracles" / "testing" / "MockStableSwap.vy",
     compiler_args=compiler_args_default,
 )
-MOCK_CRYPTO_SWAP_DEPLOYER = boa.load_partial(
+MOCK_CRYPTO_SWAP_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH / "lp-oracles" / "testing" / "MockCryptoSwap.vy",
     compiler_args=compiler_args_default,
 )
-MOCK_STABLE_SWAP_NO_ARGUMENT_DEPLOYER = boa.load_partial(
+MOCK_STABLE_SWAP_NO_ARGUMENT_DEPLOYER = LazyDeployer(
     PRICE_ORACLES_CONTRACT_PATH
     / "lp-oracles"
     / "testing"
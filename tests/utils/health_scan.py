@@ -0,0 +1,199 @@
+"""Off-chain twin of `ControllerView.users_with_health`.
+
+Computes the health of every loan against a single `AMMModel` snapshot
+(tests.utils.amm_reference) instead of issuing several view calls per user.
+Results are bit-identical to `controller.health(user, full)` because the band
+math is the same integer arithmetic as `AMM.get_xy_up`.
+
+The expensive part of `get_x_down` is the per-band invariant (`_get_y0` with
+an `isqrt`), which only depends on the band and on where the user's range
+starts (the band prices are derived iteratively from `p_oracle_up(n1)`).
+Those terms are memoized in `HealthScanner`, so scanning many users in the
+same bands costs roughly O(bands + users) rather than O(users * ticks).
+"""
+
+from dataclasses import dataclass
+from math import isqrt
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tests.utils.amm_reference import DEAD_SHARES, MAX_TICKS, WAD, AMMModel, sub_or_zero
+
+SWAD = WAD
+
+
+@dataclass
+class Position:
+    """Mirror of `IController.Position`."""
+
+    user: str
+    x: int
+    y: int
+    debt: int
+    health: int
+
+
+@dataclass
+class Loan:
+    user: str
+    debt: int
+    liquidation_discount: int
+
+
+def _tdiv(a: int, b: int) -> int:
+    """int256 division truncating toward zero (`unsafe_div` on signed ints)."""
+    q = abs(a) // abs(b)
+    return q if (a >= 0) == (b >= 0) else -q
+
+
+class HealthScanner:
+    """Batch health evaluation over one AMM snapshot.
+
+    `model` must not be mutated while the scanner is in use; build a new
+    scanner after applying trades to the model.
+    """
+
+    def __init__(self, model: AMMModel):
+        self.model = model
+        self.p_o = model.price_oracle()
+        self.n_active = model.active_band
+        self._p_oracle_up: Dict[int, int] = {}
+        # (n1, n) -> (unscaled x_down contribution, total_shares + DEAD_SHARES)
+        self._x_down_terms: Dict[Tuple[int, int], Optional[Tuple[int, int]]] = {}
+        # n1 -> [p_oracle_up(n1), p_oracle_down(n1), p_oracle_down(n1 + 1), ...]
+        self._p_chains: Dict[int, List[int]] = {}
+
+    def p_oracle_up(self, n: int) -> int:
+        p = self._p_oracle_up.get(n)
+        if p is None:
+            p = self._p_oracle_up[n] = self.model.p_oracle_up(n)
+        return p
+
+    def _p_chain(self, n1: int) -> List[int]:
+        chain = self._p_chains.get(n1)
+        if chain is None:
+            A, Aminus1 = self.model.A, self.model.Aminus1
+            chain = [self.p_oracle_up(n1)]
+            for _ in range(MAX_TICKS):
+                chain.append(chain[-1] * Aminus1 // A)
+            self._p_chains[n1] = chain
+        return chain
+
+    def _x_down_term(self, n1: int, n: int) -> Optional[Tuple[int, int]]:
+        """Band `n` part of `get_xy_up(use_y=False)` before user share scaling."""
+        key = (n1, n)
+        if key in self._x_down_terms:
+            return self._x_down_terms[key]
+
+        model = self.model
+        p_o = self.p_o
+        chain = self._p_chain(n1)
+        p_o_up = chain[n - n1]
+        p_o_down = chain[n - n1 + 1]
+
+        x = model.bands_x(n) if n <= self.n_active else 0
+        y = model.bands_y(n) if n >= self.n_active else 0
+        total_share = model.total_shares(n)
+        term = None
+        if (x != 0 or y != 0) and total_share != 0:
+            term = (
+                self._x_down_value(x, y, p_o_up, p_o_down),
+                total_share + DEAD_SHARES,
+            )
+
+        self._x_down_terms[key] = term
+        return term
+
+    def _x_down_value(self, x: int, y: int, p_o_up: int, p_o_down: int) -> int:
+        model = self.model
+        p_o = self.p_o
+        A, Aminus1 = model.A, model.Aminus1
+
+        if x == 0 or y == 0:
+            p_current_mid = p_o**2 // p_o_down * p_o // p_o_up
+            if p_o > p_o_up:
+                y_equiv = y if y != 0 else x * WAD // p_current_mid
+                return y_equiv * p_o_up // model.SQRT_BAND_RATIO
+            elif p_o < p_o_down:
+                return x if x != 0 else y * p_current_mid // WAD
+
+        y0 = model.get_y0(x, y, p_o, p_o_up)
+        f = A * y0 * p_o // p_o_up * p_o // WAD
+        g = Aminus1 * y0 * p_o_up // p_o
+        Inv = (f + x) * (g + y)
+
+        if p_o > p_o_up:
+            return sub_or_zero(Inv // f, g) * p_o_up // model.SQRT_BAND_RATIO
+        elif p_o < p_o_down:
+            return sub_or_zero(Inv // g, f)
+        y_o = A * y0 * (p_o - p_o_down) // p_o
+        x_o = sub_or_zero(Inv // (g + y_o), f)
+        return x_o + y_o * isqrt(p_o_down * p_o) // WAD
+
+    def get_x_down(self, user) -> int:
+        """Same value as `AMM.get_x_down(user)`."""
+        n1, n2 = self.model.read_user_tick_numbers(user)
+        ticks = self.model.read_user_ticks(user)
+        if ticks[0] == 0:
+            return 0
+        XY = 0
+        for i, n in enumerate(range(n1, n2 + 1)):
+            term = self._x_down_term(n1, n)
+            if term is None or ticks[i] == 0:
+                continue
+            value, total_share = term
+            XY += value * ticks[i] // total_share
+        return XY // self.model.BORROWED_PRECISION
+
+    def health(self, loan: Loan, full: bool) -> Tuple[int, List[int]]:
+        """Replicates `controller._health`; also returns `get_sum_xy` if it was needed."""
+        assert loan.debt > 0, "_debt = 0"
+        model = self.model
+        h = SWAD - loan.liquidation_discount
+        h = _tdiv(self.get_x_down(loan.user) * h, loan.debt) - SWAD
+
+        xy = None
+        if full:
+            ns0 = model.read_user_tick_numbers(loan.user)[0]
+            if ns0 > self.n_active:
+                p_up = self.p_oracle_up(ns0)
+                if self.p_o > p_up:
+                    xy = model.get_sum_xy(loan.user)
+                    h += (
+                        (self.p_o - p_up)
+                        * xy[1]
+                        * model.COLLATERAL_PRECISION
+                        // (loan.debt * model.BORROWED_PRECISION)
+                    )
+        return h, xy
+
+    def users_with_health(
+        self, loans: Iterable[Loan], threshold: int = 0, full: bool = True
+    ) -> List[Position]:
+        """Replicates `ControllerView.users_with_health` over `loans` (in loan order)."""
+        out = []
+        for loan in loans:
+            h, xy = self.health(loan, full)
+            if h < threshold:
+                if xy is None:
+                    xy = self.model.get_sum_xy(loan.user)
+                out.append(Position(loan.user, xy[0], xy[1], loan.debt, h))
+                if len(out) == 1000:
+                    break
+        return out
+
+
+def snapshot_loans(controller, _from: int = 0, _limit: int = 0) -> List[Loan]:
+    """Read the loan book of a boa-deployed controller (debt and discount per user)."""
+    n_loans = controller.n_loans()
+    end = n_loans if _limit == 0 else min(n_loans, _from + _limit)
+    loans = []
+    for ix in range(_from, end):
+        user = controller.loans(ix)
+        loans.append(
+            Loan(
+                str(user),
+                controller.debt(user),
+                controller.liquidation_discounts(user),
+            )
+        )
+    return loans
@@ -0,0 +1,153 @@
+"""Keeper engine which re-checks only the loans an oracle move can affect.
+
+A loan's collateral sits in bands [n1, n2]. An oracle move from p_old to
+p_new goes through the bands between `band_for_price(p_old)` and
+`band_for_price(p_new)`, and only loans whose range overlaps those bands
+can enter, leave or move inside soft-liquidation. `LiquidationKeeper` keeps
+the loans' band ranges in an `IntervalTree` and asks the controller for the
+health of the overlapping users only, so a block's work scales with the
+positions the price went through rather than with the size of the loan book.
+
+    keeper = LiquidationKeeper(controller, amm)
+    keeper.refresh()
+    for user, health in keeper.check(p_old, p_new):
+        if health < 0:
+            ...
+
+Loans whose bands the oracle has already passed completely are reported by
+the move which passed them. They are not reported again unless the
+price comes back to their range.
+"""
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from math import log
+from typing import Dict, List, Optional, Tuple
+
+from tests.utils.amm_reference import AMMModel
+
+
+@dataclass
+class _Node:
+    center: int
+    # Intervals containing `center`: their starts ascending and their ends ascending
+    starts: List[int] = field(default_factory=list)
+    start_users: List[str] = field(default_factory=list)
+    ends: List[int] = field(default_factory=list)
+    end_users: List[str] = field(default_factory=list)
+    left: Optional["_Node"] = None
+    right: Optional["_Node"] = None
+
+
+class IntervalTree:
+    """Static centered interval tree over closed integer intervals [n1, n2] keyed by user."""
+
+    def __init__(self, intervals: Dict[str, Tuple[int, int]]):
+        self.root = self._build(list(intervals.items()))
+
+    def _build(self, items: List[Tuple[str, Tuple[int, int]]]) -> Optional[_Node]:
+        if not items:
+            return None
+        endpoints = sorted(n for _, interval in items for n in interval)
+        node = _Node(center=endpoints[len(endpoints) // 2])
+        left, right, here = [], [], []
+        for item in items:
+            n1, n2 = item[1]
+            if n2 < node.center:
+                left.append(item)
+            elif n1 > node.center:
+                right.append(item)
+            else:
+                here.append(item)
+        here.sort(key=lambda item: item[1][0])
+        node.starts = [n1 for _, (n1, _) in here]
+        node.start_users = [user for user, _ in here]
+        here.sort(key=lambda item: item[1][1])
+        node.ends = [n2 for _, (_, n2) in here]
+        node.end_users = [user for user, _ in here]
+        node.left = self._build(left)
+        node.right = self._build(right)
+        return node
+
+    def overlapping(self, lo: int, hi: int) -> List[str]:
+        """Users whose interval shares at least one band with [lo, hi]."""
+        result = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if hi < node.center:
+                # Everything here ends at or after the center, so it overlaps iff it starts by hi
+                result += node.start_users[: bisect_right(node.starts, hi)]
+                stack.append(node.left)
+            elif lo > node.center:
+                result += node.end_users[bisect_left(node.ends, lo) :]
+                stack.append(node.right)
+            else:
+                result += node.start_users
+                stack += [node.left, node.right]
+        return result
+
+
+class LiquidationKeeper:
+    def __init__(self, controller, amm):
+        self.controller = controller
+        self.amm = amm
+        self.ranges: Dict[str, Tuple[int, int]] = {}
+        self._tree: Optional[IntervalTree] = None
+        self._bands: Optional[AMMModel] = None
+
+    # --- loan book ------------------------------------------------------------
+
+    def refresh(self):
+        """Read the band range of every loan."""
+        self.ranges = {}
+        for ix in range(self.controller.n_loans()):
+            self.update_user(self.controller.loans(ix))
+        self._bands = None
+
+    def update_user(self, user):
+        """Re-read one user's range after an action on their loan (or drop it if repaid)."""
+        user = str(user)
+        if self.controller.loan_exists(user):
+            n1, n2 = self.amm.read_user_tick_numbers(user)
+            self.ranges[user] = (n1, n2)
+        else:
+            self.ranges.pop(user, None)
+        self._tree = None
+
+    @property
+    def tree(self) -> IntervalTree:
+        if self._tree is None:
+            self._tree = IntervalTree(self.ranges)
+        return self._tree
+
+    # --- prices ---------------------------------------------------------------
+
+    def band_for_price(self, p: int) -> int:
+        """Band n with p_oracle_up(n + 1) < p <= p_oracle_up(n), with the AMM's exact math."""
+        if self._bands is None:
+            # The base price grows with the rate: refresh() takes a new one
+            self._bands = AMMModel(A=self.amm.A(), base_price=self.amm.get_base_price(), fee=0)
+        bands = self._bands
+        A = bands.A
+        n = int(log(bands.BASE_PRICE / p) / log(A / (A - 1)))
+        while bands.p_oracle_up(n) < p:
+            n -= 1
+        while bands.p_oracle_up(n + 1) >= p:
+            n += 1
+        return n
+
+    def affected_users(self, p_old: int, p_new: int) -> List[str]:
+        """Users whose bands overlap the bands between the two oracle prices."""
+        n_old = self.band_for_price(p_old)
+        n_new = self.band_for_price(p_new)
+        return self.tree.overlapping(min(n_old, n_new), max(n_old, n_new))
+
+    def check(self, p_old: int, p_new: int, full: bool = True) -> List[Tuple[str, int]]:
+        """(user, health) of the affected users, read from the controller."""
+        return [
+            (user, self.controller.health(user, full))
+            for user in self.affected_users(p_old, p_new)
+        ]
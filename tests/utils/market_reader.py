@@ -0,0 +1,88 @@
+"""Batched reads of every lending market of a `LendFactory`.
+
+Dashboards poll the same numbers for every vault each block: total assets,
+price per share, APRs, withdraw limits and the controller's borrow limits.
+Read one getter at a time, that is about ten calls per market, each of which
+re-reads the controller. `Vault.vault_state` and
+`LendControllerView.market_state` return all of them in two calls.
+
+`MarketReader` resolves the vault and controller view of every market once
+(markets never change after creation; new ones are picked up on the next
+read), then reads the state of all of them in one pass:
+
+    reader = MarketReader(factory)
+    for market in reader.read(owner=depositor):
+        print(market.vault.address, market.vault_state.lend_apr)
+"""
+
+from dataclasses import dataclass
+from typing import Any, List
+
+from tests.utils.constants import MIN_TICKS, ZERO_ADDRESS
+from tests.utils.deployers import (
+    LEND_CONTROLLER_DEPLOYER,
+    LEND_CONTROLLER_VIEW_DEPLOYER,
+    VAULT_DEPLOYER,
+)
+
+
+@dataclass
+class MarketContracts:
+    index: int
+    vault: Any
+    controller: Any
+    view: Any
+
+
+@dataclass
+class MarketSnapshot:
+    index: int
+    vault: Any
+    controller: Any
+    vault_state: Any  # IVault.VaultState
+    market_state: Any  # LendControllerView.MarketState
+
+
+class MarketReader:
+    def __init__(self, factory):
+        self.factory = factory
+        self.markets: List[MarketContracts] = []
+
+    def refresh(self) -> List[MarketContracts]:
+        """Resolve the contracts of markets created since the last call."""
+        for i in range(len(self.markets), self.factory.market_count()):
+            market = self.factory.markets(i)
+            controller = LEND_CONTROLLER_DEPLOYER.at(market.controller)
+            self.markets.append(
+                MarketContracts(
+                    index=i,
+                    vault=VAULT_DEPLOYER.at(market.vault),
+                    controller=controller,
+                    view=LEND_CONTROLLER_VIEW_DEPLOYER.at(controller.view()),
+                )
+            )
+        return self.markets
+
+    def read(
+        self,
+        owner=ZERO_ADDRESS,
+        d_collateral: int = 0,
+        N: int = MIN_TICKS,
+        user=ZERO_ADDRESS,
+    ) -> List[MarketSnapshot]:
+        """
+        State of every market: two calls per market.
+
+        `owner` is the share owner for the vault limits; `d_collateral`, `N`
+        and `user` are passed to `max_borrowable` and `tokens_to_shrink`.
+        """
+        return [
+            MarketSnapshot(
+                index=m.index,
+                vault=m.vault,
+                controller=m.controller,
+                vault_state=m.vault.vault_state(owner),
+                market_state=m.view.market_state(d_collateral, N, user),
+            )
+            for m in self.refresh()
+        ]
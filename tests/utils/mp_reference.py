@@ -0,0 +1,374 @@
+"""Integer-exact twins of every monetary policy's rate, for sweeps over many points.
+
+tests.utils.hyperbolic_mp_reference mirrors the v2 hyperbolic policies one
+utilization at a time. Calibrating a policy means evaluating it over grids of
+parameters and utilizations, so each twin here is split like the contract:
+
+- the constructor (`get_params`, logarithms of the rates, ...) runs once per
+  parameter set and gives a curve object holding what the contract stores;
+- `curve.rates(utilizations, ...)` is the contract's `calculate_rate` for a
+  whole sequence of utilizations, with every term that does not depend on the
+  utilization computed once per call.
+
+Python ints are used throughout (NumPy's fixed-width integers would overflow on
+the 1e36-scale products), and every division reproduces the contract's
+rounding, so `rates` equals the contract's `rate()` bit for bit. A point at
+which the contract reverts ("Negative rate") is returned as None.
+
+The policies and the inputs of their `rates`:
+
+- Hyperbolic family, rate = r0 * r_minf / WAD + A * r0 / (u_inf - u) + shift:
+  KinkedMonetaryPolicy (r0 = its base rate), SecondaryMonetaryPolicy (r0 =
+  AMM.rate()), SusdeMonetaryPolicy (r0 = ma_susde_rate()), HyperbolicMP
+  (r0 = target_rate) and HyperbolicDynamicMP (r0 = the clamped EMA rate).
+- SemilogMonetaryPolicy: rate = min_rate * (max_rate / min_rate) ** u. Its
+  contract uses total_debt / total_reserves rather than the utilization, so
+  `rates(us)` is exact for markets with total_reserves = WAD; `market_rate`
+  takes the market's balances.
+- AggMonetaryPolicy4 depends on the crvUSD price, the EMA of the PegKeepers'
+  debt ratio and how full the market is: `rates(fills, price, ema_ratio)` with
+  fill = debt_for * WAD // debt_ceiling.
+
+`evaluate` sweeps a parameter grid built by `curve_grid` over utilizations:
+
+    curves = curve_grid(HyperbolicCurve.hyperbolic_mp, target_utilization=us0,
+                        target_rate=[r], low_ratio=alphas, high_ratio=betas, rate_shift=[0])
+    table = evaluate(curves, utilizations)
+"""
+
+from dataclasses import dataclass
+from itertools import product
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from tests.utils import hyperbolic_mp_reference as hyperbolic
+from tests.utils.amm_reference import wad_exp
+from tests.utils.constants import WAD
+
+SECONDS_PER_YEAR = 365 * 86400
+
+# Bounds checked by the 0.3.10 lending policies (Kinked, Secondary, Susde)
+MIN_UTIL = 10**16
+MAX_UTIL = 99 * 10**16
+MIN_LOW_RATIO = 10**16
+MAX_HIGH_RATIO = 100 * 10**18
+MAX_RATE_SHIFT = 100 * 10**18
+
+# SemilogMonetaryPolicy
+SEMILOG_MIN_RATE = 10**15 // SECONDS_PER_YEAR
+SEMILOG_MAX_RATE = 10**19 // SECONDS_PER_YEAR
+
+# AggMonetaryPolicy4
+MAX_EXP = 1000 * 10**18
+AGG_MAX_RATE = 43959106799
+TARGET_REMAINDER = 10**17
+
+Rates = List[Optional[int]]
+
+tdiv = hyperbolic.tdiv
+
+
+# --- math of the 0.3.10 policies ---------------------------------------------
+
+
+def legacy_exp(power: int, overflow: Optional[int] = MAX_EXP) -> int:
+    """Replicates the `exp` of the 0.3.10 policies: snekmate's exp with truncating divisions.
+
+    Above its domain Semilog returns MAX_EXP and Susde reverts (`overflow=None`).
+    """
+    if power <= -41446531673892821376:
+        return 0
+    if power >= 135305999368893231589:
+        assert overflow is not None, "exp overflow"
+        return overflow
+
+    x = tdiv(power * 2**96, 10**18)
+    k = tdiv(tdiv(x * 2**96, 54916777467707473351141471128) + 2**95, 2**96)
+    x = x - k * 54916777467707473351141471128
+
+    y = x + 1346386616545796478920950773328
+    y = tdiv(y * x, 2**96) + 57155421227552351082224309758442
+    p = y + x - 94201549194550492254356042504812
+    p = tdiv(p * y, 2**96) + 28719021644029726153956944680412240
+    p = p * x + 4385272521454847904659076985693276 * 2**96
+
+    q = x - 2855989394907223263936484059900
+    q = tdiv(q * x, 2**96) + 50020603652535783019961831881945
+    q = tdiv(q * x, 2**96) - 533845033583426703283633433725380
+    q = tdiv(q * x, 2**96) + 3604857256930695427073651918091429
+    q = tdiv(q * x, 2**96) - 14423608567350463180887372962807573
+    q = tdiv(q * x, 2**96) + 26449188498355588339934803723976023
+
+    r = tdiv(p, q)
+    assert r >= 0
+    r = r * 3822833074963236453042738258902158003155416615667 % 2**256
+    shift = k - 195
+    return (r << shift) % 2**256 if shift >= 0 else r >> -shift
+
+
+def ln_int(_x: int) -> int:
+    """Replicates SemilogMonetaryPolicy.ln_int."""
+    x = _x
+    if _x < WAD:
+        x = 10**36 // _x
+    res = 0
+    for i in range(8):
+        t = 2 ** (7 - i)
+        p = 2**t
+        if x >= p * WAD:
+            x //= p
+            res += t * WAD
+    d = WAD
+    for _ in range(59):
+        if x >= 2 * WAD:
+            res += d
+            x //= 2
+        x = x * x // WAD
+        d //= 2
+    result = res * WAD // 1442695040888963328
+    return result if _x >= WAD else -result
+
+
+def legacy_utilization(balance: int, total_debt: int, d_reserves: int = 0, d_debt: int = 0) -> int:
+    """Utilization as the 0.3.10 lending policies compute it from balanceOf(controller)."""
+    total_reserves = balance + total_debt + d_reserves
+    debt = total_debt + d_debt
+    assert debt >= 0, "Negative debt"
+    assert total_reserves >= debt, "Reserves too small"
+    return debt * WAD // total_reserves if total_reserves > 0 else 0
+
+
+# The v2 policies compute it from available_balance, total_debt and admin_fees
+utilization = hyperbolic.utilization
+
+
+# --- hyperbolic family --------------------------------------------------------
+
+
+def legacy_params(u0: int, alpha: int, beta: int) -> Tuple[int, int, int]:
+    """Replicates `get_params` of the 0.3.10 policies: (u_inf, A, r_minf).
+
+    The intermediate values are uint256 there, so any of them going negative reverts.
+    """
+    assert beta >= WAD and alpha <= WAD and u0 <= WAD
+    denominator = ((beta - WAD) * u0 - (WAD - u0) * (WAD - alpha)) // WAD
+    assert denominator >= 0
+    u_inf = (beta - WAD) * u0 // denominator
+    assert u_inf >= u0
+    A = (WAD - alpha) * u_inf // WAD * (u_inf - u0) // u0
+    r_minf = alpha - A * WAD // u_inf
+    return u_inf, A, r_minf
+
+
+def _check_legacy_bounds(u0: int, alpha: int, beta: int, shift: int = 0):
+    assert MIN_UTIL <= u0 <= MAX_UTIL
+    assert alpha >= MIN_LOW_RATIO and beta <= MAX_HIGH_RATIO and alpha < beta
+    assert shift <= MAX_RATE_SHIFT
+
+
+@dataclass
+class HyperbolicCurve:
+    """rate = r0 * r_minf / WAD + A * r0 / (u_inf - u) + shift, as every hyperbolic policy stores it."""
+
+    u_inf: int
+    A: int
+    r_minf: int
+    shift: int = 0
+    # Base rate of the policies which store it (Kinked, HyperbolicMP)
+    r0: Optional[int] = None
+
+    @classmethod
+    def kinked(cls, target_utilization, low_ratio, high_ratio, base_rate) -> "HyperbolicCurve":
+        """KinkedMonetaryPolicy(factory, borrowed_token, ...): `base_rate` is an APR."""
+        _check_legacy_bounds(target_utilization, low_ratio, high_ratio)
+        u_inf, A, r_minf = legacy_params(target_utilization, low_ratio, high_ratio)
+        return cls(u_inf, A, r_minf, 0, base_rate // 31536000)
+
+    @classmethod
+    def secondary(cls, target_utilization, low_ratio, high_ratio, rate_shift) -> "HyperbolicCurve":
+        """SecondaryMonetaryPolicy and SusdeMonetaryPolicy: r0 comes with every call."""
+        _check_legacy_bounds(target_utilization, low_ratio, high_ratio, rate_shift)
+        u_inf, A, r_minf = legacy_params(target_utilization, low_ratio, high_ratio)
+        assert r_minf >= 0  # uint256 in these contracts
+        return cls(u_inf, A, r_minf, rate_shift)
+
+    susde = secondary
+
+    @classmethod
+    def hyperbolic_dynamic_mp(cls, target_utilization, low_ratio, high_ratio, rate_shift) -> "HyperbolicCurve":
+        """HyperbolicDynamicMP: r0 is `target_rate()`, the clamped EMA of the rate calculator."""
+        assert hyperbolic.MIN_TARGET_UTIL <= target_utilization <= hyperbolic.MAX_TARGET_UTIL
+        assert hyperbolic.MIN_LOW_RATIO <= low_ratio < WAD < high_ratio <= hyperbolic.MAX_HIGH_RATIO
+        assert rate_shift <= hyperbolic.MAX_RATE_SHIFT
+        numerator = (high_ratio - WAD) * target_utilization
+        subtrahend = (WAD - target_utilization) * (WAD - low_ratio)
+        assert numerator >= subtrahend + WAD, "invalid curve"
+        u_inf, A, r_minf = hyperbolic.get_params(target_utilization, low_ratio, high_ratio)
+        assert u_inf > WAD, "u_inf <= 100%"
+        return cls(u_inf, A, r_minf, rate_shift)
+
+    @classmethod
+    def hyperbolic_mp(cls, target_utilization, target_rate, low_ratio, high_ratio, rate_shift) -> "HyperbolicCurve":
+        """HyperbolicMP: the dynamic policy's curve with a fixed target rate."""
+        assert hyperbolic.MIN_TARGET_RATE <= target_rate <= hyperbolic.MAX_TARGET_RATE
+        curve = cls.hyperbolic_dynamic_mp(target_utilization, low_ratio, high_ratio, rate_shift)
+        curve.r0 = target_rate
+        return curve
+
+    @classmethod
+    def from_contract(cls, mp) -> "HyperbolicCurve":
+        """The curve a deployed policy stores (Kinked: its base rate is kept as r0)."""
+        p = mp.parameters()
+        if len(p) == 4:
+            # 0.3.10 policies: (u_inf, A, r_minf, shift) or Kinked's (u_inf, A, r_minf, base)
+            if hasattr(mp, "AMM") or hasattr(mp, "SUSDE"):
+                return cls(p[0], p[1], p[2], p[3])
+            return cls(p[0], p[1], p[2], 0, p[3])
+        if len(p) == 8:
+            # HyperbolicMP
+            return cls(p[0], p[1], p[2], p[7], p[4])
+        return cls(p[0], p[1], p[2], p[6])
+
+    def rates(self, utilizations: Iterable[int], r0: Optional[int] = None) -> Rates:
+        if r0 is None:
+            r0 = self.r0
+        a = tdiv(r0 * self.r_minf, WAD) + self.shift
+        A_r0 = self.A * r0
+        u_inf = self.u_inf
+        rates = [a + A_r0 // (u_inf - u) for u in utilizations]
+        if a < 0:
+            rates = [r if r >= 0 else None for r in rates]
+        return rates
+
+    def rate(self, u: int, r0: Optional[int] = None) -> Optional[int]:
+        return self.rates([u], r0)[0]
+
+
+def hyperbolic_dynamic_target_rate(ema_rate: int) -> int:
+    """HyperbolicDynamicMP._target_rate for an EMA value."""
+    return min(max(ema_rate, hyperbolic.MIN_TARGET_RATE), hyperbolic.MAX_TARGET_RATE)
+
+
+# --- SemilogMonetaryPolicy ----------------------------------------------------
+
+
+@dataclass
+class SemilogCurve:
+    min_rate: int
+    max_rate: int
+    log_min_rate: int
+    log_max_rate: int
+
+    @classmethod
+    def semilog(cls, min_rate: int, max_rate: int) -> "SemilogCurve":
+        assert SEMILOG_MIN_RATE <= min_rate <= max_rate <= SEMILOG_MAX_RATE, "Wrong rates"
+        return cls(min_rate, max_rate, ln_int(min_rate), ln_int(max_rate))
+
+    @classmethod
+    def from_contract(cls, mp) -> "SemilogCurve":
+        return cls(mp.min_rate(), mp.max_rate(), mp.log_min_rate(), mp.log_max_rate())
+
+    def market_rates(self, debts: Iterable[int], total_reserves: int) -> Rates:
+        """calculate_rate for markets with these debts and the same total reserves."""
+        d_log = self.log_max_rate - self.log_min_rate
+        log_min = self.log_min_rate
+        return [
+            legacy_exp(tdiv(debt * d_log, total_reserves) + log_min) if debt > 0 else self.min_rate
+            for debt in debts
+        ]
+
+    def market_rate(self, balance: int, total_debt: int, d_reserves: int = 0, d_debt: int = 0) -> int:
+        total_reserves = balance + total_debt + d_reserves
+        debt = total_debt + d_debt
+        assert debt >= 0, "Negative debt"
+        assert total_reserves >= debt, "Reserves too small"
+        return self.market_rates([debt], total_reserves)[0]
+
+    def rates(self, utilizations: Iterable[int]) -> Rates:
+        return self.market_rates(utilizations, WAD)
+
+
+# --- AggMonetaryPolicy4 -------------------------------------------------------
+
+
+def agg_exp(power: int) -> int:
+    """AggMonetaryPolicy4.exp: snekmate's exp, 0 below and MAX_EXP above its domain."""
+    if power <= -41446531673892821376:
+        return 0
+    if power >= 135305999368893231589:
+        return MAX_EXP
+    return wad_exp(power)
+
+
+def debt_ratio(pk_debt: int, total_debt: int) -> int:
+    """The PegKeepers' debt ratio which rate_write feeds to the EMA."""
+    return pk_debt * WAD // total_debt if total_debt > 0 else 0
+
+
+def fill(debt_for: int, ceiling: int) -> int:
+    """How full the market is, as calculate_rate caps it."""
+    f = WAD - TARGET_REMAINDER // 1000
+    if ceiling > 0:
+        f = min(f, debt_for * WAD // ceiling)
+    return f
+
+
+@dataclass
+class AggCurve:
+    rate0: int
+    sigma: int
+    target_debt_fraction: int
+    extra_const: int
+
+    @classmethod
+    def agg_monetary_policy4(cls, rate, sigma, target_debt_fraction, extra_const) -> "AggCurve":
+        assert 10**14 <= sigma <= 10**18
+        assert 0 < target_debt_fraction <= 10**18
+        assert rate <= AGG_MAX_RATE and extra_const <= AGG_MAX_RATE
+        return cls(rate, sigma, target_debt_fraction, extra_const)
+
+    @classmethod
+    def from_contract(cls, mp) -> "AggCurve":
+        return cls(mp.rate0(), mp.sigma(), mp.target_debt_fraction(), mp.extra_const())
+
+    def base_rate(self, price: int, ema_ratio: int) -> int:
+        """Rate before the debt ceiling term: depends on the price and the PegKeepers only."""
+        power = tdiv((WAD - price) * WAD, self.sigma)
+        power -= ema_ratio * WAD // self.target_debt_fraction
+        return self.rate0 * min(agg_exp(power), MAX_EXP) // WAD + self.extra_const
+
+    def rates(self, fills: Iterable[int], price: int, ema_ratio: int) -> Rates:
+        """calculate_rate for markets filled to `fills` (see `fill`) of their debt ceiling."""
+        rate = self.base_rate(price, ema_ratio)
+        f_max = WAD - TARGET_REMAINDER // 1000
+        return [
+            min(
+                rate * ((WAD - TARGET_REMAINDER) + TARGET_REMAINDER * WAD // (WAD - min(f, f_max))) // WAD,
+                AGG_MAX_RATE,
+            )
+            for f in fills
+        ]
+
+    def rate(self, price: int, ema_ratio: int, debt_for: int, ceiling: int) -> int:
+        return self.rates([fill(debt_for, ceiling)], price, ema_ratio)[0]
+
+
+# --- parameter grids ----------------------------------------------------------
+
+
+def curve_grid(make: Callable, **axes: Sequence[int]) -> Dict[tuple, object]:
+    """Curves for every combination of the axes the contract's constructor accepts.
+
+    Keys are the parameter values in the order of `axes`.
+    """
+    curves = {}
+    for values in product(*axes.values()):
+        try:
+            curves[values] = make(**dict(zip(axes, values)))
+        except (AssertionError, ZeroDivisionError):
+            continue
+    return curves
+
+
+def evaluate(curves: Dict[tuple, object], points: Sequence[int], **kwargs) -> Dict[tuple, Rates]:
+    """Rates of every curve at every point: utilizations, or fills for AggCurve."""
+    return {key: curve.rates(points, **kwargs) for key, curve in curves.items()}
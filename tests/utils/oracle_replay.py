@@ -0,0 +1,267 @@
+"""Integer-exact replays of the EMA oracles over price histories, for parameter sweeps.
+
+Tuning `ma_exp_time`, `sigma`, `ema_time` or a proxy's `max_deviation` means running
+months of prices through the oracle math, which boa does one transaction at a time.
+Each replay here ports an oracle's `price_w()` state update to Python ints and runs
+it over a whole history in one pass:
+
+- `ema_price_oracle`: EmaPriceOracle over the prices of the oracle it wraps;
+- `aggregate_stable_price`: AggregateStablePrice3 over `StablePoolSeries`;
+- `erc4626_ema_wrapper`: ERC4626EMAWrapper over its base oracle's prices and the
+  vault's share price;
+- `deviation_allowed` / `required_deviation`: ProxyOracle's check when swapping an
+  oracle giving `old_prices` for one giving `new_prices`.
+
+A history is a set of equally long integer columns (`load_history` reads them from a
+CSV or Parquet file). Row i is a block at `timestamps[i]` in which the sources hold
+the row's values and `price_w()` is called; rows sharing a timestamp are the same
+block. The oracle is deployed (and the aggregator's pairs are added) in the block of
+the first row. The replays return `price_w()` of every row.
+
+The decay factor only depends on the time since the last update, which takes a
+handful of values in a history sampled at a fixed interval, so it is computed once
+per distinct gap. Python ints are used throughout (NumPy's fixed-width integers
+would overflow on the 1e36-scale products) and every division reproduces the
+contract's rounding: the 0.3.10 oracles use `legacy_exp`, ERC4626EMAWrapper the
+`ema` module of curve-std, which blends the previously queued value into the
+previous one with snekmate's `wad_exp`.
+
+`sweep` runs a replay for every combination of its parameters:
+
+    history = load_history("eth_usd.csv")
+    outputs = sweep(ema_price_oracle, history["timestamp"], history["price"],
+                    ma_exp_time=[600, 866, 3600])
+"""
+
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from tests.utils.amm_reference import wad_exp
+from tests.utils.constants import WAD
+from tests.utils.mp_reference import curve_grid, legacy_exp
+
+# EmaPriceOracle
+MIN_MA_EXP_TIME = 30
+MAX_MA_EXP_TIME = 365 * 86400
+
+# AggregateStablePrice3
+TVL_MA_TIME = 50000
+MIN_LIQUIDITY = 100_000 * 10**18
+
+# ProxyOracle
+MAX_DEVIATION_BPS = 5000
+
+
+def _decay(exp: Callable[[int], int], ema_time: int) -> Callable[[int], int]:
+    """exp(-dt / ema_time) as the oracles compute it, memoized per dt."""
+    alphas: Dict[int, int] = {}
+
+    def alpha(dt: int) -> int:
+        a = alphas.get(dt)
+        if a is None:
+            a = alphas[dt] = exp(-(dt * WAD // ema_time))
+        return a
+
+    return alpha
+
+
+def _legacy_exp(power: int) -> int:
+    return legacy_exp(power, None)
+
+
+# --- histories -----------------------------------------------------------------
+
+
+def load_history(path: Union[str, Path], timestamp_column: str = "timestamp") -> Dict[str, List[int]]:
+    """Integer columns of a CSV or Parquet file, by name.
+
+    Values are in the units the contracts see (prices scaled by 1e18). Parquet has
+    no integer type wide enough for them, so store such columns as strings or
+    decimals; reading Parquet needs pyarrow.
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("pyarrow is required to read Parquet histories") from e
+        table = pq.read_table(path)
+        columns = {
+            name: [int(v) for v in column.to_pylist()]
+            for name, column in zip(table.column_names, table.columns)
+        }
+    else:
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            rows = list(reader)
+            columns = {name: [int(row[name]) for row in rows] for name in reader.fieldnames}
+
+    timestamps = columns[timestamp_column]
+    assert all(a <= b for a, b in zip(timestamps, timestamps[1:])), "History is not in time order"
+    return columns
+
+
+def sweep(replay: Callable, *series: Sequence[int], **axes: Sequence[int]) -> Dict[tuple, object]:
+    """`replay(*series, **params)` for every combination of the axes.
+
+    Keys are the parameter values in the order of `axes`; combinations the contract
+    rejects are skipped, as in `curve_grid`.
+    """
+    return curve_grid(lambda **params: replay(*series, **params), **axes)
+
+
+# --- EmaPriceOracle --------------------------------------------------------------
+
+
+def ema_price_oracle(timestamps: Sequence[int], prices: Sequence[int], ma_exp_time: int) -> List[int]:
+    """EmaPriceOracle.price_w() in every row, `prices` being the wrapped oracle's price."""
+    assert MIN_MA_EXP_TIME <= ma_exp_time <= MAX_MA_EXP_TIME
+    alpha = _decay(_legacy_exp, ma_exp_time)
+    last_price = prices[0]
+    last_timestamp = timestamps[0]
+
+    outputs = []
+    for t, p in zip(timestamps, prices):
+        if last_timestamp < t:
+            a = alpha(t - last_timestamp)
+            last_price = (p * (WAD - a) + last_price * a) // WAD
+            last_timestamp = t
+        outputs.append(last_price)
+    return outputs
+
+
+# --- AggregateStablePrice3 -------------------------------------------------------
+
+
+@dataclass
+class StablePoolSeries:
+    """A price pair of the aggregator: what it reads from the pool in every row.
+
+    Plain pools give `virtual_price`. -ng pools give `D` (their D_oracle) instead;
+    their `supply` is only read when the pair is added.
+    """
+
+    price: Sequence[int]
+    supply: Sequence[int]
+    virtual_price: Optional[Sequence[int]] = None
+    D: Optional[Sequence[int]] = None
+    is_inverse: bool = False
+
+    @property
+    def is_ng(self) -> bool:
+        return self.D is not None
+
+    def price_at(self, i: int) -> int:
+        return 10**36 // self.price[i] if self.is_inverse else self.price[i]
+
+
+def aggregate_price(prices: Sequence[int], tvls: Sequence[int], sigma: int) -> int:
+    """AggregateStablePrice3._price, with a price of 0 for pools below MIN_LIQUIDITY."""
+    sigma2 = sigma**2 // WAD
+    D = [tvl if tvl >= MIN_LIQUIDITY else 0 for tvl in tvls]
+    D_sum = sum(D)
+    if D_sum == 0:
+        return WAD
+    p_avg = sum(d * p for d, p in zip(D, prices)) // D_sum
+    e = [abs(p - p_avg) ** 2 // sigma2 for p in prices]
+    e_min = min(e)
+    w_sum = 0
+    wp_sum = 0
+    for d, p, x in zip(D, prices, e):
+        if d:
+            w = d * legacy_exp(e_min - x, None) // WAD
+            w_sum += w
+            wp_sum += w * p
+    return wp_sum // w_sum
+
+
+def aggregate_stable_price(
+    timestamps: Sequence[int], pools: Sequence[StablePoolSeries], sigma: int
+) -> List[int]:
+    """AggregateStablePrice3.price_w() in every row, with `pools` added at deployment."""
+    alpha = _decay(_legacy_exp, TVL_MA_TIME)
+
+    def price(i: int, tvls: List[int]) -> int:
+        # Pools below MIN_LIQUIDITY are not asked for their price
+        prices = [pool.price_at(i) if tvl >= MIN_LIQUIDITY else 0 for pool, tvl in zip(pools, tvls)]
+        return aggregate_price(prices, tvls, sigma)
+
+    # add_price_pair stores totalSupply and prices the block with the TVLs as they stand
+    last_tvl = [pool.supply[0] for pool in pools]
+    last_timestamp = timestamps[0]
+    last_price = price(0, [pool.D[0] if pool.is_ng else tvl for pool, tvl in zip(pools, last_tvl)])
+
+    outputs = []
+    for i, t in enumerate(timestamps):
+        if last_timestamp < t:
+            a = alpha(t - last_timestamp)
+            for j, pool in enumerate(pools):
+                if pool.is_ng:
+                    last_tvl[j] = pool.D[i]
+                elif a != WAD:
+                    new_tvl = pool.supply[i] * WAD // pool.virtual_price[i]
+                    last_tvl[j] = (new_tvl * (WAD - a) + last_tvl[j] * a) // WAD
+            last_timestamp = t
+            last_price = price(i, last_tvl)
+        outputs.append(last_price)
+    return outputs
+
+
+# --- ERC4626EMAWrapper -----------------------------------------------------------
+
+
+def erc4626_ema_wrapper(
+    timestamps: Sequence[int],
+    oracle_prices: Sequence[int],
+    share_prices: Sequence[int],
+    ema_time: int,
+) -> List[int]:
+    """ERC4626EMAWrapper.price_w() in every row.
+
+    `oracle_prices` is the base oracle's price_w() and `share_prices` the vault's
+    convertToAssets(1e18).
+    """
+    alpha = _decay(wad_exp, ema_time)
+    # ema.EMA(prev_value, prev_timestamp, queued_value) seeded with the share price
+    prev_value = queued_value = share_prices[0]
+    prev_timestamp = timestamps[0]
+
+    outputs = []
+    for t, p1, spot in zip(timestamps, oracle_prices, share_prices):
+        smoothed = prev_value
+        if prev_timestamp < t:
+            a = alpha(t - prev_timestamp)
+            smoothed = (queued_value * (WAD - a) + prev_value * a) // WAD
+        if spot < smoothed:
+            prev_value = queued_value = spot
+            prev_timestamp = t
+            share_price = spot
+        else:
+            # ema.update: fold the queued value in, then queue the new one
+            prev_value = smoothed
+            prev_timestamp = t
+            queued_value = spot
+            share_price = smoothed
+        outputs.append(p1 * share_price // WAD)
+    return outputs
+
+
+# --- ProxyOracle -----------------------------------------------------------------
+
+
+def deviation_allowed(old_prices: Sequence[int], new_prices: Sequence[int], max_deviation: int) -> List[bool]:
+    """Whether ProxyOracle accepts the new oracle in every row, without skipping the check."""
+    assert 0 < max_deviation <= MAX_DEVIATION_BPS
+    return [abs(new - old) <= old * max_deviation // 10_000 for old, new in zip(old_prices, new_prices)]
+
+
+def required_deviation(old_prices: Sequence[int], new_prices: Sequence[int]) -> List[int]:
+    """The smallest max_deviation accepting the new oracle in every row.
+
+    Values above MAX_DEVIATION_BPS can only be passed by skipping the check.
+    """
+    return [
+        max(1, -(-abs(new - old) * 10_000 // old)) for old, new in zip(old_prices, new_prices)
+    ]
@@ -61,6 +61,31 @@ class Llamalend:
     Handles deployment of core infrastructure and creation of markets.
     """
 
+    # initial_price -> deployed protocol, see `cached`
+    _snapshots: Dict[int, "Llamalend"] = {}
+
+    @classmethod
+    def cached(cls, initial_price: int = 3000 * 10**18) -> "Llamalend":
+        """
+        Return a deployed protocol, reusing an earlier deployment if its state
+        is still live in the current boa env.
+
+        Deploying the full suite (blueprints, factories and the patched mint
+        controller compilation) is by far the most expensive fixture. A
+        deployment made outside of any test anchor (see the session fixture in
+        tests/conftest.py) survives for the whole session, and boa's fixture
+        and hypothesis isolation roll every later change back to it. A
+        deployment made inside an anchor disappears once the anchor exits, in
+        which case the code check below fails and the suite is redeployed.
+        """
+        proto = cls._snapshots.get(initial_price)
+        if proto is None or not proto._is_live():
+            proto = cls._snapshots[initial_price] = cls(initial_price)
+        return proto
+
+    def _is_live(self) -> bool:
+        return all(boa.env.get_code(addr) == code for addr, code in self._code.items())
+
     def __init__(self, initial_price: int = 3000 * 10**18):
         """
         Deploy the complete llamalend protocol suite.
@@ -120,6 +145,13 @@ class Llamalend:
             self.__init_mint_markets(initial_price)
             self.__init_lend_markets()
 
+        # Runtime code of the entry points, used by `cached` to detect whether
+        # this deployment has been reverted
+        self._code = {
+            c.address: boa.env.get_code(c.address)
+            for c in (self.crvUSD, self.mint_factory, self.lending_factory)
+        }
+
     def __init_mint_markets(self, initial_price):
         # Deploy WETH
         self.weth = WETH_DEPLOYER.deploy()